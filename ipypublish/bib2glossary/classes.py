@@ -1,5 +1,4 @@
 import copy
-import io
 import logging
 import os
 
@@ -12,6 +11,7 @@ from ipypublish.bib2glossary.definitions import (
     NEWGLOSS_FIELDS,
     NEWACRONYM_FIELDS,
 )
+from ipypublish.convert.bibcache import get_bib_entries
 
 try:
     from collections.abc import MutableMapping
@@ -200,8 +200,11 @@ class BibGlossDB(MutableMapping):
         elif path is not None:
             if text_str is not None:
                 raise ValueError("text_str and path cannot be set at the same time")
-            with io.open(path, encoding=encoding) as fobj:
-                text_str = fobj.read()
+            # the parsed file is cached, and only re-parsed if it has changed
+            bib = bibtexparser.bibdatabase.BibDatabase()
+            bib.entries = get_bib_entries(
+                path, encoding=encoding, ignore_nonstandard_types=False
+            )
 
         if bib is None:
             parser = bibtexparser.bparser.BibTexParser()
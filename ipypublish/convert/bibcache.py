@@ -0,0 +1,164 @@
+"""a shared cache of parsed bibliographies,
+keyed on the path, modification time and encoding of the file,
+which is held in memory per process and, if a "bibliographies" cache is active
+(see ``ipypublish.convert.cache.activate_cache``), persisted to it as JSON
+"""
+import io
+import json
+import logging
+import os
+import re
+import threading
+
+from ipypublish.convert.cache import get_cache, hash_key
+from ipypublish.utils import pathlib
+
+logger = logging.getLogger("bibcache")
+
+CACHE_VERSION = 2
+CACHE_NAME = "bibliographies"
+
+# {(path, encoding, ignore_nonstandard_types): (stat_key, entries)}
+_MEMORY = {}
+_LOCK = threading.Lock()
+
+
+def safe_str(obj):
+    if hasattr(obj, "decode"):
+        try:
+            obj = obj.decode("utf-8")
+        except UnicodeEncodeError:
+            pass
+    try:
+        return str(obj)
+    except UnicodeEncodeError:
+        # python 2.7
+        obj = re.sub(u"\u2013", "-", obj)  # en dash
+        obj = re.sub(u"\u2014", "--", obj)  # em dash
+        return obj.encode("ascii", "ignore").decode("ascii")
+    return ""
+
+
+def _parse_bibtex(path, encoding, ignore_nonstandard_types):
+    import bibtexparser
+
+    if hasattr(path, "open"):
+        with path.open(encoding=encoding) as handle:
+            text_str = handle.read()
+    else:
+        with io.open(path, encoding=encoding) as handle:
+            text_str = handle.read()
+    text_str = safe_str(text_str)
+    parser = bibtexparser.bparser.BibTexParser()
+    parser.ignore_nonstandard_types = ignore_nonstandard_types
+    parser.encoding = encoding
+    return parser.parse(text_str).entries
+
+
+def _decode_entries(data):
+    """decode JSON entries, returning None if they are not a list of str dicts"""
+    try:
+        entries = json.loads(data.decode("utf8"))
+    except ValueError:
+        return None
+    if not isinstance(entries, list):
+        return None
+    for entry in entries:
+        if not isinstance(entry, dict) or not all(
+            isinstance(value, str) for value in entry.values()
+        ):
+            return None
+    return entries
+
+
+def _load_entries(path, stat_key, encoding, ignore_nonstandard_types):
+    import bibtexparser
+
+    cache = get_cache(CACHE_NAME)
+    if cache is not None:
+        disk_key = hash_key(
+            "bibtex",
+            CACHE_VERSION,
+            bibtexparser.__version__,
+            path,
+            stat_key,
+            encoding,
+            ignore_nonstandard_types,
+        )
+        data = cache.get_bytes(disk_key)
+        entries = None if data is None else _decode_entries(data)
+        if entries is not None:
+            logger.debug("loaded cached bibliography: {}".format(path))
+            return entries
+
+    logger.debug("parsing bibliography: {}".format(path))
+    entries = _parse_bibtex(path, encoding, ignore_nonstandard_types)
+
+    if cache is not None:
+        try:
+            cache.set(disk_key, json.dumps(entries))
+        except (IOError, OSError) as err:
+            # the entries are then only kept in memory
+            logger.debug("could not persist bibliography {}: {}".format(path, err))
+    return entries
+
+
+def get_bib_entries(path, encoding="utf8", ignore_nonstandard_types=True):
+    """ return the entries of a bibtex file, as parsed by bibtexparser
+
+    the file is only re-parsed if its modification time (or size) has changed,
+    since it was last parsed (by this process, or a previous one,
+    if a "bibliographies" cache is active)
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        other path-like objects (with an ``open`` method) are parsed,
+        but not cached
+    encoding: str
+    ignore_nonstandard_types: bool
+        ignore entries with types not in the bibtex standard
+
+    Returns
+    -------
+    entries: list of dict
+        copies of the entries, which may be mutated by the caller
+
+    Raises
+    ------
+    IOError
+        if the file cannot be read
+
+    """
+    if hasattr(path, "open") and not isinstance(path, pathlib.PurePath):
+        return _parse_bibtex(path, encoding, ignore_nonstandard_types)
+    path = os.path.abspath(str(path))
+    stat = os.stat(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    key = (path, encoding, ignore_nonstandard_types)
+    with _LOCK:
+        cached = _MEMORY.get(key, None)
+    if cached is not None and cached[0] == stat_key:
+        entries = cached[1]
+    else:
+        entries = _load_entries(path, stat_key, encoding, ignore_nonstandard_types)
+        with _LOCK:
+            _MEMORY[key] = (stat_key, entries)
+    # the field values are strings, so a shallow copy is sufficient
+    return [dict(entry) for entry in entries]
+
+
+def get_bib_entries_dict(path, encoding="utf8", **kwargs):
+    """ return the entries of a bibtex file, mapped by their ID
+
+    see ``get_bib_entries``
+    """
+    return {
+        entry["ID"]: entry for entry in get_bib_entries(path, encoding, **kwargs)
+    }
+
+
+def clear_memory():
+    """clear the in-memory cache"""
+    with _LOCK:
+        _MEMORY.clear()
@@ -0,0 +1,216 @@
+"""on-disk caching of conversion results, to be reused across runs
+"""
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+
+from ipypublish.utils import pathlib
+from ipypublish.convert.lazy_outputs import LazyPayload
+
+logger = logging.getLogger("cache")
+
+DEFAULT_MAX_SIZE = 500 * 2 ** 20
+
+# the caches activated for the current conversion
+_ACTIVE_CACHES = {}
+
+
+def default_cache_folder():
+    """return the folder in which to store caches,
+    ``$XDG_CACHE_HOME/ipypublish`` or ``~/.cache/ipypublish``
+    """
+    root = os.environ.get("XDG_CACHE_HOME", "").strip()
+    if not root:
+        root = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "ipypublish")
+
+
+def _key_default(obj):
+    # lazy output payloads are identified by their content hash,
+    # rather than reading them from file
+    if isinstance(obj, LazyPayload):
+        return obj.key
+    return str(obj)
+
+
+def hash_key(*parts):
+    """create a key, from a hash of one or more (json serializable) objects
+
+    >>> hash_key("a", {"b": 1}) == hash_key("a", {"b": 1})
+    True
+    >>> hash_key("a", {"b": 1}) == hash_key("a", {"b": 2})
+    False
+
+    """
+    string = json.dumps(parts, sort_keys=True, default=_key_default)
+    return hashlib.sha256(string.encode("utf8")).hexdigest()
+
+
+class DiskCache(object):
+    """ a content-addressed on-disk cache,
+    where the least recently used entries are evicted,
+    once the total size of the cache exceeds a maximum
+
+    Parameters
+    ----------
+    folder: str or pathlib.Path
+        the folder to store the cache in
+    max_size: int
+        the maximum total size of the cache (in bytes)
+
+    """
+
+    def __init__(self, folder, max_size=DEFAULT_MAX_SIZE):
+        self.folder = pathlib.Path(folder)
+        self.max_size = max_size
+        self._size = None
+
+    def __repr__(self):
+        return "DiskCache({!r})".format(str(self.folder))
+
+    def _get_path(self, key):
+        return self.folder.joinpath(key[:2], key)
+
+    def _iter_entries(self):
+        if not self.folder.exists():
+            return
+        for path in self.folder.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            yield path, stat
+
+    def __contains__(self, key):
+        return self._get_path(key).exists()
+
+    def get_bytes(self, key, default=None):
+        """return the cached bytes for a key, or the default if not present"""
+        path = self._get_path(key)
+        try:
+            with path.open("rb") as handle:
+                value = handle.read()
+        except (IOError, OSError):
+            return default
+        try:
+            # mark as recently used
+            os.utime(str(path), None)
+        except OSError:
+            pass
+        return value
+
+    def set_bytes(self, key, value):
+        """store bytes for a key"""
+        path = self._get_path(key)
+        try:
+            if not path.parent.exists():
+                path.parent.mkdir(parents=True)
+        except OSError:
+            # created by another process
+            pass
+        # write to a temporary file first, so that readers never see partial data
+        temp_path = path.with_name("{}.{}.tmp".format(key, os.getpid()))
+        with temp_path.open("wb") as handle:
+            handle.write(value)
+        os.replace(str(temp_path), str(path))
+
+        if self._size is None:
+            self._size = sum(stat.st_size for _, stat in self._iter_entries())
+        else:
+            self._size += len(value)
+        if self._size > self.max_size:
+            self.evict()
+
+    def get(self, key, default=None):
+        """return the cached text for a key, or the default if not present"""
+        value = self.get_bytes(key)
+        if value is None:
+            return default
+        return value.decode("utf8")
+
+    def set(self, key, value):
+        """store text for a key"""
+        self.set_bytes(key, value.encode("utf8"))
+
+    def evict(self, max_size=None):
+        """remove the least recently used entries,
+        until the size of the cache is below max_size
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = sorted(self._iter_entries(), key=lambda e: e[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if size <= max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= stat.st_size
+        logger.debug("evicted cache entries in {}, to size: {}".format(self, size))
+        self._size = size
+
+    def clear(self):
+        """remove all entries from the cache"""
+        self.evict(0)
+
+
+@contextmanager
+def activate_cache(name, cache):
+    """ within this context, the cache is accessible *via* ``get_cache(name)``
+
+    Parameters
+    ----------
+    name: str
+    cache: DiskCache or None
+
+    """
+    previous = _ACTIVE_CACHES.get(name, None)
+    _ACTIVE_CACHES[name] = cache
+    try:
+        yield cache
+    finally:
+        _ACTIVE_CACHES[name] = previous
+
+
+def get_cache(name):
+    """return the active cache for name, or None if there is none"""
+    return _ACTIVE_CACHES.get(name, None)
+
+
+def pandoc_cache_key(*parts):
+    """create a key for a pandoc conversion,
+    which includes the versions of pandoc and ipypublish
+    """
+    from nbconvert.utils.pandoc import get_pandoc_version
+    from ipypublish import __version__
+
+    return hash_key("pandoc", get_pandoc_version(), __version__, parts)
+
+
+def cached_pandoc(key_parts, convert):
+    """ return the output of a pandoc conversion,
+    retrieving it from, or storing it in, the active "pandoc" cache
+
+    Parameters
+    ----------
+    key_parts: tuple
+        (json serializable) objects that determine the conversion output
+    convert: callable
+        a function, taking no arguments, that returns the conversion str
+
+    """
+    cache = get_cache("pandoc")
+    if cache is None:
+        return convert()
+    key = pandoc_cache_key(*key_parts)
+    out_str = cache.get(key)
+    if out_str is None:
+        out_str = convert()
+        cache.set(key, out_str)
+    return out_str
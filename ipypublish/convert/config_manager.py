@@ -1,12 +1,14 @@
+import copy
+import fnmatch
+import hashlib
 import os
 import glob
 import importlib
+import json
 import logging
+import threading
 
-from six import string_types
-from jinja2 import DictLoader
-import jsonschema
-import nbconvert  # noqa: F401
+from typing import TYPE_CHECKING
 
 from ipypublish.utils import (
     pathlib,
@@ -18,6 +20,10 @@ from ipypublish.utils import (
 from ipypublish import export_plugins
 from ipypublish import schema
 from ipypublish.templates.create_template import create_template
+from ipypublish.convert.plugin_index import clear_index, get_plugin_index
+
+if TYPE_CHECKING:
+    import nbconvert  # noqa: F401
 
 _TEMPLATE_KEY = "new_template"
 _EXPORT_SCHEMA_FILE = "export_config.schema.json"
@@ -25,14 +31,74 @@ _EXPORT_SCHEMA = None
 
 logger = logging.getLogger("configuration")
 
+# process level caches, {key: (mtimes, paths, value)},
+# where the value is reused while the mtimes of its source paths are unchanged
+_CACHES = {"export_config": {}, "template": {}, "exporter": {}}
+_CACHE_LOCK = threading.Lock()
+
+
+def _get_mtimes(paths):
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(str(path)).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
 
-def get_export_config_path(export_key, config_folder_paths=()):
-    # type (string, Tuple[str]) -> Union[string, None]
+def _cached(cache_name, key, create):
+    """ return a value from a process level cache,
+    or create it, if it is not present or the mtimes of paths have changed
+
+    Parameters
+    ----------
+    cache_name: str
+    key: hashable
+    create: callable
+        key -> (value, paths), where paths are those the value depends on
+
+    """
+    cache = _CACHES[cache_name]
+    with _CACHE_LOCK:
+        entry = cache.get(key, None)
+    if entry is not None and entry[0] == _get_mtimes(entry[1]):
+        return entry[2]
+    value, source_paths = create(key)
+    source_paths = tuple(str(p) for p in source_paths)
+    with _CACHE_LOCK:
+        cache[key] = (_get_mtimes(source_paths), source_paths, value)
+    return value
+
+
+def clear_caches():
+    """ clear all process level caches of export configurations and templates,
+    and the in-memory plugin indexes
+    """
+    with _CACHE_LOCK:
+        for cache in _CACHES.values():
+            cache.clear()
+        _BYTECODE_CACHE.clear()
+    clear_index()
+
+
+def _get_export_folders(config_folder_paths):
+    return [str(p) for p in config_folder_paths] + [
+        str(get_module_path(export_plugins))
+    ]
+
+
+def get_export_config_path(export_key, config_folder_paths=(), index_folder=None):
+    # type (string, Tuple[str], Union[str, None]) -> Union[string, None]
     """we search for a plugin name, which matches the supplied plugin name
+
+    the plugin index is persisted in index_folder, if it is not None
     """
-    for name, jsonpath in iter_all_export_paths(config_folder_paths):
-        if name == export_key:
-            return pathlib.Path(jsonpath)
+    for _, plugins in get_plugin_index(
+        _get_export_folders(config_folder_paths), index_folder=index_folder
+    ):
+        if export_key in plugins:
+            return pathlib.Path(plugins[export_key]["path"])
     return None
 
 
@@ -52,9 +118,19 @@ def iter_all_export_paths(config_folder_paths=(), regex="*.json"):
 
 
 def load_export_config(export_config_path):
-    """load the export configuration"""
-    if isinstance(export_config_path, string_types):
-        export_config_path = pathlib.Path(export_config_path)
+    """load the export configuration
+
+    the validated data is cached, for as long as the file is unchanged
+    """
+
+    def create(key):
+        return _load_export_config(pathlib.Path(key)), [key]
+
+    path = os.path.abspath(str(export_config_path))
+    return copy.deepcopy(_cached("export_config", path, create))
+
+
+def _load_export_config(export_config_path):
 
     data = read_file_from_directory(
         export_config_path.parent,
@@ -75,6 +151,8 @@ def load_export_config(export_config_path):
             logger,
             interp_ext=True,
         )
+    import jsonschema
+
     try:
         jsonschema.validate(data, _EXPORT_SCHEMA)
     except jsonschema.ValidationError as err:
@@ -89,31 +167,51 @@ def load_export_config(export_config_path):
     return data
 
 
-def iter_all_export_infos(config_folder_paths=(), regex="*.json", get_mime=False):
-    """iterate through all export configuration and yield a dict of info"""
-    for name, path in iter_all_export_paths(config_folder_paths, regex):
-        data = load_export_config(path)
+def iter_all_export_infos(
+    config_folder_paths=(), regex="*.json", get_mime=False, index_folder=None
+):
+    """iterate through all export configuration and yield a dict of info
 
-        info = dict(
-            [
-                ("key", str(name)),
-                ("class", data["exporter"]["class"]),
-                ("path", str(path)),
-                ("description", data["description"]),
-            ]
-        )
+    the information is retrieved from the plugin index
+    (persisted in index_folder, if it is not None),
+    so only plugin files that have changed since they were indexed are read
+    """
+    for _, plugins in get_plugin_index(
+        _get_export_folders(config_folder_paths),
+        check_files=True,
+        index_folder=index_folder,
+    ):
+        for name, plugin in plugins.items():
+            if not fnmatch.fnmatch(name + ".json", regex):
+                continue
+            if "error" in plugin:
+                # raise the error
+                load_export_config(plugin["path"])
+
+            info = dict(
+                [
+                    ("key", str(name)),
+                    ("class", plugin["class"]),
+                    ("path", str(plugin["path"])),
+                    ("description", plugin["description"]),
+                ]
+            )
 
-        if get_mime:
-            info["mime_type"] = create_exporter_cls(
-                data["exporter"]["class"]
-            ).output_mimetype
+            if get_mime:
+                info["mime_type"] = create_exporter_cls(
+                    plugin["class"]
+                ).output_mimetype
 
-        yield info
+            yield info
 
 
 def create_exporter_cls(class_str):
     # type: (str) -> nbconvert.exporters.Exporter
-    """dynamically load export class"""
+    """dynamically load export class (cached)"""
+    return _cached("exporter", class_str, lambda key: (_create_exporter_cls(key), []))
+
+
+def _create_exporter_cls(class_str):
     export_class_path = class_str.split(".")
     module_path = ".".join(export_class_path[0:-1])
     class_name = export_class_path[-1]
@@ -147,14 +245,41 @@ def get_export_extension(export_config_path):
 
 
 def str_to_jinja(template_str, template_key="jinja_template"):
+    from jinja2 import DictLoader
+
     return DictLoader({template_key: template_str})
 
 
 def load_template(template_key, template_dict):
+    """ create a jinja loader, for the template defined by template_dict
 
+    the template string is cached,
+    for as long as the outline and segment files are unchanged
+    """
     if template_dict is None:
         return None
 
+    key = json.dumps(template_dict, sort_keys=True)
+    template_str = _cached("template", key, _create_template)
+
+    return str_to_jinja(template_str, template_key)
+
+
+def _get_template_file_path(file_dict):
+    if "directory" in file_dict:
+        return os.path.join(str(file_dict["directory"]), file_dict["file"])
+    try:
+        module = importlib.import_module(file_dict["module"])
+    except ImportError:
+        # the error is raised when the template is created
+        return None
+    return os.path.join(str(get_module_path(module)), file_dict["file"])
+
+
+def _create_template(key):
+    """return the template string, and the paths that it was created from"""
+    template_dict = json.loads(key)
+
     if "directory" in template_dict["outline"]:
         outline_template = read_file_from_directory(
             template_dict["outline"]["directory"],
@@ -211,4 +336,82 @@ def load_template(template_key, template_dict):
 
     template_str = create_template(outline_template, outline_name, segments)
 
-    return str_to_jinja(template_str, template_key)
+    paths = [
+        _get_template_file_path(file_dict)
+        for file_dict in [template_dict["outline"]] + template_dict.get("segments", [])
+    ]
+
+    return template_str, [p for p in paths if p is not None]
+
+
+class MemoryBytecodeCache(object):
+    """ an in-memory cache of compiled jinja templates,
+    that can be shared by multiple environments
+    (implementing the interface of ``jinja2.BytecodeCache``)
+
+    buckets are keyed by the template name,
+    but also the environment's syntax and extensions,
+    since the same source may compile differently in different environments
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, environment, name, filename, source):
+        from jinja2.bccache import Bucket
+
+        key = (
+            name,
+            filename,
+            environment.block_start_string,
+            environment.block_end_string,
+            environment.variable_start_string,
+            environment.variable_end_string,
+            environment.comment_start_string,
+            environment.comment_end_string,
+            environment.line_statement_prefix,
+            environment.line_comment_prefix,
+            environment.trim_blocks,
+            environment.lstrip_blocks,
+            environment.newline_sequence,
+            environment.keep_trailing_newline,
+            environment.autoescape,
+            tuple(sorted(environment.extensions)),
+        )
+        checksum = hashlib.sha1(source.encode("utf8")).hexdigest()
+        bucket = Bucket(environment, key, checksum)
+        with self._lock:
+            entry = self._cache.get(key, None)
+        if entry is not None and entry[0] == checksum:
+            bucket.code = entry[1]
+        return bucket
+
+    def set_bucket(self, bucket):
+        with self._lock:
+            self._cache[bucket.key] = (bucket.checksum, bucket.code)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_BYTECODE_CACHE = MemoryBytecodeCache()
+
+
+def use_bytecode_cache(exporter):
+    """ set the jinja environment of an exporter instance,
+    to use the process level bytecode cache
+    """
+    if not hasattr(exporter, "_create_environment"):
+        return
+    create_environment = exporter._create_environment
+
+    def _create_environment():
+        environment = create_environment()
+        environment.bytecode_cache = _BYTECODE_CACHE
+        return environment
+
+    exporter._create_environment = _create_environment
+    if hasattr(exporter, "_invalidate_environment_cache"):
+        exporter._invalidate_environment_cache()
@@ -0,0 +1,77 @@
+"""execute notebooks separately, in a pool of processes,
+such that each notebook has its own kernel
+"""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+
+from traitlets.utils.importstring import import_item
+
+from ipypublish.utils import handle_error
+
+logger = logging.getLogger("execute")
+
+
+def _execute_notebook(nb, ipynb_path, preprocessor_class, config):
+    """execute a single notebook, in its own folder"""
+    preprocessor = import_item(preprocessor_class)(config=config)
+    resources = {"metadata": {"path": os.path.dirname(str(ipynb_path))}}
+    nb, _ = preprocessor.preprocess(nb, resources)
+    return nb
+
+
+def execute_notebooks(nbs, paths, preprocessor_class, config=None, processes=None):
+    """ execute notebooks, each in a separate process
+
+    the notebooks are sent to the processes, rather than read again by them,
+    so lazy output payloads (see ``ipypublish.convert.lazy_outputs``)
+    are passed as references to the notebook files
+
+    Parameters
+    ----------
+    nbs: list[nbformat.NotebookNode]
+    paths: list[pathlib.Path]
+        the path of each notebook, which is executed in its parent folder
+    preprocessor_class: str
+        the import string of the execution preprocessor
+        (e.g. nbconvert.preprocessors.ExecutePreprocessor)
+    config: traitlets.config.Config or None
+        the configuration for the preprocessor
+    processes: int or None
+        the maximum number of processes to use,
+        if None, the number of processors on the machine
+
+    Returns
+    -------
+    nbs: list[nbformat.NotebookNode]
+        the executed notebooks, in the same order as paths
+
+    """
+    nbs = list(nbs)
+    paths = list(paths)
+    if not nbs:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(nbs))
+    logger.info(
+        "executing {} notebooks in {} processes".format(len(nbs), processes)
+    )
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                _execute_notebook, nb, str(path), preprocessor_class, config
+            )
+            for nb, path in zip(nbs, paths)
+        ]
+        executed = []
+        for path, future in zip(paths, futures):
+            try:
+                executed.append(future.result())
+            except Exception as err:
+                for other in futures:
+                    other.cancel()
+                handle_error(
+                    "execution failed for {}: {}".format(path, err),
+                    RuntimeError,
+                    logger,
+                )
+    return executed
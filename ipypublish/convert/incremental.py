@@ -0,0 +1,196 @@
+"""incremental rendering of notebook templates,
+whereby only cells that have changed since the last run are re-rendered
+"""
+import io
+import json
+import logging
+import os
+import re
+
+from ipypublish.convert.cache import hash_key
+
+logger = logging.getLogger("incremental")
+
+MANIFEST_VERSION = 1
+CELL_MARKER = "IPUBINCREMENTALCELL{}END"
+CELL_MARKER_REGEX = re.compile("IPUBINCREMENTALCELL([0-9]+)END")
+
+# resources keys which are not part of the global state
+_IGNORE_RESOURCES = ("outputs",)
+# resources keys which are created from sets (and so have an arbitrary order)
+_UNORDERED_RESOURCES = ("external_file_paths", "unfound_file_paths")
+
+
+def get_global_key(config_key, nb_metadata, resources):
+    """ create a key for all state that the rendering of every cell
+    may depend on; the export configuration, notebook metadata and resources
+
+    Note, preprocessors that collect information from across the notebook
+    and store it in the resources (such as the ``refmap``),
+    or in the notebook metadata, will therefore invalidate all cells,
+    when it changes.
+
+    """
+    state = {}
+    for key, value in resources.items():
+        if key in _IGNORE_RESOURCES:
+            continue
+        if key in _UNORDERED_RESOURCES:
+            value = sorted(str(v) for v in value)
+        state[key] = value
+    return hash_key(config_key, nb_metadata, state)
+
+
+def get_cell_key(cell):
+    """create a key from the cell's type, source, outputs and metadata"""
+    return hash_key(cell)
+
+
+def load_manifest(path):
+    """load a manifest, or return None if it does not exist or is invalid"""
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with io.open(path, encoding="utf8") as handle:
+            manifest = json.load(handle)
+    except (IOError, ValueError) as err:
+        logger.warning("could not read manifest {}: {}".format(path, err))
+        return None
+    if manifest.get("version", None) != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+class IncrementalTemplate(object):
+    """ wrap a jinja template, so that only cells which have changed,
+    since the last render recorded in the manifest, are rendered
+
+    The template is first rendered with each ``any_cell`` block replaced
+    by a marker, then each marker is replaced with the cell's fragment,
+    either from the manifest (if the cell and the global state are unchanged)
+    or by rendering the ``any_cell`` block for that cell alone.
+    If the template can not be rendered in this way,
+    the full template is rendered.
+
+    Parameters
+    ----------
+    template: jinja2.Template
+    manifest_path: str
+        path to the manifest file
+    config_key: str
+        a key for the export configuration (including the template)
+    logger: logging.Logger
+
+    Attributes
+    ----------
+    rendered_cells: list of int or None
+        the indices of the cells rendered by the last render
+        (rather than taken from the manifest),
+        or None if the full template was rendered
+
+    """
+
+    def __init__(self, template, manifest_path, config_key, logger=logger):
+        self._template = template
+        self._manifest_path = manifest_path
+        self._config_key = config_key
+        self._logger = logger
+        self._manifest = None
+        self.rendered_cells = None
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, *args, **kwargs):
+        kwargs = dict(*args, **kwargs)
+        try:
+            return self._render_incremental(kwargs)
+        except Exception as err:
+            self._logger.info(
+                "incremental render failed, rendering full template: {}".format(err)
+            )
+            self._manifest = None
+            self.rendered_cells = None
+            return self._template.render(kwargs)
+
+    def _render_incremental(self, variables):
+        template = self._template
+        nb = variables["nb"]
+        global_key = get_global_key(
+            self._config_key, nb.metadata, variables.get("resources", {})
+        )
+        cell_keys = [get_cell_key(cell) for cell in nb.cells]
+        cell_indices = {id(cell): i for i, cell in enumerate(nb.cells)}
+
+        previous = load_manifest(self._manifest_path)
+        if previous is not None and previous["global"] == global_key:
+            fragments = previous["fragments"]
+        else:
+            fragments = {}
+
+        def marker_block(context):
+            yield CELL_MARKER.format(cell_indices[id(context.resolve("cell"))])
+
+        # render the template, with markers in place of the cells
+        context = template.new_context(variables)
+        context.blocks["any_cell"] = [marker_block] + context.blocks.get(
+            "any_cell", []
+        )
+        skeleton = "".join(template.root_render_func(context))
+        cell_blocks = {
+            name: (funcs[1:] if name == "any_cell" else funcs)
+            for name, funcs in context.blocks.items()
+        }
+        if not cell_blocks["any_cell"]:
+            raise ValueError("the template has no any_cell block")
+
+        new_fragments = {}
+
+        def render_cell(match):
+            index = int(match.group(1))
+            key = cell_keys[index]
+            if key not in new_fragments:
+                if key in fragments:
+                    new_fragments[key] = fragments[key]
+                else:
+                    # include the macros, etc, defined in the template
+                    cell_context = template.new_context(
+                        dict(context.get_all(), cell=nb.cells[index])
+                    )
+                    cell_context.blocks = {
+                        name: list(funcs) for name, funcs in cell_blocks.items()
+                    }
+                    new_fragments[key] = "".join(
+                        cell_blocks["any_cell"][0](cell_context)
+                    )
+                    rendered.append(index)
+            return new_fragments[key]
+
+        rendered = []
+        output = CELL_MARKER_REGEX.sub(render_cell, skeleton)
+        self._logger.info(
+            "incremental render: rendered {0} of {1} cell(s)".format(
+                len(rendered), len(nb.cells)
+            )
+        )
+
+        self.rendered_cells = rendered
+        self._manifest = {
+            "version": MANIFEST_VERSION,
+            "global": global_key,
+            "cells": cell_keys,
+            "fragments": new_fragments,
+        }
+        return output
+
+    def save_manifest(self):
+        """save the manifest of the last render"""
+        if self._manifest is None:
+            if os.path.exists(self._manifest_path):
+                os.remove(self._manifest_path)
+            return
+        folder = os.path.dirname(self._manifest_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with io.open(self._manifest_path, "w", encoding="utf8") as handle:
+            handle.write(json.dumps(self._manifest))
@@ -0,0 +1,353 @@
+"""lazy loading of (large) binary output payloads from notebook files
+
+rather than loading base64 encoded outputs (images, pdfs) into memory,
+their byte offsets in the (memory-mapped) notebook file are recorded,
+and they are only read (and decoded) when they are actually used
+"""
+from binascii import a2b_base64
+import copy
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+
+logger = logging.getLogger("lazy_outputs")
+
+LAZY_MIMETYPES = ("image/png", "image/jpeg", "image/gif", "application/pdf")
+
+# payloads smaller than this are loaded as normal
+MIN_LAZY_SIZE = 4096
+
+# a JSON string of base64 characters (and escapes)
+_PAYLOAD_REGEX = re.compile(
+    b'"('
+    + b"|".join(re.escape(m.encode("ascii")) for m in LAZY_MIMETYPES)
+    + rb')"\s*:\s*"([A-Za-z0-9+=/\\]*)"'
+)
+# only escaped new lines and slashes are expected in base64 strings
+_BAD_ESCAPE_REGEX = re.compile(rb"\\(?:[^n/]|$)")
+_PLACEHOLDER = "\u0000ipub-lazy-payload:"
+
+
+def _unescape(raw):
+    return raw.replace(b"\\n", b"\n").replace(b"\\/", b"/")
+
+
+class LazyPayload(object):
+    """ a base64 encoded output payload, stored in a notebook file
+
+    this is not a string, and must be resolved explicitly,
+    by ``payload.resolve()`` (or ``str(payload)``, as used when rendering
+    the value in a jinja template) to read the string content,
+    or ``payload.to_bytes()`` to decode it
+
+    payloads are identified by a hash of their content (``payload.digest``),
+    so that they can be compared (and used in cache keys) without reading them
+
+    """
+
+    def __init__(self, path, start, end, mtime, digest):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.mtime = mtime
+        self.digest = digest
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.path, self.start, self.end, self.mtime, self.digest),
+        )
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        if isinstance(other, LazyPayload):
+            return self.digest == other.digest
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, LazyPayload):
+            return self.digest != other.digest
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __bool__(self):
+        return self.end > self.start
+
+    def __repr__(self):
+        return "LazyPayload({!r}, {}, {})".format(self.path, self.start, self.end)
+
+    @property
+    def key(self):
+        """ a string identifying the payload content """
+        return "lazy-payload:sha256:" + self.digest
+
+    def _read_raw(self, chunk_size):
+        with open(self.path, "rb") as handle:
+            handle.seek(self.start)
+            remaining = self.end - self.start
+            while remaining > 0:
+                chunk = handle.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def _check_unchanged(self, chunk_size):
+        if os.stat(self.path).st_mtime_ns == self.mtime:
+            return
+        # the file has been modified, but the payload may still be the same
+        digest = hashlib.sha256()
+        for chunk in self._read_raw(chunk_size):
+            digest.update(chunk)
+        if digest.hexdigest() != self.digest:
+            raise IOError(
+                "the notebook has changed since it was read: {}".format(self.path)
+            )
+
+    def iter_raw(self, chunk_size=2 ** 20):
+        """ yield chunks of the raw (JSON escaped) payload, from the file
+
+        Raises
+        ------
+        IOError
+            if the payload in the file has changed, since it was recorded
+
+        """
+        self._check_unchanged(chunk_size)
+        for chunk in self._read_raw(chunk_size):
+            yield chunk
+
+    def resolve(self):
+        """return the (base64 encoded) string content of the payload"""
+        return _unescape(b"".join(self.iter_raw())).decode("ascii")
+
+    def __str__(self):
+        return self.resolve()
+
+    def iter_bytes(self, chunk_size=2 ** 20):
+        """yield chunks of the decoded payload"""
+        remainder = b""
+        for chunk in self.iter_raw(chunk_size):
+            chunk = remainder + chunk
+            # do not split an escape sequence
+            split = len(chunk) - 1 if chunk.endswith(b"\\") else len(chunk)
+            chunk, remainder = chunk[:split], chunk[split:]
+            data = _unescape(chunk).replace(b"\n", b"")
+            # only decode complete groups of 4 base64 characters
+            split = len(data) - len(data) % 4
+            data, leftover = data[:split], data[split:]
+            remainder = leftover + remainder
+            if data:
+                yield a2b_base64(data)
+        if remainder:
+            yield a2b_base64(_unescape(remainder).replace(b"\n", b""))
+
+    def to_bytes(self):
+        """return the decoded payload"""
+        return b"".join(self.iter_bytes())
+
+
+class LazyPayloadBytes(object):
+    """ the decoded content of a LazyPayload,
+    to store in ``resources["outputs"]``
+
+    ``bytes(obj)`` returns the content, and ``obj.write_to(handle)``
+    streams the content to a (binary) file handle
+
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __bytes__(self):
+        return self.payload.to_bytes()
+
+    def __eq__(self, other):
+        if isinstance(other, LazyPayloadBytes):
+            return self.payload == other.payload
+        return bytes(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "LazyPayloadBytes({!r})".format(self.payload)
+
+    def write_to(self, handle):
+        for chunk in self.payload.iter_bytes():
+            handle.write(chunk)
+
+
+def load_lazy_json(path, loads=json.loads):
+    """ load a notebook JSON file, with large binary outputs as LazyPayload
+
+    only payloads in cell outputs are lazy,
+    any others (e.g. cell attachments) are loaded as normal
+
+    Parameters
+    ----------
+    path: str
+    loads: callable
+        the function to parse the (reduced) JSON bytes with
+
+    Returns
+    -------
+    nb_dict: dict
+
+    """
+    path = os.path.abspath(str(path))
+    mtime = os.stat(path).st_mtime_ns
+    payloads = []
+    pieces = []
+    with open(path, "rb") as handle:
+        try:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            data = b""
+        try:
+            position = 0
+            for match in _PAYLOAD_REGEX.finditer(data):
+                start, end = match.span(2)
+                if end - start < MIN_LAZY_SIZE or _BAD_ESCAPE_REGEX.search(
+                    data, start, end
+                ):
+                    continue
+                pieces.append(data[position:start])
+                pieces.append(
+                    json.dumps(_PLACEHOLDER + str(len(payloads)))[1:-1].encode()
+                )
+                with memoryview(data) as view:
+                    digest = hashlib.sha256(view[start:end]).hexdigest()
+                payloads.append(LazyPayload(path, start, end, mtime, digest))
+                position = end
+            pieces.append(data[position:])
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    nb_dict = loads(b"".join(pieces))
+    del pieces
+    if payloads:
+        _replace_placeholders(nb_dict, payloads, in_outputs=False)
+        logger.debug(
+            "{} lazy output payloads in {}".format(len(payloads), path)
+        )
+    return nb_dict
+
+
+def _replace_placeholders(obj, payloads, in_outputs):
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, str):
+            if value.startswith(_PLACEHOLDER):
+                payload = payloads[int(value[len(_PLACEHOLDER):])]
+                obj[key] = payload if in_outputs else payload.resolve()
+        else:
+            _replace_placeholders(
+                value, payloads, in_outputs or key == "outputs"
+            )
+
+
+def materialize(obj):
+    """ recursively replace LazyPayload's with their string content
+
+    Parameters
+    ----------
+    obj: dict or list
+
+    """
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return obj
+    for key, value in list(items):
+        if isinstance(value, LazyPayload):
+            obj[key] = value.resolve()
+        else:
+            materialize(value)
+    return obj
+
+
+def _without_payloads(obj):
+    """ return the object, or a copy of it where any LazyPayload's
+    (and the containers holding them) are replaced by empty strings
+    """
+    if isinstance(obj, LazyPayload):
+        return ""
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return obj
+    copied = None
+    for key, value in items:
+        new_value = _without_payloads(value)
+        if new_value is not value:
+            if copied is None:
+                copied = copy.copy(obj)
+            copied[key] = new_value
+    return obj if copied is None else copied
+
+
+def validate_notebook(nb, **kwargs):
+    """ validate a notebook against the nbformat schema,
+    where LazyPayload's are accepted as strings, without reading them
+
+    Parameters
+    ----------
+    nb: nbformat.NotebookNode
+    kwargs:
+        passed to ``nbformat.validate``
+
+    Raises
+    ------
+    nbformat.ValidationError
+
+    """
+    # import lazily, since this module is imported at startup (via the cache)
+    import nbformat
+
+    nbformat.validate(_without_payloads(nb), **kwargs)
+
+
+def lazy_preprocess(exporter, nb, resources):
+    """ preprocess a notebook, as for ``nbconvert.Exporter._preprocess``,
+    but validating the notebook with ``validate_notebook``,
+    since the nbformat schema does not accept LazyPayload's
+
+    """
+    import nbformat
+
+    nbc = copy.deepcopy(nb)
+    resc = copy.deepcopy(resources)
+    for preprocessor in exporter._preprocessors:
+        nbc, resc = preprocessor(nbc, resc)
+        try:
+            validate_notebook(nbc, relax_add_props=True)
+        except nbformat.ValidationError:
+            exporter.log.error(
+                "Notebook is invalid after preprocessor {}".format(preprocessor)
+            )
+            raise
+    return nbc, resc
@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 # import base64
 from contextlib import contextmanager
+import copy
+import functools
 from typing import List, Tuple, Union, Dict  # noqa: F401
 import logging
 import os
 import time
 import sys
 import inspect
+import threading
 
 import traitlets as T
 from traitlets import default, validate, TraitError
@@ -14,26 +17,78 @@ from traitlets import default, validate, TraitError
 # from traitlets import validate
 from traitlets.config.configurable import Configurable
 from traitlets.config import Config
+from traitlets.utils.importstring import import_item
 from jsonextended import edict
 from six import string_types
-import jsonschema
 
 import ipypublish
 from ipypublish.utils import (
     pathlib,
     handle_error,
-    read_file_from_directory,
-    get_module_path,
     get_valid_filename,
-    find_entry_point,
 )
-from ipypublish import schema
-from ipypublish.convert.nbmerge import merge_notebooks
+from ipypublish.convert.nbmerge import (
+    combine_notebooks,
+    merge_notebooks,
+    read_notebooks,
+)
+from ipypublish.convert.execute import execute_notebooks
+from ipypublish.convert.bibcache import CACHE_NAME as BIB_CACHE_NAME
+from ipypublish.convert.cache import (
+    DEFAULT_MAX_SIZE,
+    DiskCache,
+    activate_cache,
+    default_cache_folder,
+    hash_key,
+)
+from ipypublish.convert.incremental import IncrementalTemplate
+from ipypublish.convert.lazy_outputs import lazy_preprocess, materialize
+from ipypublish.convert.pandoc_server import (
+    activate_pandoc_server,
+    get_pandoc_server,
+    start_pandoc_server,
+)
+from ipypublish.convert.validate import validate_cell_metadata, validate_nb_metadata
+from ipypublish.convert.timing import (
+    TimedPreprocessor,
+    TimedTemplate,
+    Tracer,
+    activate_tracer,
+    span,
+)
+from ipypublish.convert.result_cache import (
+    REPLAYED_POSTPROCESSORS,
+    UNCACHEABLE_POSTPROCESSORS,
+    get_changed_files,
+    get_result_key,
+    restore_result,
+    snapshot_files,
+    store_result,
+)
+from ipypublish.postprocessors.base import run_postprocessors
+from ipypublish.postprocessors.registry import load_postprocessors
 from ipypublish.convert.config_manager import (
     get_export_config_path,
     load_export_config,
     load_template,
     create_exporter_cls,
+    use_bytecode_cache,
+)
+
+
+EXECUTE_PREPROCESSOR = "nbconvert.preprocessors.ExecutePreprocessor"
+CACHED_EXECUTE_PREPROCESSOR = (
+    "ipypublish.preprocessors.execute_cached.CachedExecutePreprocessor"
+)
+EXTRACT_PREPROCESSOR = "nbconvert.preprocessors.ExtractOutputPreprocessor"
+LAZY_EXTRACT_PREPROCESSOR = (
+    "ipypublish.preprocessors.extract_lazy.LazyExtractOutputPreprocessor"
+)
+POOLED_EXECUTE_PREPROCESSOR = (
+    "ipypublish.preprocessors.kernel_pool.PooledExecutePreprocessor"
+)
+CACHED_POOLED_EXECUTE_PREPROCESSOR = (
+    "ipypublish.preprocessors.kernel_pool.CachedPooledExecutePreprocessor"
 )
 
 
@@ -112,6 +167,145 @@ class IpyPubMain(Configurable):
         ),
     ).tag(config=True)
 
+    validate_cell_metadata = T.Bool(
+        False,
+        help=(
+            "before running the exporter, validate that the metadata of all "
+            "cells is valid against the schema (reporting every invalid cell)"
+        ),
+    ).tag(config=True)
+
+    batch_pandoc = T.Bool(
+        False,
+        help=(
+            "before rendering the template, collect all ipypandoc conversions "
+            "it requests and run them in batch, "
+            "rather than launching pandoc for each one"
+        ),
+    ).tag(config=True)
+
+    pandoc_processes = T.Int(
+        1,
+        help=(
+            "the number of processes to run batched ipypandoc conversions in "
+            "(see batch_pandoc), if 0, the number of processors on the machine"
+        ),
+    ).tag(config=True)
+
+    pandoc_cache = T.Bool(
+        False,
+        help=(
+            "store the output of pandoc conversions (ipypandoc and "
+            "convert_pandoc filters) in an on-disk cache, to reuse across runs"
+        ),
+    ).tag(config=True)
+
+    bib_cache = T.Bool(
+        False,
+        help=(
+            "store parsed bibliographies (used by the ipypandoc filter, "
+            "and the LatexTagsToHTML and bibglossary preprocessors) "
+            "in an on-disk cache, to reuse across runs"
+        ),
+    ).tag(config=True)
+
+    pandoc_server = T.Bool(
+        False,
+        help=(
+            "send pandoc conversions to a long-lived pandoc server "
+            "(requires pandoc >= 3.0), started once per IpyPubMain instance "
+            "(and stopped by IpyPubMain.close), "
+            "rather than launching pandoc for each one "
+            "(falls back to launching pandoc, if the server is not available)"
+        ),
+    ).tag(config=True)
+
+    incremental = T.Bool(
+        False,
+        help=(
+            "store a manifest of the rendered cells, next to the output, "
+            "and only re-render cells that have changed since the last run"
+        ),
+    ).tag(config=True)
+
+    execution_cache = T.Bool(
+        False,
+        help=(
+            "store the outputs of notebook executions (by the ExecutePreprocessor) "
+            "in an on-disk cache, and restore them if the code is unchanged"
+        ),
+    ).tag(config=True)
+
+    kernel_pool = T.Bool(
+        False,
+        help=(
+            "execute notebooks (by the ExecutePreprocessor) with kernels "
+            "from the process's kernel pool, rather than starting a new kernel, "
+            "see ipypublish.preprocessors.kernel_pool.configure_kernel_pool"
+        ),
+    ).tag(config=True)
+
+    lazy_outputs = T.Bool(
+        False,
+        help=(
+            "load large binary outputs (e.g. images) lazily from the notebook "
+            "file(s), only decoding them when used, and streaming them to file"
+        ),
+    ).tag(config=True)
+
+    execute_processes = T.Int(
+        0,
+        help=(
+            "when converting a folder, execute each notebook separately, "
+            "in a pool of this many processes, before merging them "
+            "(if 0, the merged notebook is executed by the exporter)"
+        ),
+    ).tag(config=True)
+
+    result_cache = T.Bool(
+        False,
+        help=(
+            "store the result of each conversion in an on-disk cache, "
+            "and restore it (rather than re-converting) if the notebook, "
+            "configuration and package versions are unchanged"
+        ),
+    ).tag(config=True)
+
+    cache_folder = T.Unicode(
+        None,
+        allow_none=True,
+        help=(
+            "the folder to store on-disk caches in, "
+            "if None, will use $XDG_CACHE_HOME/ipypublish"
+        ),
+    ).tag(config=True)
+
+    cache_max_size = T.Int(
+        DEFAULT_MAX_SIZE,
+        help=(
+            "the maximum size (in bytes) of each on-disk cache, "
+            "before the least recently used entries are evicted"
+        ),
+    ).tag(config=True)
+
+    plugin_index = T.Bool(
+        True,
+        help=(
+            "persist an index of the export plugins in the cache folder, "
+            "so that they can be looked up without reading every plugin file "
+            "(the index is only kept in memory if the folder is not writable)"
+        ),
+    ).tag(config=True)
+
+    trace_file = T.Unicode(
+        None,
+        allow_none=True,
+        help=(
+            "write the timings of each stage of the conversion to this path, "
+            "in the Chrome trace-event format (see chrome://tracing)"
+        ),
+    ).tag(config=True)
+
     pre_conversion_funcs = T.Dict(
         help=(
             "a mapping of file extensions to functions that can convert"
@@ -281,15 +475,47 @@ class IpyPubMain(Configurable):
     def logger(self):
         return logging.getLogger("ipypublish")
 
+    def get_cache(self, name):
+        """return the on-disk cache for name"""
+        folder = self.cache_folder or default_cache_folder()
+        return DiskCache(os.path.join(folder, name), self.cache_max_size)
+
+    # the pandoc server of this instance (False if it could not be started)
+    _pandoc_server = None
+
+    def get_pandoc_server(self):
+        """ return the pandoc server of this instance, starting it on first use
+
+        Returns
+        -------
+        server: ipypublish.convert.pandoc_server.PandocServer or None
+            None if ``pandoc_server`` is False, or the server is not available
+
+        """
+        if not self.pandoc_server:
+            return None
+        if self._pandoc_server is None:
+            with span("start_pandoc_server"):
+                self._pandoc_server = start_pandoc_server() or False
+        return self._pandoc_server or None
+
+    def close(self):
+        """ stop the pandoc server of this instance, if it was started
+
+        a new server is started, if the instance is used again
+        """
+        if self._pandoc_server:
+            self._pandoc_server.close()
+        self._pandoc_server = None
+
     @contextmanager
     def _log_handlers(self, ipynb_name, outdir):
 
         root = logging.getLogger()
-        root_level = root.level
         log_handlers = []
 
         try:
-            root.setLevel(logging.DEBUG)
+            _acquire_root_level()
 
             if self.log_to_stdout:
                 # setup logging to terminal
@@ -323,10 +549,10 @@ class IpyPubMain(Configurable):
 
         finally:
 
-            root.setLevel(root_level)
             for handler in log_handlers:
                 handler.close()
                 root.removeHandler(handler)
+            _release_root_level()
 
     def __init__(self, config=None):
         """
@@ -372,7 +598,9 @@ class IpyPubMain(Configurable):
         --------
         outdata: dict
             containing keys;
-            "outpath", "exporter", "stream", "main_filepath", "resources"
+            "outpath", "exporter", "stream", "main_filepath", "resources",
+            "result_cache" ("hit", "miss" or None, if the cache was not used),
+            "timings" (see ``ipypublish.convert.timing.Tracer.summary``)
 
         """
         # setup the input and output paths
@@ -385,7 +613,8 @@ class IpyPubMain(Configurable):
             else str(self.outpath)
         )
 
-        with self._log_handlers(ipynb_name, outdir):
+        tracer = Tracer()
+        with self._log_handlers(ipynb_name, outdir), activate_tracer(tracer):
 
             if not ipynb_path.exists() and not nb_node:
                 handle_error(
@@ -414,7 +643,8 @@ class IpyPubMain(Configurable):
                     "running pre-conversion with: {}".format(inspect.getmodule(func))
                 )
                 try:
-                    nb_node = func(ipynb_path)
+                    with span("pre_conversion"):
+                        nb_node = func(ipynb_path)
                 except Exception as err:
                     handle_error(
                         "pre-conversion failed for {}: {}".format(ipynb_path, err),
@@ -429,38 +659,31 @@ class IpyPubMain(Configurable):
             #         'pre-converter: {}'.format(ipynb_ext),
             # TypeError, self.logger)
 
+            # the separate notebooks read from a folder, as (path, notebook)
+            notebooks = []
             if nb_node is None:
                 # merge all notebooks
                 # TODO allow notebooks to remain separate
                 # (would require creating a main.tex with the preamble in etc )
                 # Could make everything a 'PyProcess',
                 # with support for multiple streams
-                final_nb, meta_path = merge_notebooks(
-                    ipynb_path, ignore_prefix=self.ignore_prefix
-                )
+                # the exporter validates the notebook (after each preprocessor)
+                with span("merge_notebooks"):
+                    final_nb, meta_path = merge_notebooks(
+                        ipynb_path,
+                        ignore_prefix=self.ignore_prefix,
+                        validate=False,
+                        lazy_outputs=self.lazy_outputs,
+                        read_func=functools.partial(self._read_notebooks, notebooks),
+                    )
             else:
                 final_nb, meta_path = (nb_node, ipynb_path)
 
             # validate the notebook metadata against the schema
             if self.validate_nb_metadata:
-                nb_metadata_schema = read_file_from_directory(
-                    get_module_path(schema),
-                    "doc_metadata.schema.json",
-                    "doc_metadata.schema",
-                    self.logger,
-                    interp_ext=True,
-                )
-                try:
-                    jsonschema.validate(final_nb.metadata, nb_metadata_schema)
-                except jsonschema.ValidationError as err:
-                    handle_error(
-                        "validation of notebook level metadata failed: {}\n"
-                        "see the doc_metadata.schema.json for full spec".format(
-                            err.message
-                        ),
-                        jsonschema.ValidationError,
-                        logger=self.logger,
-                    )
+                self._validate_nb_metadata(final_nb)
+            if self.validate_cell_metadata:
+                self._validate_cell_metadata(final_nb)
 
             # set text replacements for export configuration
             replacements = {
@@ -473,36 +696,132 @@ class IpyPubMain(Configurable):
             self.logger.debug("notebooks meta path: {}".format(meta_path))
 
             # load configuration file
-            (
-                exporter_cls,
-                jinja_template,
-                econfig,
-                pprocs,
-                pconfig,
-            ) = self._load_config_file(replacements)
-
-            # run nbconvert
-            self.logger.info("running nbconvert")
-            exporter, stream, resources = self.export_notebook(
-                final_nb, exporter_cls, econfig, jinja_template
-            )
+            with span("load_config"):
+                (
+                    exporter_cls,
+                    jinja_template,
+                    econfig,
+                    pprocs,
+                    pconfig,
+                ) = self._load_config_file(replacements)
+
+            result_cache, result_key, result = None, None, None
+            if self.result_cache:
+                uncacheable = set(pprocs).intersection(UNCACHEABLE_POSTPROCESSORS)
+                if uncacheable:
+                    self.logger.info(
+                        "not using the result cache, since the post-processors "
+                        "can not be restored: {}".format(sorted(uncacheable))
+                    )
+                else:
+                    result_cache = self.get_cache("results")
+                    with span("restore_result"):
+                        result_key = get_result_key(
+                            final_nb,
+                            econfig,
+                            jinja_template,
+                            pprocs,
+                            pconfig,
+                            os.path.join(outdir, ipynb_name),
+                        )
+                        result = restore_result(
+                            result_cache,
+                            result_key,
+                            outdir,
+                            before_restore=functools.partial(
+                                self._replay_postprocessors,
+                                [p for p in pprocs if p in REPLAYED_POSTPROCESSORS],
+                                pconfig,
+                                exporter_cls,
+                                econfig,
+                                jinja_template,
+                                os.path.join(outdir, ipynb_name),
+                            ),
+                        )
+                    self.logger.info(
+                        "result cache {}".format("miss" if result is None else "hit")
+                    )
 
-            # postprocess results
-            main_filepath = os.path.join(outdir, ipynb_name + exporter.file_extension)
+            if result is not None:
+                # skip the conversion and post-processing
+                exporter = self._create_exporter(exporter_cls, econfig, jinja_template)
+                stream, main_filepath, resources = result
+            else:
+                if self.execute_processes and notebooks:
+                    with span("execute_separately"):
+                        executed_nb, econfig = self._execute_separately(
+                            notebooks, final_nb, econfig
+                        )
+                    if executed_nb is not None:
+                        final_nb = executed_nb
+
+                # run nbconvert
+                self.logger.info("running nbconvert")
+                pandoc_cache = self.get_cache("pandoc") if self.pandoc_cache else None
+                bib_cache = self.get_cache(BIB_CACHE_NAME) if self.bib_cache else None
+                # use the server of this instance, or an already active one
+                # (e.g. started for a Sphinx build)
+                pandoc_server = self.get_pandoc_server() or get_pandoc_server()
+                with activate_cache("pandoc", pandoc_cache), activate_cache(
+                    BIB_CACHE_NAME, bib_cache
+                ), activate_pandoc_server(pandoc_server), span("export"):
+                    exporter, stream, resources = self.export_notebook(
+                        final_nb,
+                        exporter_cls,
+                        econfig,
+                        jinja_template,
+                        manifest_path=(
+                            os.path.join(outdir, ipynb_name + ".ipubmanifest.json")
+                            if self.incremental
+                            else None
+                        ),
+                    )
 
-            for post_proc_name in pprocs:
-                proc_class = find_entry_point(
-                    post_proc_name,
-                    "ipypublish.postprocessors",
-                    self.logger,
-                    "ipypublish",
+                # postprocess results
+                main_filepath = os.path.join(
+                    outdir, ipynb_name + exporter.file_extension
                 )
-                proc = proc_class(pconfig)
-                stream, main_filepath, resources = proc.postprocess(
-                    stream, exporter.output_mimetype, main_filepath, resources
+                files_folder = replacements[self.files_folder_placeholder]
+                if result_cache is not None:
+                    snapshot = snapshot_files(outdir, ipynb_name, files_folder)
+
+                with span("postprocess"):
+                    stream, main_filepath, resources = run_postprocessors(
+                        load_postprocessors(pprocs, pconfig, self.logger),
+                        stream,
+                        exporter.output_mimetype,
+                        main_filepath,
+                        resources,
+                    )
+
+                if result_cache is not None:
+                    files = get_changed_files(
+                        snapshot, snapshot_files(outdir, ipynb_name, files_folder)
+                    )
+                    with span("store_result"):
+                        store_result(
+                            result_cache,
+                            result_key,
+                            stream,
+                            main_filepath,
+                            resources,
+                            outdir,
+                            files,
+                        )
+
+            timings = tracer.summary()
+            for name, stage in timings["stages"].items():
+                self.logger.debug(
+                    "timing: {0} ({1} call(s)) {2:.3f}s".format(
+                        name, stage["count"], stage["duration"]
+                    )
                 )
+            if self.trace_file:
+                tracer.write_trace(self.trace_file)
 
-            self.logger.info("process finished successfully")
+            self.logger.info(
+                "process finished successfully in {:.2f}s".format(timings["total"])
+            )
 
         return {
             "outpath": outdir,
@@ -510,8 +829,22 @@ class IpyPubMain(Configurable):
             "stream": stream,
             "main_filepath": main_filepath,
             "resources": resources,
+            "result_cache": (
+                None if result_cache is None else ("miss" if result is None else "hit")
+            ),
+            "timings": timings,
         }
 
+    def _validate_nb_metadata(self, final_nb):
+        """validate the notebook metadata against the schema"""
+        with span("validate_metadata"):
+            validate_nb_metadata(final_nb, self.logger)
+
+    def _validate_cell_metadata(self, final_nb):
+        """validate the metadata of all cells against the schema"""
+        with span("validate_cell_metadata", cells=len(final_nb.cells)):
+            validate_cell_metadata(final_nb, self.logger)
+
     def _load_config_file(self, replacements):
         # find conversion configuration
         self.logger.info("finding conversion configuration: {}".format(self.conversion))
@@ -526,7 +859,13 @@ class IpyPubMain(Configurable):
         else:
             # else search internally
             export_config_path = get_export_config_path(
-                self.conversion, self.plugin_folder_paths
+                self.conversion,
+                self.plugin_folder_paths,
+                index_folder=(
+                    (self.cache_folder or default_cache_folder())
+                    if self.plugin_index
+                    else None
+                ),
             )
 
         if export_config_path is None:
@@ -543,7 +882,8 @@ class IpyPubMain(Configurable):
         exporter_cls = create_exporter_cls(data["exporter"]["class"])
         self.logger.info("creating template and loading filters")
         template_name = "template_file"
-        jinja_template = load_template(template_name, data["template"])
+        with span("load_template", "template"):
+            jinja_template = load_template(template_name, data["template"])
         self.logger.info("creating process configuration")
         export_config = self._create_export_config(
             data["exporter"], template_name, replacements
@@ -560,7 +900,35 @@ class IpyPubMain(Configurable):
         exporter_name = exporter_data["class"].split(".")[-1]
 
         config[exporter_name + ".template_file"] = template_name
-        config[exporter_name + ".filters"] = exporter_data.get("filters", [])
+        # replace nbconvert's filter with one that is timed,
+        # and uses the active pandoc cache and server
+        filters = dict(exporter_data.get("filters", {}))
+        filters.setdefault(
+            "convert_pandoc", "ipypublish.filters.filters.convert_pandoc"
+        )
+        config[exporter_name + ".filters"] = filters
+
+        # replace nbconvert's default preprocessors with alternative versions
+        replace_preprocessors = {}
+        if self.execution_cache or self.kernel_pool:
+            replace_preprocessors[EXECUTE_PREPROCESSOR] = (
+                self._get_execute_preprocessor()
+            )
+        if self.lazy_outputs:
+            replace_preprocessors[EXTRACT_PREPROCESSOR] = LAZY_EXTRACT_PREPROCESSOR
+        if replace_preprocessors:
+            traits = create_exporter_cls(exporter_data["class"]).class_traits()
+            if "default_preprocessors" in traits:
+                config[exporter_name + ".default_preprocessors"] = [
+                    replace_preprocessors.get(cls, cls)
+                    for cls in traits["default_preprocessors"].default()
+                ]
+        if self.execution_cache:
+            folder = self.cache_folder or default_cache_folder()
+            config["CachedExecutePreprocessor.cache_folder"] = os.path.join(
+                folder, "execution"
+            )
+            config["CachedExecutePreprocessor.cache_max_size"] = self.cache_max_size
 
         preprocessors = []
         for preproc in exporter_data.get("preprocessors", []):
@@ -581,6 +949,78 @@ class IpyPubMain(Configurable):
 
         return dict_to_config(final_config, True)
 
+    def _get_execute_preprocessor(self):
+        """return the import string of the preprocessor to execute notebooks"""
+        return {
+            (False, False): EXECUTE_PREPROCESSOR,
+            (True, False): CACHED_EXECUTE_PREPROCESSOR,
+            (False, True): POOLED_EXECUTE_PREPROCESSOR,
+            (True, True): CACHED_POOLED_EXECUTE_PREPROCESSOR,
+        }[(self.execution_cache, self.kernel_pool)]
+
+    def _replay_postprocessors(
+        self, pprocs, pconfig, exporter_cls, config, jinja_template, main_path
+    ):
+        """ run the post-processors that remove existing files,
+        before a conversion result is restored from the cache
+        """
+        if not pprocs:
+            return
+        exporter = self._create_exporter(exporter_cls, config, jinja_template)
+        run_postprocessors(
+            load_postprocessors(pprocs, pconfig, self.logger),
+            "",
+            exporter.output_mimetype,
+            main_path + exporter.file_extension,
+            {},
+        )
+
+    def _read_notebooks(self, notebooks, paths):
+        """ read notebooks (as ``merge_notebooks`` read_func),
+        and record them in ``notebooks``, as (path, notebook)
+        """
+        nbs = read_notebooks(paths, validate=False, lazy_outputs=self.lazy_outputs)
+        notebooks.extend(zip(paths, nbs))
+        return nbs
+
+    def _execute_separately(self, notebooks, final_nb, econfig):
+        """ execute each notebook read from a folder separately (in parallel),
+        then merge them
+
+        Parameters
+        ----------
+        notebooks: list[tuple]
+            (path, notebook) for each notebook in the folder
+        final_nb: nbformat.NotebookNode
+            the merged notebook
+        econfig: traitlets.config.Config
+
+        Returns
+        -------
+        final_nb: nbformat.NotebookNode or None
+            None, if execution is not enabled in the export configuration
+        econfig: traitlets.config.Config
+            the export configuration, with execution disabled
+
+        """
+        execute_cls = self._get_execute_preprocessor()
+        if not import_item(execute_cls)(config=econfig).enabled:
+            return None, econfig
+        paths, nbs = zip(*notebooks)
+        executed_nb = combine_notebooks(
+            execute_notebooks(
+                nbs,
+                paths,
+                preprocessor_class=execute_cls,
+                config=econfig,
+                processes=self.execute_processes,
+            )
+        )
+        executed_nb.metadata.name = final_nb.metadata.name
+        econfig = copy.deepcopy(econfig)
+        econfig.ExecutePreprocessor.enabled = False
+        return executed_nb, econfig
+
     def _create_pproc_config(self, pproc_data, replacements):
 
         if "order" in pproc_data:
@@ -598,8 +1038,7 @@ class IpyPubMain(Configurable):
 
         return pprocs_list, pproc_config
 
-    def export_notebook(self, final_nb, exporter_cls, config, jinja_template):
-
+    def _create_exporter(self, exporter_cls, config, jinja_template):
         kwargs = {"config": config}
         if jinja_template is not None:
             kwargs["extra_loaders"] = [jinja_template]
@@ -611,11 +1050,144 @@ class IpyPubMain(Configurable):
                 "the arguments: {}".format(list(kwargs.keys()))
             )
             exporter = exporter_cls()
+        use_bytecode_cache(exporter)
+        return exporter
+
+    def export_notebook(
+        self, final_nb, exporter_cls, config, jinja_template, manifest_path=None
+    ):
+
+        with span("create_exporter"):
+            exporter = self._create_exporter(exporter_cls, config, jinja_template)
+        exporter._preprocessors = [
+            TimedPreprocessor(proc) for proc in exporter._preprocessors
+        ]
+        if self.lazy_outputs:
+            if hasattr(exporter, "_load_template"):
+                # lazy payloads are resolved when the template renders them
+                exporter._preprocess = functools.partial(lazy_preprocess, exporter)
+            else:
+                # other exporters (e.g. to notebook JSON) require strings
+                final_nb = materialize(copy.deepcopy(final_nb))
+
+        # the templates are wrapped when they are loaded,
+        # since the exporter may register filters that they use
+        # at the start of from_notebook_node
+        incremental = []
+        if manifest_path is not None and hasattr(exporter, "_load_template"):
+            config_key = hash_key(config, getattr(jinja_template, "mapping", None))
+
+            def wrap_incremental(template):
+                incremental.append(
+                    IncrementalTemplate(
+                        template, manifest_path, config_key, self.logger
+                    )
+                )
+                return incremental[-1]
+
+            wrap_template(exporter, wrap_incremental)
+
+        if self.batch_pandoc and hasattr(exporter, "_load_template"):
+            wrap_template(
+                exporter,
+                lambda template: PandocBatchTemplate(
+                    template, self.logger, self.pandoc_processes
+                ),
+            )
+
+        if hasattr(exporter, "_load_template"):
+            load_template_func = exporter._load_template
+
+            def load_timed_template():
+                with span("compile_template", "template"):
+                    return TimedTemplate(load_template_func())
+
+            exporter._load_template = load_timed_template
 
         body, resources = exporter.from_notebook_node(final_nb)
+
+        for template in incremental:
+            template.save_manifest()
         return exporter, body, resources
 
 
+# the level of the root logger is set to DEBUG, while any publish is running,
+# then restored once they have all finished
+_ROOT_LEVEL_LOCK = threading.Lock()
+_ROOT_LEVEL_STATE = {"count": 0, "level": None}
+
+
+def _acquire_root_level():
+    with _ROOT_LEVEL_LOCK:
+        root = logging.getLogger()
+        if _ROOT_LEVEL_STATE["count"] == 0:
+            _ROOT_LEVEL_STATE["level"] = root.level
+            root.setLevel(logging.DEBUG)
+        _ROOT_LEVEL_STATE["count"] += 1
+
+
+def _release_root_level():
+    with _ROOT_LEVEL_LOCK:
+        _ROOT_LEVEL_STATE["count"] -= 1
+        if _ROOT_LEVEL_STATE["count"] == 0:
+            logging.getLogger().setLevel(_ROOT_LEVEL_STATE["level"])
+
+
+def wrap_template(exporter, wrapper):
+    """ wrap the template of a TemplateExporter, when it is loaded
+
+    Parameters
+    ----------
+    exporter: nbconvert.exporters.TemplateExporter
+    wrapper: callable
+        template -> wrapped_template
+
+    """
+    load_template = exporter._load_template
+    exporter._load_template = lambda: wrapper(load_template())
+
+
+class PandocBatchTemplate(object):
+    """wrap a jinja template, so that rendering is performed in two passes;
+    the first collects all requests to the ipypandoc filter,
+    which are then converted in batch (see ``jinja_filter_batch``),
+    and the second renders the template, using the converted strings
+
+    Parameters
+    ----------
+    template: jinja2.Template
+    logger: logging.Logger
+    processes: int
+        the number of processes to split the conversions across,
+        if 0, the number of processors on the machine
+
+    """
+
+    def __init__(self, template, logger, processes=1):
+        self._template = template
+        self._logger = logger
+        self._processes = processes
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, *args, **kwargs):
+        from ipypublish.filters_pandoc.main import (
+            collect_requests,
+            use_batch_results,
+            jinja_filter_batch,
+        )
+
+        with collect_requests() as requests:
+            self._template.render(*args, **kwargs)
+        self._logger.info(
+            "batch converting {} ipypandoc request(s)".format(len(requests))
+        )
+        results = jinja_filter_batch(requests, self._processes)
+        with use_batch_results(results):
+            return self._template.render(*args, **kwargs)
+
+
 def replace_placeholders(mapping, replacements):
     """ recurse through a mapping and perform (in-place) string replacements
 
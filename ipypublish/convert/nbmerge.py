@@ -8,18 +8,38 @@ python nbmerge.py directory_name > merged.ipynb
 """
 from __future__ import print_function
 
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import itertools
+import json
 import logging
 import os
 import re
 import sys
+import time
 
 import nbformat
 from six import string_types
 
 from ipypublish.utils import pathlib, handle_error
+from ipypublish.convert.lazy_outputs import (
+    load_lazy_json,
+    materialize,
+    validate_notebook,
+)
 
 logger = logging.getLogger("nbmerge")
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+
+        def json_loads(data):
+            return json.loads(data.decode("utf-8"))
+
 
 def alphanumeric_sort(l):
     """sort key.name alphanumerically
@@ -39,7 +59,165 @@ def alphanumeric_sort(l):
     return sorted(l, key=alphanum_key)
 
 
-def merge_notebooks(ipynb_path, ignore_prefix="_", to_str=False, as_version=4):
+def _output_size(nb):
+    """return the total length of the (string) output data in a notebook"""
+    size = 0
+    for cell in nb.get("cells", []):
+        for output in cell.get("outputs", []):
+            for value in output.get("data", {}).values():
+                if isinstance(value, string_types):
+                    size += len(value)
+            if isinstance(output.get("text", None), string_types):
+                size += len(output["text"])
+    return size
+
+
+def read_notebook(ipynb_path, as_version=4, validate=True, lazy_outputs=False):
+    """ read a notebook file
+
+    the JSON is parsed with orjson or ujson, if available
+
+    Parameters
+    ----------
+    ipynb_path: str or pathlib.Path
+    as_version: int
+        notebook format vesion
+    validate: bool
+        validate the notebook against the nbformat schema
+        (as for ``nbformat.read``, errors are logged, not raised)
+    lazy_outputs: bool
+        load large binary outputs as ``LazyPayload``,
+        which are only read from the file when used
+        (see ``ipypublish.convert.lazy_outputs``)
+
+    Returns
+    -------
+    nb: nbformat.NotebookNode
+
+    """
+    if isinstance(ipynb_path, string_types):
+        ipynb_path = pathlib.Path(ipynb_path)
+    start_time = time.time()
+    if lazy_outputs:
+        file_size = ipynb_path.stat().st_size
+        nb_dict = load_lazy_json(str(ipynb_path), loads=json_loads)
+    else:
+        with ipynb_path.open("rb") as f:
+            data = f.read()
+        file_size = len(data)
+        nb_dict = json_loads(data)
+        del data
+    major, minor = nbformat.reader.get_version(nb_dict)
+    if major not in nbformat.versions:
+        raise nbformat.NBFormatError("Unsupported nbformat version %s" % major)
+    nb = nbformat.versions[major].to_notebook_json(nb_dict, minor=minor)
+    if as_version is not nbformat.NO_CONVERT:
+        nb = nbformat.convert(nb, as_version)
+    if validate:
+        try:
+            validate_notebook(nb)
+        except nbformat.ValidationError as err:
+            logger.error("Notebook JSON is invalid: {}".format(err))
+    logger.debug(
+        "read {0}: {1:.1f}MB file, {2} cells, {3:.1f}MB of outputs in {4:.3f}s".format(
+            ipynb_path.name,
+            file_size / 2 ** 20,
+            len(nb.get("cells", [])),
+            _output_size(nb) / 2 ** 20,
+            time.time() - start_time,
+        )
+    )
+    return nb
+
+
+def read_notebooks(
+    paths, as_version=4, validate=True, max_workers=None, lazy_outputs=False
+):
+    """ read notebook files concurrently, in a pool of threads
+
+    Parameters
+    ----------
+    paths: list[pathlib.Path]
+    as_version: int
+        notebook format vesion
+    validate: bool
+        validate each notebook against the nbformat schema
+    max_workers: int or None
+        the maximum number of threads to use
+    lazy_outputs: bool
+        load large binary outputs lazily (see ``read_notebook``)
+
+    Returns
+    -------
+    nbs: list[nbformat.NotebookNode]
+        in the same order as paths
+
+    """
+    paths = list(paths)
+
+    def read(path):
+        return read_notebook(path, as_version, validate, lazy_outputs)
+
+    if len(paths) <= 1 or max_workers == 1:
+        return [read(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(read, paths))
+
+
+def find_notebooks(ipynb_path, ignore_prefix="_"):
+    """ find the notebooks in a directory, to be merged
+
+    Parameters
+    ----------
+    ipynb_path: str or pathlib.Path
+    ignore_prefix : str
+        ignore filename starting with this prefix
+
+    Returns
+    -------
+    paths: list[pathlib.Path]
+        sorted alphanumerically
+
+    """
+    if isinstance(ipynb_path, string_types):
+        ipynb_path = pathlib.Path(ipynb_path)
+    return [
+        ipath
+        for ipath in alphanumeric_sort(ipynb_path.glob("*.ipynb"))
+        if not os.path.basename(ipath.name).startswith(ignore_prefix)
+    ]
+
+
+def combine_notebooks(nbs):
+    """ combine notebooks into one, with the metadata taken from the first
+
+    the notebooks themselves are not modified
+
+    Parameters
+    ----------
+    nbs: list[nbformat.NotebookNode]
+
+    Returns
+    -------
+    nb: nbformat.NotebookNode
+
+    """
+    final_nb = copy.copy(nbs[0])
+    final_nb.metadata = copy.copy(nbs[0].metadata)
+    final_nb.cells = list(itertools.chain.from_iterable(nb.cells for nb in nbs))
+    return final_nb
+
+
+def merge_notebooks(
+    ipynb_path,
+    ignore_prefix="_",
+    to_str=False,
+    as_version=4,
+    read_func=None,
+    validate=True,
+    max_workers=None,
+    lazy_outputs=False,
+):
     """ merge one or more ipynb's,
     if more than one, then the meta data is taken from the first
 
@@ -52,6 +230,18 @@ def merge_notebooks(ipynb_path, ignore_prefix="_", to_str=False, as_version=4):
         return as a string, else return nbformat object
     as_version: int
         notebook format vesion
+    read_func: callable or None
+        if ipynb_path is a directory, a function ``read_func(paths)``,
+        to return the notebook for each path, in the same order
+        (e.g. to read and execute them in parallel).
+        If None, the notebooks are read concurrently, with ``read_notebooks``
+    validate: bool
+        validate the (merged) notebook against the nbformat schema,
+        errors are logged, not raised
+    max_workers: int or None
+        the maximum number of threads to read notebooks with
+    lazy_outputs: bool
+        load large binary outputs lazily (see ``read_notebook``)
 
     Returns
     ------
@@ -71,46 +261,45 @@ def merge_notebooks(ipynb_path, ignore_prefix="_", to_str=False, as_version=4):
     final_nb = None
     if ipynb_path.is_dir():
         logger.info("Merging all notebooks in directory")
-        for ipath in alphanumeric_sort(ipynb_path.glob("*.ipynb")):
-            if os.path.basename(ipath.name).startswith(ignore_prefix):
-                continue
-            with ipath.open("r", encoding="utf-8") as f:
-                if (
-                    sys.version_info.major == 3
-                    and sys.version_info.minor < 6
-                    and "win" not in sys.platform
-                ):
-                    data = f.read()
-                    if hasattr(data, "decode"):
-                        data = data.decode("utf-8")
-                    nb = nbformat.reads(data, as_version=as_version)
-                else:
-                    nb = nbformat.read(f, as_version=as_version)
-            if final_nb is None:
-                meta_path = ipath
-                final_nb = nb
-            else:
-                final_nb.cells.extend(nb.cells)
+        start_time = time.time()
+        paths = find_notebooks(ipynb_path, ignore_prefix)
+        if read_func is None:
+            # each notebook is validated once merged, rather than individually
+            nbs = read_notebooks(
+                paths,
+                as_version,
+                validate=False,
+                max_workers=max_workers,
+                lazy_outputs=lazy_outputs,
+            )
+        else:
+            nbs = read_func(paths)
+        if nbs:
+            meta_path = paths[0]
+            final_nb = combine_notebooks(nbs)
+        logger.info(
+            "read {0} notebooks in {1:.3f}s".format(
+                len(nbs), time.time() - start_time
+            )
+        )
     else:
         logger.info("Reading notebook")
-        with ipynb_path.open("r", encoding="utf-8") as f:
-            if (
-                sys.version_info.major == 3
-                and sys.version_info.minor < 6
-                and "win" not in sys.platform
-            ):
-                data = f.read()
-                if hasattr(data, "decode"):
-                    data = data.decode("utf-8")
-                final_nb = nbformat.reads(data, as_version=as_version)
-            else:
-                final_nb = nbformat.read(f, as_version=as_version)
+        final_nb = read_notebook(
+            ipynb_path, as_version, validate=False, lazy_outputs=lazy_outputs
+        )
         meta_path = ipynb_path
+
+    if validate and final_nb is not None:
+        try:
+            validate_notebook(final_nb)
+        except nbformat.ValidationError as err:
+            logger.error("Notebook JSON is invalid: {}".format(err))
     if not hasattr(final_nb.metadata, "name"):
         final_nb.metadata.name = ""
     final_nb.metadata.name += "_merged"
 
     if to_str:
+        materialize(final_nb)
         if sys.version_info > (3, 0):
             return nbformat.writes(final_nb)
         else:
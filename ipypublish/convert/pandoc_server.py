@@ -0,0 +1,294 @@
+"""a long-lived pandoc server, to convert text without a subprocess per call
+
+pandoc (>= 3.0) can run as a web server (``pandoc-server``, or ``pandoc server``),
+converting documents sent to it as JSON over HTTP.
+Whilst a server is active (see ``activate_pandoc_server``),
+the conversions of ``ipypublish.filters_pandoc.utils``
+(and the ``convert_pandoc`` jinja filter) are sent to it,
+over a keep-alive connection (one per thread).
+If no server binary is available, the conversions fall back to subprocesses.
+
+"""
+from contextlib import contextmanager
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import weakref
+
+from http.client import HTTPConnection, HTTPException
+
+logger = logging.getLogger("pandoc_server")
+
+# the server activated for the current conversion(s)
+_ACTIVE = {"server": None}
+
+
+class PandocServerError(IOError):
+    """an error returned by the pandoc server"""
+
+
+def find_server_command(pandoc="pandoc"):
+    """ find the command to start a pandoc server
+
+    Returns
+    -------
+    command: list[str] or None
+        None if no pandoc server is available
+
+    """
+    server_path = shutil.which("pandoc-server")
+    if server_path is not None:
+        return [server_path]
+    pandoc_path = shutil.which(pandoc)
+    if pandoc_path is None:
+        return None
+    try:
+        version = subprocess.check_output([pandoc_path, "--version"])
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    match = re.match(r"pandoc[^\s]*\s+([0-9]+)", version.decode("utf8", "replace"))
+    if match and int(match.group(1)) >= 3:
+        return [pandoc_path, "server"]
+    return None
+
+
+def _free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class PandocServer(object):
+    """ a pandoc server, running in a subprocess
+
+    Parameters
+    ----------
+    command: list[str] or None
+        the command to start the server, if None use ``find_server_command``
+    timeout: int
+        the maximum number of seconds a single conversion may take
+    startup_timeout: float
+        seconds to wait for the server to start
+
+    """
+
+    def __init__(self, command=None, timeout=120, startup_timeout=10):
+        self.command = command
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.port = None
+        self._process = None
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._version = None
+        self._finalizer = None
+
+    @property
+    def running(self):
+        if self._process is None:
+            return False
+        if os.getpid() != self._pid:
+            # a forked process can not poll the server, but may still use it
+            return True
+        return self._process.poll() is None
+
+    def start(self):
+        """ start the server, and wait for it to respond
+
+        Returns
+        -------
+        started: bool
+            False if no pandoc server is available, or it failed to start
+
+        """
+        if self.running:
+            return True
+        command = self.command or find_server_command()
+        if command is None:
+            logger.info("no pandoc server available, using subprocesses")
+            return False
+        self.port = _free_port()
+        try:
+            self._process = subprocess.Popen(
+                command + ["--port", str(self.port), "--timeout", str(self.timeout)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as err:
+            logger.warning("could not start the pandoc server: {}".format(err))
+            return False
+        self._finalizer = weakref.finalize(self, _terminate, self._process)
+
+        start = time.time()
+        while time.time() - start < self.startup_timeout:
+            if self._process.poll() is not None:
+                break
+            try:
+                self._version = self._request("GET", "/version").strip()
+            except (OSError, HTTPException):
+                self._reset_connection()
+                time.sleep(0.05)
+                continue
+            logger.info(
+                "started pandoc server {} on port {}".format(self._version, self.port)
+            )
+            return True
+
+        logger.warning("the pandoc server failed to start, using subprocesses")
+        self.close()
+        return False
+
+    def close(self):
+        """stop the server (only by the process that started it)"""
+        self._reset_connection()
+        if self._finalizer is not None and os.getpid() == self._pid:
+            self._finalizer()
+        self._process = None
+
+    @property
+    def version(self):
+        """the version of pandoc, run by the server"""
+        return self._version
+
+    def _connection(self):
+        # connections are not shared between threads or (forked) processes
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.connection = None
+            self._local.pid = os.getpid()
+        if self._local.connection is None:
+            self._local.connection = HTTPConnection(
+                "127.0.0.1", self.port, timeout=self.timeout + 10
+            )
+        return self._local.connection
+
+    def _reset_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+        self._local.connection = None
+
+    def _request(self, method, path, body=None, headers=None):
+        connection = self._connection()
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read().decode("utf8")
+        except Exception:
+            # the connection may have been closed by the server
+            self._reset_connection()
+            raise
+        if response.status != 200:
+            raise PandocServerError(
+                "pandoc server error ({}): {}".format(response.status, data.strip())
+            )
+        return data
+
+    def convert(self, text, from_format, to_format, standalone=False):
+        """ convert text with the server
+
+        Parameters
+        ----------
+        text: str
+        from_format: str
+        to_format: str
+        standalone: bool
+
+        Returns
+        -------
+        output: str
+
+        """
+        body = json.dumps(
+            {
+                "text": text,
+                "from": from_format,
+                "to": to_format,
+                "standalone": standalone,
+            }
+        ).encode("utf8")
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        try:
+            data = self._request("POST", "/", body, headers)
+        except PandocServerError:
+            raise
+        except (OSError, HTTPException):
+            # the keep-alive connection may have timed out, so retry once
+            data = self._request("POST", "/", body, headers)
+        result = json.loads(data)
+        if "error" in result:
+            raise PandocServerError("pandoc server error: {}".format(result["error"]))
+        for message in result.get("messages", []):
+            logger.debug("pandoc: {}".format(message))
+        if result.get("base64", False):
+            raise PandocServerError(
+                "pandoc server returned binary output for: " + to_format
+            )
+        return result["output"]
+
+
+def _terminate(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def start_pandoc_server(**kwargs):
+    """ start a pandoc server
+
+    Returns
+    -------
+    server: PandocServer or None
+        None if no server could be started
+
+    """
+    server = PandocServer(**kwargs)
+    return server if server.start() else None
+
+
+@contextmanager
+def activate_pandoc_server(server):
+    """ within this context, pandoc conversions are sent to the server
+
+    Parameters
+    ----------
+    server: PandocServer or None
+
+    """
+    previous = set_pandoc_server(server)
+    try:
+        yield server
+    finally:
+        set_pandoc_server(previous)
+
+
+def set_pandoc_server(server):
+    """ set the active server, returning the previous one
+
+    Parameters
+    ----------
+    server: PandocServer or None
+
+    """
+    previous = _ACTIVE["server"]
+    _ACTIVE["server"] = server
+    return previous
+
+
+def get_pandoc_server():
+    """return the active server, or None if there is none (or it has stopped)"""
+    server = _ACTIVE["server"]
+    if server is not None and server.running:
+        return server
+    return None
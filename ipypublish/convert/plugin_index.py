@@ -0,0 +1,161 @@
+"""an index of the export plugins in a set of folders,
+which may be persisted to a (cache) folder, so that plugins can be looked up
+and listed without reading every plugin file
+"""
+from collections import OrderedDict
+import glob
+import io
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger("plugin_index")
+
+INDEX_VERSION = 1
+INDEX_FILE_NAME = "plugin_index.json"
+
+# {index_path: {folder: {"mtime": int, "plugins": {name: info}}}},
+# where the index_path is None, for indexes that are not persisted
+_INDEXES = {}
+# index paths that could not be written to
+_UNWRITABLE = set()
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index_path(index_folder):
+    """return the path of the persisted index, or None if not persisted"""
+    if index_folder is None:
+        return None
+    return os.path.join(str(index_folder), INDEX_FILE_NAME)
+
+
+def _get_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_plugin_info(path, mtime):
+    """read the information required to list a plugin (without validation)"""
+    info = {"path": path, "mtime": mtime, "class": None, "description": None}
+    try:
+        with io.open(path, encoding="utf8") as handle:
+            data = json.load(handle)
+        info["class"] = data["exporter"]["class"]
+        info["description"] = data["description"]
+    except Exception as err:
+        # the error is raised, if the plugin is loaded
+        info["error"] = "{}: {}".format(type(err).__name__, err)
+    return info
+
+
+def _load_index(path):
+    if path in _INDEXES:
+        return _INDEXES[path]
+    folders = {}
+    if path is not None and os.path.exists(path):
+        try:
+            with io.open(path, encoding="utf8") as handle:
+                data = json.load(handle)
+            if data.get("version", None) == INDEX_VERSION:
+                folders = data["folders"]
+        except (IOError, ValueError) as err:
+            logger.debug("could not read plugin index {}: {}".format(path, err))
+    _INDEXES[path] = folders
+    return folders
+
+
+def _save_index(path, folders):
+    if path is None or path in _UNWRITABLE:
+        return
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with io.open(temp_path, "w", encoding="utf8") as handle:
+            handle.write(
+                json.dumps({"version": INDEX_VERSION, "folders": folders}, indent=1)
+            )
+        os.replace(temp_path, path)
+    except (IOError, OSError) as err:
+        # the index is then only kept in memory (e.g. for a read-only folder)
+        logger.debug("could not write plugin index {}: {}".format(path, err))
+        _UNWRITABLE.add(path)
+
+
+def _update_folder(folders, folder, check_files):
+    """ update the index for a single folder, if it has changed
+
+    Returns
+    -------
+    changed: bool
+
+    """
+    mtime = _get_mtime(folder)
+    entry = folders.get(folder, None)
+    if entry is not None and entry["mtime"] == mtime and not check_files:
+        return False
+
+    old_plugins = {} if entry is None else entry["plugins"]
+    plugins = OrderedDict()
+    for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        file_mtime = _get_mtime(path)
+        old_info = old_plugins.get(name, None)
+        if old_info is not None and old_info["mtime"] == file_mtime:
+            plugins[name] = old_info
+        else:
+            plugins[name] = _read_plugin_info(path, file_mtime)
+
+    changed = entry is None or entry["mtime"] != mtime or plugins != old_plugins
+    folders[folder] = {"mtime": mtime, "plugins": plugins}
+    return changed
+
+
+def get_plugin_index(folder_paths, check_files=False, index_folder=None):
+    """ return an index of the plugins in each folder
+
+    folders are re-indexed if their mtime has changed,
+    i.e. a plugin has been added or removed
+
+    Parameters
+    ----------
+    folder_paths: list of str
+    check_files: bool
+        also check if the mtime of any plugin file has changed,
+        i.e. its class or description may have changed
+    index_folder: str or None
+        the folder to persist the index in, if None the index is only
+        kept in memory (it is also only kept in memory,
+        if the folder can not be written to)
+
+    Returns
+    -------
+    index: list
+        [(folder, {name: {"path", "mtime", "class", "description"}}), ...]
+
+    """
+    folder_paths = [os.path.abspath(str(p)) for p in folder_paths]
+    path = get_index_path(index_folder)
+    with _INDEX_LOCK:
+        folders = _load_index(path)
+        changed = False
+        for folder in folder_paths:
+            changed = _update_folder(folders, folder, check_files) or changed
+        if changed:
+            _save_index(path, folders)
+        return [(folder, folders[folder]["plugins"]) for folder in folder_paths]
+
+
+def clear_index(index_folder=None):
+    """ remove the in-memory indexes,
+    and the persisted index in index_folder (if not None)
+    """
+    with _INDEX_LOCK:
+        _INDEXES.clear()
+        _UNWRITABLE.clear()
+        path = get_index_path(index_folder)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
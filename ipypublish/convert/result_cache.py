@@ -0,0 +1,323 @@
+"""a cache of whole document conversion results,
+such that unchanged notebooks can be restored without being re-converted
+
+each result is stored as a record (the stream, resources and a manifest
+of the files written by the post-processors) and the content of each
+file is stored separately, keyed by its hash, so that it is only stored
+once across results
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+
+from ipypublish.convert.cache import hash_key
+from ipypublish.utils import pathlib
+
+logger = logging.getLogger("result_cache")
+
+RECORD_VERSION = 2
+
+# blobs are keyed by the sha256 of their content
+_BLOB_KEY_REGEX = re.compile("^[0-9a-f]{64}$")
+
+# post-processors with side effects that can not be restored from the cache
+UNCACHEABLE_POSTPROCESSORS = ("run-sphinx", "reveal-server", "write-stream")
+
+# post-processors that remove existing files,
+# which are run again before a result is restored
+REPLAYED_POSTPROCESSORS = ("remove-folder",)
+
+# files in the output folder, that are not outputs of the conversion
+IGNORE_SUFFIXES = (".nbpub.log", ".ipubmanifest.json")
+
+# resources keys containing the paths to files that the conversion depends on
+DEPENDENCY_KEYS = ("external_file_paths", "bibliopath", "bibglosspath")
+
+
+def _get_versions():
+    import nbconvert
+    from ipypublish import __version__
+
+    try:
+        from nbconvert.utils.pandoc import get_pandoc_version
+
+        pandoc_version = get_pandoc_version()
+    except Exception:
+        pandoc_version = None
+    return {
+        "ipypublish": __version__,
+        "nbconvert": nbconvert.__version__,
+        "pandoc": pandoc_version,
+    }
+
+
+def get_result_key(notebook, export_config, template, pprocs, pproc_config, outpath):
+    """ create a key for a conversion result
+
+    Parameters
+    ----------
+    notebook: nbformat.NotebookNode
+        the (merged) notebook
+    export_config: traitlets.config.Config
+        the exporter configuration, with placeholders replaced
+    template: jinja2.DictLoader or None
+        the loader for the jinja template
+    pprocs: list of str
+        the post-processors to run
+    pproc_config: dict
+        the post-processors configuration, with placeholders replaced
+    outpath: str
+        the path to the main file
+
+    """
+    return hash_key(
+        "result",
+        RECORD_VERSION,
+        _get_versions(),
+        notebook,
+        export_config,
+        getattr(template, "mapping", None),
+        pprocs,
+        pproc_config,
+        outpath,
+    )
+
+
+def _get_stat(path):
+    try:
+        stat = os.stat(str(path))
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def snapshot_files(outdir, ipynb_name, files_folder):
+    """ return the state of the files that the post-processors may write
+
+    these are files in outdir named ``<ipynb_name>.*``
+    (except log and manifest files) and all files in the files folder
+
+    Returns
+    -------
+    dict
+        {relative_path: [mtime, size]}
+
+    """
+    snapshot = {}
+    if not os.path.isdir(outdir):
+        return snapshot
+    for name in os.listdir(outdir):
+        path = os.path.join(outdir, name)
+        if (
+            name.startswith(ipynb_name + ".")
+            and not name.endswith(IGNORE_SUFFIXES)
+            and os.path.isfile(path)
+        ):
+            snapshot[name] = _get_stat(path)
+    folder = os.path.join(outdir, files_folder)
+    for root, _, filenames in os.walk(folder):
+        for name in filenames:
+            path = os.path.join(root, name)
+            snapshot[os.path.relpath(path, outdir)] = _get_stat(path)
+    return snapshot
+
+
+def _get_dependencies(resources):
+    dependencies = {}
+    for key in DEPENDENCY_KEYS:
+        paths = resources.get(key, None)
+        if not paths:
+            continue
+        if not isinstance(paths, (list, tuple, set)):
+            paths = [paths]
+        for path in paths:
+            path = os.path.abspath(str(path))
+            dependencies[path] = _get_stat(path)
+    return dependencies
+
+
+def _set_blob(cache, content):
+    key = hashlib.sha256(content).hexdigest()
+    if key not in cache:
+        cache.set_bytes(key, content)
+    return key
+
+
+def _encode_resources(resources):
+    """return the JSON serialisable resources, any others are not stored"""
+    encoded = {}
+    for name, value in resources.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            logger.debug("not storing unserialisable resources: {}".format(name))
+            continue
+        encoded[name] = value
+    return encoded
+
+
+def _is_relative_path(path):
+    return (
+        isinstance(path, str)
+        and not os.path.isabs(path)
+        and os.path.normpath(path).split(os.sep)[0] != os.pardir
+    )
+
+
+def _is_blob_map(obj):
+    return isinstance(obj, dict) and all(
+        isinstance(blob_key, str) and _BLOB_KEY_REGEX.match(blob_key)
+        for blob_key in obj.values()
+    )
+
+
+def _decode_record(data):
+    """ decode a stored record,
+    returning None if it is not JSON of the expected format
+    """
+    try:
+        record = json.loads(data.decode("utf8"))
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    if not isinstance(record.get("stream"), str):
+        return None
+    main_filepath = record.get("main_filepath")
+    if main_filepath is not None and not _is_relative_path(main_filepath):
+        return None
+    if not isinstance(record.get("resources"), dict):
+        return None
+    if not _is_blob_map(record.get("outputs")):
+        return None
+    files = record.get("files")
+    if not _is_blob_map(files) or not all(_is_relative_path(p) for p in files):
+        return None
+    dependencies = record.get("dependencies")
+    if not isinstance(dependencies, dict) or not all(
+        stat is None
+        or (
+            isinstance(stat, list)
+            and len(stat) == 2
+            and all(isinstance(value, int) for value in stat)
+        )
+        for stat in dependencies.values()
+    ):
+        return None
+    return record
+
+
+def get_changed_files(before, after):
+    """return the relative paths of files added or modified between snapshots"""
+    return sorted(path for path, stat in after.items() if before.get(path) != stat)
+
+
+def store_result(cache, key, stream, main_filepath, resources, outdir, files):
+    """ store a conversion result in the cache
+
+    Parameters
+    ----------
+    cache: ipypublish.convert.cache.DiskCache
+    key: str
+    stream: str
+    main_filepath: str or None
+    resources: dict
+    outdir: str
+    files: list of str
+        the paths (relative to outdir) of files written by the post-processors
+
+    Returns
+    -------
+    stored: bool
+
+    """
+    resources = copy.copy(resources)
+    outputs = resources.pop("outputs", None) or {}
+    try:
+        file_blobs = {}
+        for relpath in files:
+            with open(os.path.join(outdir, relpath), "rb") as handle:
+                file_blobs[relpath] = _set_blob(cache, handle.read())
+        record = {
+            "stream": stream,
+            "main_filepath": (
+                None
+                if main_filepath is None
+                else os.path.relpath(str(main_filepath), outdir)
+            ),
+            "resources": _encode_resources(resources),
+            "outputs": {
+                name: _set_blob(cache, bytes(content))
+                for name, content in outputs.items()
+            },
+            "files": file_blobs,
+            "dependencies": _get_dependencies(resources),
+        }
+        cache.set(key, json.dumps(record))
+    except Exception as err:
+        logger.warning("could not store the conversion result: {}".format(err))
+        return False
+    return True
+
+
+def restore_result(cache, key, outdir, before_restore=None):
+    """ restore a conversion result from the cache
+
+    the files written by the post-processors are restored to outdir
+
+    Parameters
+    ----------
+    cache: ipypublish.convert.cache.DiskCache
+    key: str
+    outdir: str
+    before_restore: callable or None
+        a function to call before the files are restored (if the result is valid),
+        e.g. to run the post-processors in ``REPLAYED_POSTPROCESSORS``
+
+    Returns
+    -------
+    result: tuple or None
+        (stream, main_filepath, resources),
+        or None if there is no valid result in the cache
+
+    """
+    data = cache.get_bytes(key)
+    if data is None:
+        return None
+    record = _decode_record(data)
+    if record is None:
+        logger.debug("could not load the conversion result: {}".format(key))
+        return None
+
+    for path, stat in record["dependencies"].items():
+        if _get_stat(path) != stat:
+            logger.debug("conversion dependency has changed: {}".format(path))
+            return None
+
+    blobs = {}
+    for blob_key in set(record["outputs"].values()).union(record["files"].values()):
+        blobs[blob_key] = cache.get_bytes(blob_key)
+        if blobs[blob_key] is None:
+            logger.debug("conversion result file has been evicted: {}".format(key))
+            return None
+
+    if before_restore is not None:
+        before_restore()
+    for relpath, blob_key in record["files"].items():
+        path = os.path.join(outdir, relpath)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as handle:
+            handle.write(blobs[blob_key])
+
+    resources = record["resources"]
+    resources["outputs"] = {
+        name: blobs[blob_key] for name, blob_key in record["outputs"].items()
+    }
+    main_filepath = record["main_filepath"]
+    if main_filepath is not None:
+        main_filepath = pathlib.Path(os.path.join(outdir, main_filepath))
+    return record["stream"], main_filepath, resources
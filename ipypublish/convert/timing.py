@@ -0,0 +1,180 @@
+"""timing of the stages of a conversion
+
+spans are recorded by the active tracer (see ``activate_tracer``),
+and can be summarised, or exported in the Chrome trace-event format
+(viewable in chrome://tracing or https://ui.perfetto.dev)
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("timing")
+
+# the tracer activated for the current conversion
+_ACTIVE = {"tracer": None}
+
+
+class Tracer(object):
+    """ a thread-safe recorder of timed spans
+
+    each span is recorded as a dict with keys;
+    "name", "cat", "start" and "duration" (in seconds, relative to
+    the creation of the tracer), "tid" and "args"
+
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.events = []
+
+    @contextmanager
+    def span(self, name, cat="ipypublish", **args):
+        """record the time taken by the code within this context"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "cat": cat,
+                "start": start - self._origin,
+                "duration": end - start,
+                "tid": threading.current_thread().ident,
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def summary(self):
+        """ summarise the recorded spans
+
+        Returns
+        -------
+        summary: dict
+            containing keys; "total" (the time since the tracer was created),
+            and "stages", a mapping of span names to their
+            "cat", "count" and (total) "duration", in order of first occurrence
+
+        """
+        stages = OrderedDict()
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["start"])
+        for event in events:
+            stage = stages.setdefault(
+                event["name"], {"cat": event["cat"], "count": 0, "duration": 0.0}
+            )
+            stage["count"] += 1
+            stage["duration"] += event["duration"]
+        return {"total": time.perf_counter() - self._origin, "stages": stages}
+
+    def to_chrome_trace(self):
+        """return the spans in the Chrome trace-event format"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        return {
+            "traceEvents": [
+                {
+                    "name": event["name"],
+                    "cat": event["cat"],
+                    "ph": "X",
+                    "ts": event["start"] * 1e6,
+                    "dur": event["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": event["tid"],
+                    "args": {k: str(v) for k, v in event["args"].items()},
+                }
+                for event in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_trace(self, path):
+        """write the spans to a Chrome trace-event JSON file"""
+        path = str(path)
+        if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as handle:
+            json.dump(self.to_chrome_trace(), handle)
+        logger.info("trace written to: {}".format(path))
+
+
+@contextmanager
+def activate_tracer(tracer):
+    """ within this context, spans are recorded by the tracer
+
+    Parameters
+    ----------
+    tracer: Tracer or None
+
+    """
+    previous = _ACTIVE["tracer"]
+    _ACTIVE["tracer"] = tracer
+    try:
+        yield tracer
+    finally:
+        _ACTIVE["tracer"] = previous
+
+
+def get_tracer():
+    """return the active tracer, or None if there is none"""
+    return _ACTIVE["tracer"]
+
+
+@contextmanager
+def span(name, cat="ipypublish", **args):
+    """ record the time taken by the code within this context,
+    if a tracer is active
+
+    Parameters
+    ----------
+    name: str
+    cat: str
+        the category of the span
+    args:
+        additional data to store with the span
+
+    """
+    tracer = _ACTIVE["tracer"]
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, cat, **args):
+        yield
+
+
+class TimedPreprocessor(object):
+    """wrap an nbconvert preprocessor, to record the time it takes"""
+
+    def __init__(self, preprocessor):
+        self._preprocessor = preprocessor
+        self._name = "preprocess:{}".format(
+            getattr(preprocessor, "__name__", type(preprocessor).__name__)
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._preprocessor, name)
+
+    def __call__(self, nb, resources):
+        with span(self._name, "preprocessor"):
+            return self._preprocessor(nb, resources)
+
+
+class TimedTemplate(object):
+    """wrap a jinja template, to record the time it takes to render"""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, *args, **kwargs):
+        with span("render_template", "template"):
+            return self._template.render(*args, **kwargs)
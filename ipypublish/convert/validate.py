@@ -0,0 +1,158 @@
+"""validation of notebook and cell metadata, against the ipypublish schemas
+
+validators are compiled once per process (with fastjsonschema, if available,
+otherwise by creating a single jsonschema validator instance),
+and cached for later use
+"""
+import logging
+import threading
+
+import jsonschema
+
+from ipypublish import schema
+from ipypublish.utils import get_module_path, handle_error, read_file_from_directory
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+logger = logging.getLogger("validate")
+
+DOC_METADATA_SCHEMA = "doc_metadata.schema.json"
+CELL_METADATA_SCHEMA = "cell_metadata.schema.json"
+
+# validators, by schema file name
+_VALIDATORS = {}
+_VALIDATORS_LOCK = threading.Lock()
+
+
+def _compile_validator(schema_data):
+    """ compile a function, which returns the error message for some data,
+    or None if it is valid
+    """
+    if fastjsonschema is not None:
+        # do not write the schema defaults into the data being validated
+        compiled = fastjsonschema.compile(schema_data, use_default=False)
+
+        def validator(data):
+            try:
+                compiled(data)
+            except fastjsonschema.JsonSchemaValueException as err:
+                return err.message
+            return None
+
+        return validator
+
+    validator_cls = jsonschema.validators.validator_for(schema_data)
+    validator_cls.check_schema(schema_data)
+    instance = validator_cls(schema_data)
+
+    def validator(data):
+        error = jsonschema.exceptions.best_match(instance.iter_errors(data))
+        if error is None:
+            return None
+        path = ".".join(["data"] + [str(p) for p in error.absolute_path])
+        return "{}: {}".format(path, error.message)
+
+    return validator
+
+
+def get_validator(schema_file):
+    """ return the (cached) validator for a schema in ``ipypublish.schema``
+
+    Parameters
+    ----------
+    schema_file: str
+        e.g. "doc_metadata.schema.json"
+
+    Returns
+    -------
+    validator: callable
+        data -> error message, or None if the data is valid
+
+    """
+    with _VALIDATORS_LOCK:
+        if schema_file not in _VALIDATORS:
+            schema_data = read_file_from_directory(
+                get_module_path(schema),
+                schema_file,
+                "metadata schema",
+                logger,
+                interp_ext=True,
+            )
+            _VALIDATORS[schema_file] = _compile_validator(schema_data)
+        return _VALIDATORS[schema_file]
+
+
+def validate_nb_metadata(nb, logger=logger):
+    """ validate the notebook level metadata
+
+    Parameters
+    ----------
+    nb: nbformat.NotebookNode
+    logger: logging.Logger
+
+    Raises
+    ------
+    jsonschema.ValidationError
+
+    """
+    message = get_validator(DOC_METADATA_SCHEMA)(nb.metadata)
+    if message is not None:
+        handle_error(
+            "validation of notebook level metadata failed: {}\n"
+            "see the {} for full spec".format(message, DOC_METADATA_SCHEMA),
+            jsonschema.ValidationError,
+            logger=logger,
+        )
+
+
+def iter_cell_metadata_errors(nb):
+    """ validate the metadata of all cells in a notebook
+
+    Parameters
+    ----------
+    nb: nbformat.NotebookNode
+
+    Yields
+    ------
+    (index, message): tuple
+        the index of each invalid cell, and the (first) error message for it
+
+    """
+    validator = get_validator(CELL_METADATA_SCHEMA)
+    for index, cell in enumerate(nb.cells):
+        message = validator(cell.metadata)
+        if message is not None:
+            yield index, message
+
+
+def validate_cell_metadata(nb, logger=logger):
+    """ validate the metadata of all cells in a notebook,
+    and report all the invalid cells together
+
+    Parameters
+    ----------
+    nb: nbformat.NotebookNode
+    logger: logging.Logger
+
+    Raises
+    ------
+    jsonschema.ValidationError
+
+    """
+    errors = list(iter_cell_metadata_errors(nb))
+    if errors:
+        handle_error(
+            "validation of cell level metadata failed for {} cell(s):\n{}\n"
+            "see the {} for full spec".format(
+                len(errors),
+                "\n".join(
+                    "- cell {}: {}".format(index, message) for index, message in errors
+                ),
+                CELL_METADATA_SCHEMA,
+            ),
+            jsonschema.ValidationError,
+            logger=logger,
+        )
@@ -118,83 +118,114 @@ def _ansi2anything(text, converter, escapechar):
     fixConsole() in notebook/notebook/static/base/js/utils.js.
 
     """
+    if "\x1b" not in text:
+        # fast path, for text with no escape sequences
+        starttag, endtag = converter(None, None, False, escapechar)
+        if starttag.startswith(escapechar) and endtag.endswith(escapechar):
+            text = escape_latex(text)
+        return starttag + text + endtag if text else ""
+
     fg, bg = None, None
     bold = False
-    numbers = []
     out = []
-
-    while text:
-        m = _ANSI_RE.search(text)
-        if m:
-            if m.group(2) == "m":
-                try:
-                    numbers = [int(n) if n else 0 for n in m.group(1).split(";")]
-                except ValueError:
-                    pass  # Invalid color specification
-            else:
-                pass  # Not a color code
-            chunk, text = text[: m.start()], text[m.end() :]
-        else:
-            chunk, text = text, ""
-
+    # {(fg, bg, bold): (starttag, endtag, escape)}
+    tags = {}
+    # {(fg, bg, bold, codes): (fg, bg, bold)}
+    transitions = {}
+    position = 0
+
+    for m in _ANSI_RE.finditer(text):
+        chunk, position = text[position : m.start()], m.end()
         if chunk:
             if bold and fg in range(8):
                 fg += 8
-            starttag, endtag = converter(fg, bg, bold, escapechar)
-            out.append(starttag)
-            if starttag.startswith(escapechar) and endtag.endswith(escapechar):
-                chunk = escape_latex(chunk)
-            out.append(chunk)
-            out.append(endtag)
-
-        while numbers:
-            n = numbers.pop(0)
-            if n == 0:
-                fg = bg = None
-                bold = False
-            elif n in (1, 5):
-                bold = True
-            elif n in (21, 22):
-                bold = False
-            elif 30 <= n <= 37:
-                fg = n - 30
-            elif n == 38:
-                try:
-                    fg = _get_extended_color(numbers)
-                except ValueError:
-                    numbers.clear()
-            elif n == 39:
-                fg = None
-            elif 40 <= n <= 47:
-                bg = n - 40
-            elif n == 48:
-                try:
-                    bg = _get_extended_color(numbers)
-                except ValueError:
-                    numbers.clear()
-            elif n == 49:
-                bg = None
-            elif 90 <= n <= 97:
-                fg = n - 90 + 8
-            elif 100 <= n <= 107:
-                bg = n - 100 + 8
-            else:
-                pass  # Unknown codes are ignored
+            _append_chunk(out, chunk, (fg, bg, bold), converter, escapechar, tags)
+        if m.group(2) != "m":
+            continue  # Not a color code
+        key = (fg, bg, bold, m.group(1))
+        if key not in transitions:
+            try:
+                # reversed, so that numbers can be popped from the end
+                numbers = [int(n) if n else 0 for n in m.group(1).split(";")][::-1]
+            except ValueError:
+                numbers = []  # Invalid color specification
+            transitions[key] = _apply_codes(numbers, fg, bg, bold)
+        fg, bg, bold = transitions[key]
+
+    chunk = text[position:]
+    if chunk:
+        if bold and fg in range(8):
+            fg += 8
+        _append_chunk(out, chunk, (fg, bg, bold), converter, escapechar, tags)
     return "".join(out)
 
 
+def _append_chunk(out, chunk, state, converter, escapechar, tags):
+    """append the converted chunk of text to out,
+    using the table of tags already computed for each (fg, bg, bold) state
+    """
+    if state not in tags:
+        fg, bg, bold = state
+        starttag, endtag = converter(fg, bg, bold, escapechar)
+        escape = starttag.startswith(escapechar) and endtag.endswith(escapechar)
+        tags[state] = (starttag, endtag, escape)
+    starttag, endtag, escape = tags[state]
+    out.append(starttag)
+    out.append(escape_latex(chunk) if escape else chunk)
+    out.append(endtag)
+
+
+def _apply_codes(numbers, fg, bg, bold):
+    """apply the (reversed) list of SGR codes to the current state"""
+    while numbers:
+        n = numbers.pop()
+        if n == 0:
+            fg = bg = None
+            bold = False
+        elif n in (1, 5):
+            bold = True
+        elif n in (21, 22):
+            bold = False
+        elif 30 <= n <= 37:
+            fg = n - 30
+        elif n == 38:
+            try:
+                fg = _get_extended_color(numbers)
+            except ValueError:
+                del numbers[:]
+        elif n == 39:
+            fg = None
+        elif 40 <= n <= 47:
+            bg = n - 40
+        elif n == 48:
+            try:
+                bg = _get_extended_color(numbers)
+            except ValueError:
+                del numbers[:]
+        elif n == 49:
+            bg = None
+        elif 90 <= n <= 97:
+            fg = n - 90 + 8
+        elif 100 <= n <= 107:
+            bg = n - 100 + 8
+        else:
+            pass  # Unknown codes are ignored
+    return fg, bg, bold
+
+
 def _get_extended_color(numbers):
-    n = numbers.pop(0)
+    """pop an extended color from the (reversed) list of codes"""
+    n = numbers.pop()
     if n == 2 and len(numbers) >= 3:
         # 24-bit RGB
-        r = numbers.pop(0)
-        g = numbers.pop(0)
-        b = numbers.pop(0)
+        r = numbers.pop()
+        g = numbers.pop()
+        b = numbers.pop()
         if not all(0 <= c <= 255 for c in (r, g, b)):
             raise ValueError()
     elif n == 5 and len(numbers) >= 1:
         # 256 colors
-        idx = numbers.pop(0)
+        idx = numbers.pop()
         if idx < 0:
             raise ValueError()
         elif idx < 16:
@@ -2,6 +2,11 @@ from collections import OrderedDict
 import re
 import os
 from six import string_types
+from nbconvert.filters import convert_pandoc as nbconvert_pandoc
+
+from ipypublish.convert.cache import cached_pandoc
+from ipypublish.convert.pandoc_server import get_pandoc_server
+from ipypublish.convert.timing import span
 
 
 def strip_ext(path):
@@ -291,6 +296,28 @@ def is_equation(text):
         return False
 
 
+def convert_pandoc(source, from_format, to_format, extra_args=None):
+    """a version of nbconvert's convert_pandoc filter,
+    which uses the active pandoc cache (see ipypublish.convert.cache),
+    and the active pandoc server (see ipypublish.convert.pandoc_server),
+    if there are any
+    """
+    with span("convert_pandoc", "filter", to_format=to_format):
+        return cached_pandoc(
+            ("convert_pandoc", source, from_format, to_format, extra_args),
+            lambda: _run_pandoc(source, from_format, to_format, extra_args),
+        )
+
+
+def _run_pandoc(source, from_format, to_format, extra_args):
+    server = get_pandoc_server()
+    with span("pandoc", "pandoc"):
+        if server is not None and not extra_args:
+            # as for nbconvert.utils.pandoc.pandoc
+            return server.convert(source, from_format, to_format).rstrip("\n")
+        return nbconvert_pandoc(source, from_format, to_format, extra_args)
+
+
 if __name__ == "__main__":
 
     print(dict_to_kwds(["a", "c"], "e,b,d=3"))
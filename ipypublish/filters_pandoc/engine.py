@@ -0,0 +1,268 @@
+""" an engine to run a chain of panflute filters, in as few tree walks as possible
+
+``panflute.run_filters`` walks the whole document once per action.
+Here, each filter module declares a ``FilterStage``, with the element types
+each of its actions applies to, and the engine fuses the actions of
+consecutive stages into a single post-order walk, dispatching on the element
+type (with a cached table, rather than testing every action against
+every element).
+
+The output is the same as running the stages sequentially, provided that:
+
+- a stage which relies on the *whole* document having been processed by the
+  previous stages (e.g. to read document level state they record),
+  or whose prepare function does, is declared with ``barrier=True``,
+  and so starts a new walk
+- an action only reads the element it is applied to and its direct children
+  (and their neighbours), unless the element's type is declared in
+  ``reads_content``; the children of these elements are only processed
+  by the actions preceding it, before it is applied
+  (as they would be in a sequential run)
+- finalize functions only act on state specific to their stage
+
+New elements, created by an action, are only walked by the subsequent actions,
+in the same way that they would be by the subsequent walks of a sequential run.
+
+"""
+from itertools import chain
+
+import panflute as pf
+from panflute.containers import DictContainer, ListContainer
+
+
+class FilterAction(object):
+    """ a panflute action, with the element types it applies to
+
+    Parameters
+    ----------
+    func: callable
+        (element, doc) -> None or element(s), as for ``panflute.run_filter``
+    types: tuple
+        the element types that the action may alter,
+        for all other elements it must return None (or the element unaltered)
+    reads_content: tuple
+        the element types for which the action reads the content of the element
+        (beyond its direct children)
+
+    """
+
+    def __init__(self, func, types, reads_content=()):
+        self.func = func
+        self.types = tuple(types)
+        self.reads_content = tuple(reads_content)
+
+    def __repr__(self):
+        return "FilterAction({})".format(self.func.__name__)
+
+
+class FilterStage(object):
+    """ a panflute filter, declared as a sequence of actions
+
+    Parameters
+    ----------
+    name: str
+    actions: list[FilterAction]
+        applied in order, as for ``panflute.run_filters``
+    prepare: callable or None
+        doc -> None, called before the actions are applied
+    finalize: callable or None
+        doc -> None, called after the actions are applied
+    barrier: bool
+        if True, the stage's prepare function and actions
+        are only called after all previous stages have finished
+
+    """
+
+    def __init__(self, name, actions, prepare=None, finalize=None, barrier=False):
+        self.name = name
+        self.actions = list(actions)
+        self.prepare = prepare
+        self.finalize = finalize
+        self.barrier = barrier
+
+    def __repr__(self):
+        return "FilterStage({})".format(self.name)
+
+
+def plan_walks(stages):
+    """ group the stages into fused walks, split at barriers
+
+    Returns
+    -------
+    walks: list[list[FilterStage]]
+
+    """
+    walks = []
+    for stage in stages:
+        if stage.barrier or not walks:
+            walks.append([])
+        walks[-1].append(stage)
+    return walks
+
+
+class _FusedWalk(object):
+    """ a post-order walk, applying multiple actions to each element
+
+    The progress of each element is recorded, as the number of actions
+    that have been applied to it, and all of its descendants.
+    """
+
+    def __init__(self, actions):
+        self._actions = [action.func for action in actions]
+        self._types = [action.types for action in actions]
+        self._reads = [action.reads_content for action in actions]
+        self._dispatch = {}
+        # id -> (element, progress), the element is kept alive, so the id is unique
+        self._progress = {}
+
+    def _get_actions(self, cls):
+        """ return the indices of the actions which apply to an element type,
+        and of those which read its content
+        """
+        dispatch = self._dispatch.get(cls, None)
+        if dispatch is None:
+            indices = tuple(
+                i for i, types in enumerate(self._types) if issubclass(cls, types)
+            )
+            reads = [i for i in indices if issubclass(cls, self._reads[i])]
+            dispatch = self._dispatch[cls] = (indices, reads)
+        return dispatch
+
+    def _get_progress(self, elem):
+        return self._progress.get(id(elem), (None, 0))[1]
+
+    def _set_progress(self, elem, progress):
+        self._progress[id(elem)] = (elem, progress)
+
+    def _mark_new(self, elem, progress, root=True):
+        """ set the progress of new elements, created by an action,
+        which are only to be seen by subsequent actions
+
+        Returns
+        -------
+        marked: bool
+            whether any new elements were found
+
+        """
+        if not root and id(elem) in self._progress:
+            return False
+        marked = not root
+        if marked:
+            self._set_progress(elem, progress)
+        for child in elem._children:
+            obj = getattr(elem, child)
+            if isinstance(obj, pf.Element):
+                marked = self._mark_new(obj, progress, False) or marked
+            elif isinstance(obj, ListContainer):
+                for item in obj:
+                    marked = self._mark_new(item, progress, False) or marked
+            elif isinstance(obj, DictContainer):
+                for item in obj.values():
+                    marked = self._mark_new(item, progress, False) or marked
+        return marked
+
+    def walk(self, elem, doc, upto):
+        """ apply all actions, with index < upto, to the element and its children
+        (as for ``panflute.Element.walk``)
+
+        Returns
+        -------
+        elem: panflute.Element or list[panflute.Element]
+
+        """
+        progress = self._get_progress(elem)
+        if progress >= upto:
+            return elem
+        indices, reads = self._get_actions(type(elem))
+        # the children must only be walked by the actions up to (and including)
+        # the first action that reads the content of this element
+        stop = upto
+        for index in reads:
+            if progress <= index < upto:
+                stop = index + 1
+                break
+        self._walk_children(elem, doc, stop)
+
+        for index in indices:
+            if not progress <= index < stop:
+                continue
+            altered = self._actions[index](elem, doc)
+            if altered is None:
+                continue
+            if altered is elem and not self._mark_new(elem, index + 1):
+                # altered in place, with no new children to walk
+                continue
+            # new elements, created by the action, are only seen by later actions
+            self._set_progress(elem, index + 1)
+            if type(altered) is list:
+                for item in altered:
+                    self._mark_new(item, index + 1, id(item) in self._progress)
+                return _flatten([self.walk(item, doc, upto) for item in altered])
+            self._mark_new(altered, index + 1, id(altered) in self._progress)
+            return self.walk(altered, doc, upto)
+
+        self._set_progress(elem, stop)
+        if stop < upto:
+            return self.walk(elem, doc, upto)
+        return elem
+
+    def _walk_children(self, elem, doc, upto):
+        for child in elem._children:
+            obj = getattr(elem, child)
+            if isinstance(obj, pf.Element):
+                ans = self.walk(obj, doc, upto)
+            elif isinstance(obj, ListContainer):
+                ans = _flatten([self.walk(item, doc, upto) for item in obj])
+            elif isinstance(obj, DictContainer):
+                ans = [(k, self.walk(v, doc, upto)) for k, v in obj.items()]
+                ans = [(k, v) for k, v in ans if v != []]
+            elif obj is None:
+                ans = None  # empty table headers or captions
+            else:
+                raise TypeError(type(obj))
+            setattr(elem, child, ans)
+
+
+def _flatten(items):
+    return list(
+        chain.from_iterable(item if type(item) is list else (item,) for item in items)
+    )
+
+
+def run_stages(doc, stages):
+    """ apply the filter stages to the document,
+    fusing their actions into as few walks as possible
+
+    Parameters
+    ----------
+    doc: panflute.Doc
+    stages: list[FilterStage]
+
+    Returns
+    -------
+    doc: panflute.Doc
+
+    """
+    for walk_stages in plan_walks(stages):
+        for stage in walk_stages:
+            if stage.prepare is not None:
+                stage.prepare(doc)
+        actions = [action for stage in walk_stages for action in stage.actions]
+        if actions:
+            doc = _FusedWalk(actions).walk(doc, doc, len(actions))
+        for stage in walk_stages:
+            if stage.finalize is not None:
+                stage.finalize(doc)
+    return doc
+
+
+def compose_stages(*stages):
+    """ create a panflute filter function (doc -> doc),
+    which runs the stages with ``run_stages``
+    """
+
+    def fused_filter(doc):
+        return run_stages(doc, stages)
+
+    fused_filter.__name__ = "fused_" + "_".join(stage.name for stage in stages)
+    return fused_filter
@@ -7,6 +7,7 @@ first to access the functionality below:
 from panflute import Element, Doc, Span, Cite  # noqa: F401
 import panflute as pf
 
+from ipypublish.filters_pandoc.engine import FilterAction, FilterStage
 from ipypublish.filters_pandoc.definitions import (
     ATTRIBUTE_CITE_CLASS,
     CONVERTED_CITE_CLASS,
@@ -239,5 +240,19 @@ def main(doc=None, strip_spans=True):
     return pf.run_filters(to_run, prepare, finalize, doc=doc)
 
 
+# html citations are numbered from the complete $$references,
+# so all labels must be resolved before this stage starts
+STAGE = FilterStage(
+    "format_cite_elements",
+    [
+        FilterAction(format_cites, (pf.Cite,)),
+        FilterAction(strip_cite_spans, (pf.Span,)),
+    ],
+    prepare,
+    finalize,
+    barrier=True,
+)
+
+
 if __name__ == "__main__":
     main()
@@ -26,7 +26,13 @@ import re
 from panflute import Element, Doc, Span, Div, Math, Image, Table  # noqa: F401
 import panflute as pf
 
-from ipypublish.filters_pandoc.utils import convert_units, convert_attributes
+from ipypublish.filters_pandoc.engine import FilterAction, FilterStage
+from ipypublish.filters_pandoc.utils import (
+    convert_text,
+    convert_units,
+    convert_attributes,
+    run_pandoc,
+)
 from ipypublish.filters_pandoc.prepare_labels import (
     LABELLED_IMAGE_CLASS,
     LABELLED_MATH_CLASS,
@@ -164,7 +170,7 @@ def format_image(image, doc):
         new_doc = Doc(pf.Para(*image.content))
         new_doc.api_version = doc.api_version
         if image.content:
-            caption = pf.run_pandoc(
+            caption = run_pandoc(
                 json.dumps(new_doc.to_json()), args=["-f", "json", "-t", "latex"]
             ).strip()
         else:
@@ -278,7 +284,7 @@ def format_table(table, doc):
         if attributes:
             tbl_doc = pf.Doc(table)
             tbl_doc.api_version = doc.api_version
-            tbl_str = pf.convert_text(
+            tbl_str = convert_text(
                 tbl_doc, input_format="panflute", output_format="rst"
             )
 
@@ -358,5 +364,18 @@ def main(doc=None, strip_spans=True):
     return pf.run_filters(to_run, prepare, finalize, doc=doc)
 
 
+STAGE = FilterStage(
+    "format_label_elements",
+    [
+        FilterAction(format_math, (pf.Math,)),
+        FilterAction(format_image, (pf.Image,), reads_content=(pf.Image,)),
+        FilterAction(format_table, (pf.Table,), reads_content=(pf.Table,)),
+        FilterAction(strip_labelled_spans, (pf.Span, pf.Div)),
+    ],
+    prepare,
+    finalize,
+)
+
+
 if __name__ == "__main__":
     main()
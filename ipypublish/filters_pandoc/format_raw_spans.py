@@ -12,11 +12,13 @@ import itertools
 from panflute import Element, Doc, Span  # noqa: F401
 import panflute as pf
 
+from ipypublish.filters_pandoc.engine import FilterAction, FilterStage
 from ipypublish.filters_pandoc.definitions import (
     CONVERTED_OTHER_CLASS,
     CONVERTED_DIRECTIVE_CLASS,
     IPUB_META_ROUTE,
 )
+from ipypublish.filters_pandoc.utils import convert_text
 
 
 def process_raw_spans(container, doc):
@@ -63,7 +65,7 @@ def process_raw_spans(container, doc):
             # wrap each line in a Para and convert block with pandoc
             head_doc = pf.Doc(*[pf.Para(*l) for l in header_lines])
             head_doc.api_version = doc.api_version
-            head_str = pf.convert_text(
+            head_str = convert_text(
                 head_doc, input_format="panflute", output_format=doc.format
             )
             # remove blank lines and indent
@@ -89,7 +91,7 @@ def process_raw_spans(container, doc):
             # convert body content with pandoc
             body_doc = pf.Doc(*body_blocks)
             body_doc.api_version = doc.api_version
-            body_str = pf.convert_text(
+            body_str = convert_text(
                 body_doc, input_format="panflute", output_format=doc.format
             )
             # raise ValueError(body_blocks)
@@ -125,7 +127,7 @@ def process_raw_spans(container, doc):
                     for c in container.content[0].content
                 ]
             )
-            head_str = pf.convert_text(
+            head_str = convert_text(
                 head_para, input_format="panflute", output_format=doc.format
             )
 
@@ -133,7 +135,7 @@ def process_raw_spans(container, doc):
 
                 body_doc = pf.Doc(*container.content[1:])
                 body_doc.api_version = doc.api_version
-                body_str = pf.convert_text(
+                body_str = convert_text(
                     body_doc, input_format="panflute", output_format=doc.format
                 )
                 body_str = (
@@ -264,5 +266,16 @@ def main(doc=None):
     )
 
 
+STAGE = FilterStage(
+    "format_raw_spans",
+    [
+        FilterAction(process_raw_spans, (pf.Span, pf.Div), reads_content=(pf.Div,)),
+        FilterAction(process_code_latex, (pf.CodeBlock,)),
+    ],
+    prepare,
+    finalize,
+)
+
+
 if __name__ == "__main__":
     main()
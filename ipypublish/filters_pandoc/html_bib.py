@@ -1,26 +1,21 @@
-import io
 import re
 import string
 
 from six import string_types
-import bibtexparser
+
+from ipypublish.convert.bibcache import get_bib_entries_dict, safe_str  # noqa: F401
 
 
 def read_bibliography(path, raise_error=True):
     """ read a bibliography
 
+    the parsed bibliography is cached (see ``ipypublish.convert.bibcache``),
+    so it is only re-parsed if the file has changed
+
     """
     bibdatabase = {}
-    bibparser = bibtexparser.bparser.BibTexParser()
     try:
-        if hasattr(path, "open"):
-            with path.open(encoding="utf8") as bibtex_file:
-                bibtex_data = bibtex_file.read()
-        else:
-            with io.open(path, encoding="utf8") as bibtex_file:
-                bibtex_data = bibtex_file.read()
-        bibtex_data = safe_str(bibtex_data)
-        bibdatabase = bibparser.parse(bibtex_data).entries_dict
+        bibdatabase = get_bib_entries_dict(path, encoding="utf8")
     except Exception as err:
         if raise_error:
             raise IOError("could not read bibliopath {}: {}".format(path, err))
@@ -85,19 +80,3 @@ class DefaultFormatter(string.Formatter):
             return kwds.get(key, self.default.format(key))
         else:
             string.Formatter.get_value(key, args, kwds)
-
-
-def safe_str(obj):
-    if hasattr(obj, "decode"):
-        try:
-            obj = obj.decode("utf-8")
-        except UnicodeEncodeError:
-            pass
-    try:
-        return str(obj)
-    except UnicodeEncodeError:
-        # python 2.7
-        obj = re.sub(u"\u2013", "-", obj)  # en dash
-        obj = re.sub(u"\u2014", "--", obj)  # em dash
-        return obj.encode("ascii", "ignore").decode("ascii")
-    return ""
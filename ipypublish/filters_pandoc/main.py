@@ -9,10 +9,36 @@ Other sources of information:
 - [sphinxcontrib-bibtex](https://sphinxcontrib-bibtex.readthedocs.io/en/latest/usage.html)
 
 """  # noqa: E501
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import json
+import os
+import re
+import threading
+
 import panflute as pf
 
+from ipypublish.convert.cache import (
+    activate_cache,
+    cached_pandoc,
+    get_cache,
+    pandoc_cache_key,
+)
+from ipypublish.convert.timing import span
 from ipypublish.filters_pandoc.definitions import IPUB_META_ROUTE
-from ipypublish.filters_pandoc.utils import apply_filter, get_option, create_ipub_meta
+from ipypublish.filters_pandoc.engine import compose_stages
+from ipypublish.filters_pandoc.prescan import needs_filters
+from ipypublish.filters_pandoc.utils import (
+    apply_filter,
+    can_convert_batch,
+    convert_batch,
+    convert_text,
+    get_option,
+    create_ipub_meta,
+    read_batch,
+    write_batch,
+)
 from ipypublish.filters_pandoc import (
     prepare_cites,
     prepare_labels,
@@ -23,6 +49,41 @@ from ipypublish.filters_pandoc import (
     rmarkdown_to_mpe,
 )
 
+# the available {"ipub": {"pandoc": {}}} options and their defaults
+_OPTION_DEFAULTS = (
+    ("apply_filters", True),
+    ("convert_raw", True),
+    ("hide_raw", False),
+    ("use_numref", True),
+    ("at_notation", True),
+    ("reftag", "cite"),
+    ("strip_meta", True),
+)
+
+# the filter chains, with the actions of each stage fused into as few
+# document walks as possible (see ``ipypublish.filters_pandoc.engine``)
+_FILTERS_CONVERT_RAW = compose_stages(
+    prepare_raw.STAGE,
+    prepare_cites.STAGE,
+    prepare_labels.STAGE,
+    format_cite_elements.STAGE,
+    format_raw_spans.STAGE,
+    format_label_elements.STAGE,
+)
+_FILTERS = compose_stages(
+    prepare_cites.STAGE,
+    prepare_labels.STAGE,
+    format_cite_elements.STAGE,
+    format_label_elements.STAGE,
+)
+
+# state for batched conversions (see ``jinja_filter_batch``)
+_BATCH = threading.local()
+# sources which may contain a metadata block
+_METADATA_BLOCK = re.compile(r"^---\s*$", re.MULTILINE)
+# the minimum number of requests to send to each process of a batch
+_MIN_REQUESTS_PER_PROCESS = 8
+
 
 def pandoc_filters():
     """ run a set of ipypublish pandoc filters directly on the pandoc AST,
@@ -43,23 +104,9 @@ def pandoc_filters():
 
     if apply_filters:
         if convert_raw:
-            filters = [
-                prepare_raw.main,
-                prepare_cites.main,
-                prepare_labels.main,
-                format_cite_elements.main,
-                format_raw_spans.main,
-                format_label_elements.main,
-                rmarkdown_to_mpe.main,
-            ]
+            filters = [_FILTERS_CONVERT_RAW, rmarkdown_to_mpe.main]
         else:
-            filters = [
-                prepare_cites.main,
-                prepare_labels.main,
-                format_cite_elements.main,
-                format_label_elements.main,
-                rmarkdown_to_mpe.main,
-            ]
+            filters = [_FILTERS, rmarkdown_to_mpe.main]
     else:
         filters = []
 
@@ -76,7 +123,9 @@ def jinja_filter(
     """run a set of ipypublish pandoc filters as a Jinja2 filter
 
     We convert the source to an intermediary pandoc-json AST format,
-    run the pandocfilters, then convert to the to_format
+    run the pandocfilters, then convert to the to_format.
+    Markdown sources with no syntax for the filters to alter
+    (see ``ipypublish.filters_pandoc.prescan``) are converted directly.
 
     Parameters
     ----------
@@ -136,35 +185,75 @@ def jinja_filter(
     if not source.strip():
         return source.strip() if strip else source
 
+    state = _batch_state()
+    if state.collecting is not None:
+        # record the request and return a placeholder
+        state.collecting.append(
+            (source, to_format, nb_metadata, cell_metadata, from_format, strip)
+        )
+        return source
+    key = _request_key(source, to_format, nb_metadata, cell_metadata, from_format)
+    if state.results is not None and key in state.results:
+        out_str = state.results[key]
+    elif _METADATA_BLOCK.search(source):
+        # the metadata may reference external files, e.g. a bibliography
+        with span("ipypandoc", "filter", to_format=to_format):
+            out_str = _convert(
+                source, to_format, nb_metadata, cell_metadata, from_format
+            )
+    else:
+        with span("ipypandoc", "filter", to_format=to_format):
+            out_str = cached_pandoc(
+                ("ipypandoc",) + key,
+                lambda: _convert(
+                    source, to_format, nb_metadata, cell_metadata, from_format
+                ),
+            )
+
+    if strip:
+        out_str = out_str.strip()
+
+    return out_str
+
+
+def _convert(source, to_format, nb_metadata, cell_metadata, from_format):
+
+    if from_format == "markdown" and not needs_filters(source, to_format):
+        # there is nothing for the filters to alter
+        return convert_text(source, input_format="markdown", output_format=to_format)
+
     # convert the source to a format agnostic Doc
     doc = apply_filter(source, dry_run=True)  # type: pf.Doc
 
-    # find the preferential versions of the metadata values
-    # TODO a make this autopopulate (possibly from schema)
-    option_preference = [doc.metadata, cell_metadata, nb_metadata]
-    apply_filters = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".apply_filters", default=True
-    )
-    convert_raw = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".convert_raw", default=True
-    )
-    hide_raw = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".hide_raw", default=False
-    )
-    numref = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".use_numref", default=True
-    )
-    at_notation = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".at_notation", default=True
-    )
-    reftag = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".reftag", default="cite"
-    )
-    strip_meta = get_option(
-        option_preference, keypath=IPUB_META_ROUTE + ".strip_meta", default=True
+    filters, strip_meta = _prepare_doc(doc, nb_metadata, cell_metadata)
+
+    return apply_filter(
+        doc,
+        filters,
+        in_format=from_format,
+        out_format=to_format,
+        strip_meta=bool(strip_meta),
     )
 
-    if apply_filters:
+
+def _get_options(option_preference):
+    """find the preferential versions of the metadata values"""
+    # TODO a make this autopopulate (possibly from schema)
+    return {
+        key: get_option(
+            option_preference, keypath=IPUB_META_ROUTE + "." + key, default=default
+        )
+        for key, default in _OPTION_DEFAULTS
+    }
+
+
+def _prepare_doc(doc, nb_metadata, cell_metadata):
+    """set the preferential metadata values on the doc,
+    and return the filters to apply and whether to strip the metadata
+    """
+    options = _get_options([doc.metadata, cell_metadata, nb_metadata])
+
+    if options["apply_filters"]:
         # TODO store the original metadata and replace it at end?
         # original_meta = copy.deepcopy(doc.metadata)
 
@@ -173,10 +262,10 @@ def jinja_filter(
         meta.update(
             create_ipub_meta(
                 {
-                    "use_numref": numref,
-                    "at_notation": at_notation,
-                    "reftag": reftag,
-                    "hide_raw": hide_raw,
+                    "use_numref": options["use_numref"],
+                    "at_notation": options["at_notation"],
+                    "reftag": options["reftag"],
+                    "hide_raw": options["hide_raw"],
                 }
             )
         )
@@ -187,33 +276,197 @@ def jinja_filter(
         # doc.metadata["ipub"]["reftag"] = builtin2meta(reftag)
 
         # set filters
-        if convert_raw:
-            filters = [
-                prepare_raw.main,
-                prepare_cites.main,
-                prepare_labels.main,
-                format_cite_elements.main,
-                format_raw_spans.main,
-                format_label_elements.main,
-            ]
+        if options["convert_raw"]:
+            filters = [_FILTERS_CONVERT_RAW]
         else:
-            filters = [
-                prepare_cites.main,
-                prepare_labels.main,
-                format_cite_elements.main,
-                format_label_elements.main,
-            ]
+            filters = [_FILTERS]
     else:
         filters = []
 
-    out_str = apply_filter(
-        doc,
-        filters,
-        in_format=from_format,
-        out_format=to_format,
-        strip_meta=bool(strip_meta),
+    return filters, options["strip_meta"]
+
+
+def _batch_state():
+    if not hasattr(_BATCH, "collecting"):
+        _BATCH.collecting = None
+        _BATCH.results = None
+    return _BATCH
+
+
+def _request_key(source, to_format, nb_metadata, cell_metadata, from_format):
+    """a key for a ``jinja_filter`` request"""
+    options = _get_options([cell_metadata, nb_metadata])
+    return (
+        source,
+        to_format,
+        from_format,
+        json.dumps(options, sort_keys=True, default=str),
     )
-    if strip:
-        out_str = out_str.strip()
 
-    return out_str
+
+@contextmanager
+def collect_requests():
+    """within this context, calls to ``jinja_filter``
+    are recorded (and return their unconverted source)
+
+    Yields
+    ------
+    requests: list
+        (source, to_format, nb_metadata, cell_metadata, from_format, strip)
+
+    """
+    state = _batch_state()
+    state.collecting = requests = []
+    try:
+        yield requests
+    finally:
+        state.collecting = None
+
+
+@contextmanager
+def use_batch_results(results):
+    """within this context, calls to ``jinja_filter``
+    first look for a precomputed result from ``jinja_filter_batch``
+    """
+    state = _batch_state()
+    state.results = results
+    try:
+        yield
+    finally:
+        state.results = None
+
+
+def jinja_filter_batch(requests, processes=1):
+    """run ``jinja_filter`` for multiple requests,
+    using (where possible) a single pandoc invocation to read the sources,
+    and one per output format to write the final strings
+
+    Sources with no syntax for the filters to alter are converted directly,
+    in one pandoc invocation per output format.
+    Sources which are not markdown, or may contain their own metadata block,
+    are not converted, and should be passed directly to ``jinja_filter``.
+
+    Parameters
+    ----------
+    requests: list
+        (source, to_format, nb_metadata, cell_metadata, from_format, strip)
+    processes: int
+        the maximum number of processes to split the requests across,
+        if 0 or None, the number of processors on the machine
+
+    Returns
+    -------
+    results: dict
+        mapping of request key to (unstripped) output string
+
+    """
+    unique = OrderedDict()
+    for request in requests:
+        source, to_format, nb_meta, cell_meta, from_format, _ = request
+        key = _request_key(source, to_format, nb_meta, cell_meta, from_format)
+        unique.setdefault(key, request)
+    requests = list(unique.values())
+
+    processes = min(
+        processes or os.cpu_count() or 1,
+        len(requests) // _MIN_REQUESTS_PER_PROCESS,
+    )
+    with span(
+        "ipypandoc_batch",
+        "filter",
+        requests=len(requests),
+        processes=max(processes, 1),
+    ):
+        if processes <= 1:
+            return _jinja_filter_batch(requests)
+        return _jinja_filter_processes(requests, processes)
+
+
+def _jinja_filter_processes(requests, processes):
+    """split the requests into (contiguous) chunks,
+    and run each batch in a separate process
+    """
+    size, remainder = divmod(len(requests), processes)
+    chunks = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (1 if i < remainder else 0)
+        chunks.append(requests[start:end])
+        start = end
+
+    # the cache is passed explicitly, whereas an active pandoc server is only
+    # available to forked processes (others fall back to launching pandoc)
+    cache = get_cache("pandoc")
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_jinja_filter_chunk, chunk, cache) for chunk in chunks
+        ]
+        for future in futures:
+            results.update(future.result())
+    return results
+
+
+def _jinja_filter_chunk(requests, cache):
+    with activate_cache("pandoc", cache):
+        return _jinja_filter_batch(requests)
+
+
+def _jinja_filter_batch(requests):
+    cache = get_cache("pandoc")
+    results = {}
+    unique = OrderedDict()
+    direct = OrderedDict()
+    for source, to_format, nb_meta, cell_meta, from_format, _ in requests:
+        if (
+            not source.strip()
+            or from_format != "markdown"
+            or _METADATA_BLOCK.search(source)
+        ):
+            continue
+        key = _request_key(source, to_format, nb_meta, cell_meta, from_format)
+        if key in results or key in unique or key in direct:
+            continue
+        if cache is not None:
+            out_str = cache.get(pandoc_cache_key("ipypandoc", *key))
+            if out_str is not None:
+                results[key] = out_str
+                continue
+        filtered = needs_filters(source, to_format)
+        if not filtered and can_convert_batch(source):
+            direct[key] = None
+        else:
+            unique[key] = (nb_meta, cell_meta, filtered)
+
+    # sources with nothing for the filters to alter are converted directly
+    by_direct_format = OrderedDict()
+    for key in direct:
+        by_direct_format.setdefault(key[1], []).append(key)
+    for to_format, keys in by_direct_format.items():
+        outputs = convert_batch([key[0] for key in keys], to_format)
+        for key, out_str in zip(keys, outputs):
+            results[key] = out_str
+            if cache is not None:
+                cache.set(pandoc_cache_key("ipypandoc", *key), out_str)
+
+    docs = read_batch([key[0] for key in unique])
+    by_out_format = OrderedDict()
+    for key, doc in zip(unique, docs):
+        nb_meta, cell_meta, filtered = unique[key]
+        doc.format = key[1]
+        if filtered:
+            filters, strip_meta = _prepare_doc(doc, nb_meta, cell_meta)
+            for func in filters:
+                doc = func(doc)
+            if strip_meta:
+                doc.metadata = {}
+        by_out_format.setdefault(key[1], []).append((key, doc))
+
+    for to_format, key_docs in by_out_format.items():
+        outputs = write_batch([doc for _, doc in key_docs], to_format)
+        for (key, _), out_str in zip(key_docs, outputs):
+            results[key] = out_str
+            if cache is not None:
+                cache.set(pandoc_cache_key("ipypandoc", *key), out_str)
+
+    return results
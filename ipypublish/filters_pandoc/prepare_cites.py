@@ -36,7 +36,12 @@ from panflute import Element, Doc, Cite, RawInline, Link  # noqa: F401
 import panflute as pf
 
 
-from ipypublish.filters_pandoc.utils import find_attributes, get_pf_content_attr
+from ipypublish.filters_pandoc.engine import FilterAction, FilterStage
+from ipypublish.filters_pandoc.utils import (
+    find_attributes,
+    get_panflute_containers,
+    get_pf_content_attr,
+)
 from ipypublish.filters_pandoc.definitions import (
     ATTRIBUTE_CITE_CLASS,
     IPUB_META_ROUTE,
@@ -131,5 +136,18 @@ def main(doc=None, extract_formats=True):
     return pf.run_filter(process_citations, prepare, finalize, doc=doc)
 
 
+STAGE = FilterStage(
+    "prepare_cites",
+    [
+        FilterAction(
+            process_citations,
+            get_panflute_containers(pf.Inline) + (pf.Table, pf.DefinitionItem),
+        )
+    ],
+    prepare,
+    finalize,
+)
+
+
 if __name__ == "__main__":
     main()
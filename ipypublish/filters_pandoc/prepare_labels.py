@@ -34,6 +34,7 @@ would be converted to this html:
 from panflute import Element, Doc, Table, Inline  # noqa: F401
 import panflute as pf
 
+from ipypublish.filters_pandoc.engine import FilterAction, FilterStage
 from ipypublish.filters_pandoc.utils import (
     compare_version,
     get_panflute_containers,
@@ -183,5 +184,16 @@ def main(doc=None):
     )
 
 
+STAGE = FilterStage(
+    "prepare_labels",
+    [
+        FilterAction(resolve_tables, (pf.Table,)),
+        FilterAction(resolve_equations_images, get_panflute_containers(pf.Math)),
+    ],
+    prepare,
+    finalize,
+)
+
+
 if __name__ == "__main__":
     main()
@@ -6,6 +6,7 @@ from typing import Union  # noqa: F401
 from panflute import Element, Doc, Cite, RawInline, Link  # noqa: F401
 import panflute as pf
 
+from ipypublish.filters_pandoc.engine import FilterAction, FilterStage
 from ipypublish.filters_pandoc.definitions import (
     ATTRIBUTE_CITE_CLASS,
     PREFIX_MAP,
@@ -18,7 +19,11 @@ from ipypublish.filters_pandoc.definitions import (
     CONVERTED_OTHER_CLASS,
     CONVERTED_DIRECTIVE_CLASS,
 )
-from ipypublish.filters_pandoc.utils import get_panflute_containers, get_pf_content_attr
+from ipypublish.filters_pandoc.utils import (
+    convert_text,
+    get_panflute_containers,
+    get_pf_content_attr,
+)
 
 
 def create_cite_span(identifiers, rawformat, is_block, prefix="", alt=None):
@@ -447,7 +452,7 @@ def wrap_rst_directives(doc):
 
                 new_block = pf.Div(
                     block,
-                    *pf.convert_text(block.next.text),
+                    *convert_text(block.next.text),
                     classes=[RAWDIV_CLASS, CONVERTED_DIRECTIVE_CLASS],
                     attributes={
                         "format": "rst",
@@ -514,5 +519,21 @@ def main(doc=None, extract_formats=True):
     return pf.run_filter(gather_processors, prepare, finalize, doc=doc)
 
 
+STAGE = FilterStage(
+    "prepare_raw",
+    [
+        FilterAction(
+            gather_processors,
+            (pf.Link, pf.RawInline, pf.RawBlock)
+            + get_panflute_containers(pf.Inline)
+            + get_panflute_containers(pf.Block),
+            reads_content=(pf.Link,),
+        )
+    ],
+    prepare,
+    finalize,
+)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,75 @@
+"""a cheap scan of markdown sources, for the syntax that the ipypublish
+pandoc filters act on
+
+Sources without any of this syntax are left unchanged by the filters
+(``prepare_raw``, ``prepare_cites``, ``prepare_labels``,
+``format_cite_elements``, ``format_raw_spans`` and ``format_label_elements``),
+so can be converted directly from markdown to the target format,
+without the round-trip through the panflute AST.
+
+The scan is conservative: it may find syntax that the filters would not
+actually change, but it must never miss syntax that they would.
+
+"""
+import re
+
+# syntax that may be acted on, in any target format
+_TRIGGERS = re.compile(
+    r"|".join(
+        [
+            # citations and references, e.g. @label, +@label, [@a; @b]
+            r"@",
+            # raw latex, e.g. \cref{label}, \todo{text}, \begin{equation}
+            r"\\[a-zA-Z\[\(]",
+            # rst roles, e.g. :ref:`label`
+            r":`",
+            # rst directives and labels, e.g. .. note::, .. _label:
+            r"(?:^|\s)\.\.(?:\s|$)",
+            # html citations, e.g. <cite data-cite="key">
+            r"<cite",
+            # native spans and divs, which may carry filter classes
+            r"<(?:span|div)\b",
+            # attributes, e.g. $$a=1$${#eq:label}, []{.class}, `x`{=latex}
+            r"\{",
+            # display math
+            r"\$\$",
+            # images
+            r"!\[",
+            # internal links, e.g. [text](#label), [text]: #label
+            r"\]\(\s*<?#",
+            r"^ {0,3}\[[^\]]+\]:\s*<?#",
+            # metadata blocks, which may set the filter options
+            r"^(?:---|\.\.\.)\s*$",
+        ]
+    ),
+    re.MULTILINE | re.IGNORECASE,
+)
+# headers, which may be linked to implicitly, e.g. # Title ... [Title]
+_HEADER = re.compile(r"^ {0,3}#|^ {0,3}(?:=+|-+)\s*$", re.MULTILINE)
+# code blocks, which are wrapped in latex (fenced, indented or tab indented)
+_CODE_BLOCK = re.compile(r"^ {0,3}(?:```|~~~)|^(?: {4}|\t)", re.MULTILINE)
+
+
+def needs_filters(source, to_format):
+    # type: (str, str) -> bool
+    """test whether the ipypublish filters may alter the conversion of
+    a markdown source
+
+    Parameters
+    ----------
+    source: str
+    to_format: str
+        the target format
+
+    Returns
+    -------
+    bool
+
+    """
+    if _TRIGGERS.search(source):
+        return True
+    if "[" in source and _HEADER.search(source):
+        return True
+    if to_format in ("tex", "latex") and _CODE_BLOCK.search(source):
+        return True
+    return False
@@ -0,0 +1,74 @@
+import os
+import time
+
+import pytest
+
+from ipypublish.convert.cache import DiskCache, activate_cache
+from ipypublish.convert.timing import Tracer, activate_tracer
+from ipypublish.filters_pandoc.main import jinja_filter_batch
+
+SOURCES = [
+    "some *plain* text",
+    "+@label1 and !@label2 and =@label3 and @label4",
+    "[@label7; @label8] and \\cite{a-cite-key_2019}",
+    ":ref:`label1` :cite:`a-cite-key_2019` :numref:`label2`",
+    '<cite data-cite="cite_key">text</cite> and [a link](#label1)',
+    "$$a=1$${#eq:label1}",
+    "![a caption with $x$](path/to/image.png){#fig:label3 width=50%}",
+    "> a quote with @label1, $$c=3$${#eq:label6} and \\cite{key}",
+]
+
+
+def _requests(number, to_formats=("latex", "rst")):
+    return [
+        ("{} (number {})".format(source, i), to_format, {}, {}, "markdown", True)
+        for i in range(number)
+        for source in SOURCES
+        for to_format in to_formats
+    ]
+
+
+@pytest.mark.parametrize("processes", [2, 3, 0])
+def test_processes_equal_single(processes):
+    requests = _requests(3)
+    expected = jinja_filter_batch(requests)
+    assert jinja_filter_batch(requests, processes) == expected
+
+
+def test_too_few_requests_for_processes():
+    tracer = Tracer()
+    with activate_tracer(tracer):
+        jinja_filter_batch(_requests(1, ["latex"]), processes=4)
+    (event,) = [e for e in tracer.events if e["name"] == "ipypandoc_batch"]
+    assert event["args"]["processes"] == 1
+
+
+def test_processes_use_cache(tmp_path):
+    requests = _requests(2)
+    cache = DiskCache(tmp_path)
+    with activate_cache("pandoc", cache):
+        expected = jinja_filter_batch(requests, processes=2)
+    # the results were stored by the worker processes
+    tracer = Tracer()
+    with activate_cache("pandoc", cache), activate_tracer(tracer):
+        assert jinja_filter_batch(requests) == expected
+    assert "pandoc" not in tracer.summary()["stages"]
+
+
+@pytest.mark.benchmark
+def test_processes_benchmark():
+    """compare the time taken to convert a batch,
+    in a single process and across all processors
+    """
+    requests = _requests(25)
+    timings = {}
+    outputs = {}
+    for name, processes in [("single", 1), ("all", 0)]:
+        start = time.perf_counter()
+        outputs[name] = jinja_filter_batch(requests, processes)
+        timings[name] = time.perf_counter() - start
+
+    assert outputs["all"] == outputs["single"]
+    if (os.cpu_count() or 1) >= 4:
+        # a loose bound, to allow for noise on shared machines
+        assert timings["all"] < timings["single"]
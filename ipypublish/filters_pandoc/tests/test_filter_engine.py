@@ -0,0 +1,303 @@
+import copy
+import json
+import time
+
+import panflute as pf
+import pytest
+
+from ipypublish.filters_pandoc.utils import apply_filter
+from ipypublish.filters_pandoc.engine import (
+    FilterAction,
+    FilterStage,
+    compose_stages,
+    plan_walks,
+)
+from ipypublish.filters_pandoc import (
+    prepare_cites,
+    prepare_labels,
+    prepare_raw,
+    format_cite_elements,
+    format_label_elements,
+    format_raw_spans,
+)
+
+SEQUENTIAL_MAINS = [
+    prepare_raw.main,
+    prepare_cites.main,
+    prepare_labels.main,
+    format_cite_elements.main,
+    format_raw_spans.main,
+    format_label_elements.main,
+]
+STAGES = [
+    prepare_raw.STAGE,
+    prepare_cites.STAGE,
+    prepare_labels.STAGE,
+    format_cite_elements.STAGE,
+    format_raw_spans.STAGE,
+    format_label_elements.STAGE,
+]
+
+CORPUS = {
+    "plain": ["some *plain* text, with **no** references", "", "- a list"],
+    "at_notation": [
+        "+@label1 and !@label2 and =@label3 and @label4",
+        "",
+        "{.capital}+@label5 and {.capital latex=cref}+@label6",
+        "",
+        "[@label7; @label8] and {}@label9",
+    ],
+    "latex": [
+        r"\cref{label1} \Cref{label2}  \cite{a-cite-key_2019}",
+        "",
+        "\\cite{label1,label2}",
+        "",
+        r"\ref{label3}  \todo{something todo} and \ensuremath{x^2}",
+        "",
+        r"\todo{something else todo}",
+    ],
+    "rst": [
+        ":ref:`label1` :cite:`a-cite-key_2019` :numref:`label2`",
+        "",
+        ":eq:`label3` and :code:`a = 1` and :unknown:`b`",
+        "",
+        ".. _alabel:",
+        "",
+        ".. note::",
+        "",
+        "   a note, with :ref:`label1`",
+        "",
+        ".. toctree::",
+        "   :maxdepth: 2",
+    ],
+    "html": [
+        '<cite data-cite="cite_key">text</cite> and [a link](#label1)',
+        "",
+        '<cite data-cite="cite_key2"></cite>',
+    ],
+    "labels": [
+        "$$a=1$${#eq:label1}",
+        "",
+        "$$\\begin{align}b=2\\end{align}$${#eq:label2 .unnumbered env=align}",
+        "",
+        "![a caption with $x$ and @eq:label1](path/to/image.png)"
+        "{#fig:label3 width=50%}",
+        "",
+        "![](path/to/other.png){#fig:label4}",
+        "",
+        "see @eq:label1, +@fig:label3 and \\cref{eq:label2}",
+    ],
+    "nested": [
+        "> a quote with @label1, $$c=3$${#eq:label6} and \\cite{key}",
+        "",
+        "1. *emphasised +@eq:label6* and <cite data-cite=\"key2\">text</cite>",
+        "2. [link to @label1](#label2)",
+        "",
+        "term",
+        "",
+        ":   a definition with :ref:`label1`",
+        "",
+        "::: {.adiv}",
+        "in a div $$d=4$${#eq:label7}, see @eq:label7",
+        ":::",
+        "",
+        "```python",
+        "a = 1",
+        "```",
+    ],
+}
+
+
+def _filter_json(source, to_format, filters):
+    doc = apply_filter(source, dry_run=True)
+    doc.format = to_format
+    for func in filters:
+        doc = func(doc)
+    return doc, json.dumps(doc.to_json())
+
+
+@pytest.mark.parametrize("to_format", ["latex", "rst", "html"])
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_fused_equals_sequential(name, to_format):
+    """the fused walks must produce exactly the same output
+    as applying each filter sequentially
+    """
+    source = CORPUS[name]
+    sequential_doc, sequential_json = _filter_json(source, to_format, SEQUENTIAL_MAINS)
+    fused_doc, fused_json = _filter_json(source, to_format, [compose_stages(*STAGES)])
+    assert fused_json == sequential_json
+    assert pf.convert_text(
+        fused_doc, input_format="panflute", output_format=to_format
+    ) == pf.convert_text(
+        sequential_doc, input_format="panflute", output_format=to_format
+    )
+
+
+@pytest.mark.parametrize("to_format", ["latex", "rst", "html"])
+def test_fused_equals_sequential_no_raw(to_format):
+    source = CORPUS["labels"] + [""] + CORPUS["at_notation"]
+    mains = [
+        prepare_cites.main,
+        prepare_labels.main,
+        format_cite_elements.main,
+        format_label_elements.main,
+    ]
+    stages = [
+        prepare_cites.STAGE,
+        prepare_labels.STAGE,
+        format_cite_elements.STAGE,
+        format_label_elements.STAGE,
+    ]
+    assert (
+        _filter_json(source, to_format, [compose_stages(*stages)])[1]
+        == _filter_json(source, to_format, mains)[1]
+    )
+
+
+def _table_doc():
+    """tables are created directly, since panflute cannot read
+    the table format of all pandoc versions
+    """
+
+    def table(caption, text):
+        return pf.Table(
+            pf.TableRow(pf.TableCell(pf.Plain(pf.Str(text)))),
+            caption=caption,
+            alignment=["AlignDefault"],
+            width=[0.0],
+        )
+
+    return pf.Doc(
+        table(
+            [
+                pf.Str("a"),
+                pf.Space(),
+                pf.Str("caption"),
+                pf.Space(),
+                pf.Cite(citations=[pf.Citation("eq:label1")]),
+                pf.Space(),
+                pf.Str("{#tbl:label1"),
+                pf.Space(),
+                pf.Str("align=l}"),
+            ],
+            "a",
+        ),
+        table([pf.Str("unlabelled")], "b"),
+        pf.Para(
+            pf.Math("a=1", format="DisplayMath"),
+            pf.Str("{#eq:label1}"),
+            pf.Space(),
+            pf.Cite(citations=[pf.Citation("tbl:label1")]),
+        ),
+    )
+
+
+@pytest.mark.parametrize("to_format", ["latex", "html"])
+def test_fused_equals_sequential_tables(to_format):
+    outputs = []
+    for filters in [SEQUENTIAL_MAINS, [compose_stages(*STAGES)]]:
+        doc = _table_doc()
+        doc.format = to_format
+        for func in filters:
+            doc = func(doc)
+        outputs.append(json.dumps(doc.to_json()))
+    assert outputs[0] == outputs[1]
+
+
+def test_plan_walks():
+    walks = plan_walks(STAGES)
+    assert [[stage.name for stage in walk] for walk in walks] == [
+        ["prepare_raw", "prepare_cites", "prepare_labels"],
+        ["format_cite_elements", "format_raw_spans", "format_label_elements"],
+    ]
+
+
+def test_new_elements_only_seen_by_later_actions():
+    """elements created by an action should not be walked by preceding actions,
+    or by the action itself
+    """
+    seen = []
+
+    def record(element, doc):
+        seen.append(("record", pf.stringify(element)))
+
+    def emphasise(element, doc):
+        if element.text == "a":
+            return pf.Emph(pf.Str("b"))
+
+    def after(element, doc):
+        seen.append(("after", pf.stringify(element)))
+
+    stages = [
+        FilterStage("first", [FilterAction(record, (pf.Emph,))]),
+        FilterStage(
+            "second",
+            [FilterAction(emphasise, (pf.Str,)), FilterAction(after, (pf.Emph,))],
+        ),
+    ]
+    doc = compose_stages(*stages)(pf.Doc(pf.Para(pf.Str("a"))))
+    assert pf.stringify(doc).strip() == "b"
+    assert seen == [("after", "b")]
+
+
+def _benchmark_doc(n_paragraphs):
+    """a large document, with elements for each stage that need no pandoc calls"""
+    blocks = []
+    for i in range(n_paragraphs):
+        blocks.append(
+            pf.Para(
+                pf.Str("text"),
+                pf.Space(),
+                pf.Emph(pf.Str("emphasised"), pf.Space(), pf.Str("text")),
+                pf.Space(),
+                pf.Str("+"),
+                pf.Cite(citations=[pf.Citation("label{}".format(i))]),
+                pf.Space(),
+                pf.Math("x_{}".format(i), format="DisplayMath"),
+                pf.Str("{#eq:label" + str(i) + "}"),
+                pf.Space(),
+                pf.Strong(pf.Str("more"), pf.Space(), pf.Str("text")),
+            )
+        )
+    return pf.Doc(*blocks, format="html")
+
+
+def _walk(doc, filters):
+    """run the filters on a copy of the document,
+    return the time taken and the output JSON
+    """
+    run_doc = copy.deepcopy(doc)
+    start = time.perf_counter()
+    for func in filters:
+        run_doc = func(run_doc)
+    elapsed = time.perf_counter() - start
+    return elapsed, json.dumps(run_doc.to_json())
+
+
+def test_walk_fused_equal():
+    """the fused filter should give the same output as the sequential filters"""
+    doc = _benchmark_doc(30)
+    _, sequential = _walk(doc, SEQUENTIAL_MAINS)
+    _, fused = _walk(doc, [compose_stages(*STAGES)])
+    assert fused == sequential
+
+
+@pytest.mark.benchmark
+def test_walk_benchmark():
+    """compare the time taken to walk a large document,
+    by the sequential filters and the fused filter
+    """
+    doc = _benchmark_doc(300)
+    timings = {}
+    outputs = {}
+    for name, filters in [
+        ("sequential", SEQUENTIAL_MAINS),
+        ("fused", [compose_stages(*STAGES)]),
+    ]:
+        runs = [_walk(doc, filters) for _ in range(3)]
+        timings[name] = min(elapsed for elapsed, _ in runs)
+        outputs[name] = runs[0][1]
+
+    assert outputs["fused"] == outputs["sequential"]
+    # a loose bound, to allow for noise on shared machines
+    assert timings["fused"] < timings["sequential"] * 1.5
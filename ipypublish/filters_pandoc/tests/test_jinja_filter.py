@@ -1,4 +1,8 @@
-from ipypublish.filters_pandoc.main import jinja_filter
+from ipypublish.filters_pandoc.main import (
+    jinja_filter,
+    jinja_filter_batch,
+    use_batch_results,
+)
 from ipypublish.filters_pandoc.utils import create_ipub_meta
 
 
@@ -94,3 +98,27 @@ def test_complex_equation():
         "   \\end{equation*}",
     ]
     assert out_string.strip() == "\n".join(expected)
+
+
+def test_batch():
+
+    sources = [
+        "a",
+        "+@label",
+        "# Header\n\nsome *text*",
+        "# Header\n\n[Header]",
+        "$$a=1$$ {#eqn:a}",
+        "\\cref{label} and \\cite{key}",
+        "a^[footnote]",
+        "[ref]: https://pandoc.org",
+        "```\nunclosed code",
+        "---\nipub:\n  pandoc:\n    use_numref: false\n...\n\n+@label",
+    ]
+    nb_meta = create_ipub_meta({"use_numref": True})
+    requests = [(s, "rst", nb_meta, {}, "markdown", True) for s in sources]
+    results = jinja_filter_batch(requests)
+
+    for source in sources:
+        expected = jinja_filter(source, "rst", nb_meta, {})
+        with use_batch_results(results):
+            assert jinja_filter(source, "rst", nb_meta, {}) == expected
@@ -0,0 +1,111 @@
+import pytest
+
+from ipypublish.convert.timing import Tracer, activate_tracer
+from ipypublish.filters_pandoc import main
+from ipypublish.filters_pandoc.main import jinja_filter, jinja_filter_batch
+from ipypublish.filters_pandoc.prescan import needs_filters
+from ipypublish.filters_pandoc.utils import convert_batch, convert_text
+
+# sources with nothing for the filters to alter
+PLAIN = [
+    "a",
+    "some *emphasised*, **strong** and ~~struck~~ text",
+    "a paragraph\nwith a soft break, and a hard break  \nhere",
+    "- a list\n- of items\n\n1. and a\n2. numbered list",
+    "a [link](https://pandoc.org/filters.html) and <https://pandoc.org>",
+    "> a block quote\n> over two lines",
+    "inline `code` and $x^2$ math",
+    "# A header\n\nsome text, and ## not a header",
+    "A Setext Header\n===============\n\ntext",
+    "raw <b>html</b> and <em>emphasis</em>",
+    "a horizontal rule\n\n* * *\n\nbelow",
+    "smart \"quotes\" -- dashes --- and an ellipsis...",
+    "subscript H~2~O and superscript 2^10^",
+    "unicode: αβγ, ü and → arrows",
+    "escaped \\*stars\\* and \\_underscores\\_",
+    "a term\n\n:   a definition",
+    "a hash # in the text, and 100% of it",
+    "```python\na = 1\n```",
+    "    indented code",
+]
+
+# sources with syntax the filters may alter
+TRIGGERS = [
+    "@label",
+    "+@label and [@a; @b]",
+    "an email: someone@example.com",
+    "\\cref{label}",
+    "\\todo{something}",
+    "$\\alpha$",
+    ":ref:`label`",
+    ".. _label:",
+    ".. note::\n\n    a note",
+    '<cite data-cite="key">text</cite>',
+    '<span class="labelled-Math">$$a$$</span>',
+    "<div>a div</div>",
+    "$$a=1$${#eq:label}",
+    "$$a=1$$",
+    "[text]{.class}",
+    "![caption](path/to/image.png)",
+    "[link](#label)",
+    "[link][ref]\n\n[ref]: #label",
+    "# Header\n\nsee [Header]",
+    "Header\n------\n\nsee [Header]",
+    "---\nipub:\n  pandoc:\n    use_numref: true\n...\n\ntext",
+]
+
+
+@pytest.mark.parametrize("source", PLAIN)
+def test_plain_not_detected(source):
+    assert not needs_filters(source, "html")
+
+
+@pytest.mark.parametrize("source", TRIGGERS)
+def test_triggers_detected(source):
+    assert needs_filters(source, "html")
+
+
+def test_code_blocks_detected_for_latex():
+    assert needs_filters("```python\na = 1\n```", "latex")
+    assert needs_filters("    indented code", "latex")
+    assert not needs_filters("```python\na = 1\n```", "rst")
+
+
+@pytest.mark.parametrize("to_format", ["latex", "rst", "html"])
+@pytest.mark.parametrize("source", PLAIN + TRIGGERS)
+def test_fast_path_equals_filtered(source, to_format, monkeypatch):
+    """sources that are not detected must be converted
+    exactly as if they had been filtered
+    """
+    if needs_filters(source, to_format):
+        return
+    fast = jinja_filter(source, to_format, {}, {}, strip=False)
+    monkeypatch.setattr(main, "needs_filters", lambda source, to_format: True)
+    filtered = jinja_filter(source, to_format, {}, {}, strip=False)
+    assert fast == filtered
+
+
+@pytest.mark.parametrize("to_format", ["latex", "rst", "html"])
+def test_convert_batch(to_format):
+    sources = [source for source in PLAIN if not source.startswith("#")]
+    tracer = Tracer()
+    with activate_tracer(tracer):
+        outputs = convert_batch(sources, to_format)
+    expected = [
+        convert_text(source, input_format="markdown", output_format=to_format)
+        for source in sources
+    ]
+    assert outputs == expected
+    # sources with headers are converted individually
+    assert tracer.summary()["stages"]["pandoc"]["count"] == 2
+
+
+def test_batch_fast_path(monkeypatch):
+    sources = PLAIN + ["+@label", "$$a=1$${#eq:label}"]
+    requests = [(source, "latex", {}, {}, "markdown", True) for source in sources]
+    results = jinja_filter_batch(requests)
+
+    monkeypatch.setattr(main, "needs_filters", lambda source, to_format: True)
+    for source in sources:
+        key = main._request_key(source, "latex", {}, {}, "markdown")
+        assert results[key].strip() == jinja_filter(source, "latex", {}, {})
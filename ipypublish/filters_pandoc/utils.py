@@ -12,6 +12,9 @@ import panflute as pf
 from panflute import Element, Doc  # noqa: F401
 from types import FunctionType  # noqa: F401
 
+from ipypublish.convert.cache import cached_pandoc
+from ipypublish.convert.pandoc_server import get_pandoc_server
+from ipypublish.convert.timing import span
 from ipypublish.filters_pandoc.definitions import IPUB_META_ROUTE
 
 
@@ -72,10 +75,7 @@ def apply_filter(
         if "pandoc-api-version" not in in_object:
             raise ValueError("the in_object does contain a 'pandoc-api-version' key")
         if replace_api_version:
-            # run pandoc on a null object, to get the correct api version
-            null_raw = pf.run_pandoc("", args=["-t", "json"])
-            null_stream = io.StringIO(null_raw)
-            api_version = pf.load(null_stream).api_version
+            api_version = get_api_version()
 
             # see panflute.load, w.r.t to legacy version
             if api_version is None:
@@ -94,8 +94,35 @@ def apply_filter(
     else:
         raise TypeError("object not accepted: {}".format(in_object))
 
+    if not isinstance(filter_func, (list, tuple, set)):
+        filter_func = [filter_func]
+
+    if not (isinstance(in_object, pf.Doc) or dry_run or out_format == "panflute"):
+        key_parts = (
+            "apply_filter",
+            in_str,
+            in_format,
+            out_format,
+            [_get_func_name(func) for func in filter_func],
+            kwargs,
+            strip_meta,
+            strip_blank_lines,
+        )
+        return cached_pandoc(
+            key_parts,
+            lambda: apply_filter(
+                convert_text(in_str, input_format=in_format, standalone=True),
+                filter_func,
+                out_format,
+                in_format,
+                strip_meta,
+                strip_blank_lines,
+                **kwargs
+            ),
+        )
+
     if not isinstance(in_object, pf.Doc):
-        doc = pf.convert_text(in_str, input_format=in_format, standalone=True)
+        doc = convert_text(in_str, input_format=in_format, standalone=True)
         # f = io.StringIO(in_json)
         # doc = pf.load(f)
     else:
@@ -106,9 +133,6 @@ def apply_filter(
     if dry_run:
         return doc
 
-    if not isinstance(filter_func, (list, tuple, set)):
-        filter_func = [filter_func]
-
     out_doc = doc
     for func in filter_func:
         out_doc = func(out_doc, **kwargs)  # type: Doc
@@ -124,7 +148,7 @@ def apply_filter(
     #     pf.dump(doc, f)
     #     jsonstr = f.getvalue()
     # jsonstr = json.dumps(out_doc.to_json()
-    out_str = pf.convert_text(
+    out_str = convert_text(
         out_doc, input_format="panflute", output_format=out_format
     )
 
@@ -135,6 +159,317 @@ def apply_filter(
     return out_str
 
 
+def get_api_version():
+    """return the api version of the available pandoc,
+    which is only found (by running pandoc on a null object) once per process
+    """
+    if "version" not in _API_VERSION:
+        null_raw = run_pandoc("", args=["-t", "json"])
+        _API_VERSION["version"] = pf.load(io.StringIO(null_raw)).api_version
+    return _API_VERSION["version"]
+
+
+def convert_text(
+    text,
+    input_format="markdown",
+    output_format="panflute",
+    standalone=False,
+    extra_args=None,
+):
+    """ run ``panflute.convert_text``,
+    recording the pandoc invocation with the active tracer
+    (see ``ipypublish.convert.timing``),
+    and using the active pandoc server (see ``ipypublish.convert.pandoc_server``)
+    if there is one
+    """
+    if input_format == "panflute" and not isinstance(text, pf.Doc):
+        # wrap the element(s) in a Doc, without panflute running pandoc
+        # to find the api version
+        if isinstance(text, pf.Element):
+            text = [text]
+        text = pf.Doc(*text, api_version=get_api_version())
+
+    server = get_pandoc_server()
+    if server is None or extra_args:
+        with span("pandoc", "pandoc"):
+            return pf.convert_text(
+                text, input_format, output_format, standalone, extra_args
+            )
+
+    # as for panflute.convert_text
+    if input_format == "panflute":
+        with io.StringIO() as handle:
+            pf.dump(text, handle)
+            text = handle.getvalue()
+    in_fmt = "json" if input_format == "panflute" else input_format
+    out_fmt = "json" if output_format == "panflute" else output_format
+    with span("pandoc", "pandoc"):
+        out = server.convert(text, in_fmt, out_fmt, standalone)
+    out = "\n".join(out.splitlines())
+    if output_format == "panflute":
+        out = json.loads(out, object_pairs_hook=pf.elements.from_json)
+        if not standalone:
+            out = out.content.list
+    return out
+
+
+def run_pandoc(text="", args=None):
+    """ run ``panflute.run_pandoc``,
+    recording the pandoc invocation with the active tracer
+    (see ``ipypublish.convert.timing``),
+    and using the active pandoc server (see ``ipypublish.convert.pandoc_server``)
+    if there is one, and the arguments only specify the formats
+    """
+    server = get_pandoc_server()
+    options = None if server is None else _parse_format_args(args or [])
+    with span("pandoc", "pandoc"):
+        if options is None:
+            return pf.run_pandoc(text, args)
+        out = server.convert(text, *options)
+    # as for the pandoc executable
+    return out if out.endswith("\n") else out + "\n"
+
+
+def _parse_format_args(args):
+    """ parse pandoc arguments, that only specify the formats
+
+    Returns
+    -------
+    options: tuple or None
+        (from_format, to_format, standalone),
+        or None if there are other arguments
+
+    """
+    options = {"from": "markdown", "to": "html", "standalone": False}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in ("-s", "--standalone"):
+            options["standalone"] = True
+        elif arg in ("-f", "-r", "--from", "--read", "-t", "-w", "--to", "--write"):
+            if not args:
+                return None
+            key = "from" if arg in ("-f", "-r", "--from", "--read") else "to"
+            options[key] = args.pop(0)
+        elif re.match("^--(from|read|to|write)=.+$", arg):
+            name, value = arg[2:].split("=", 1)
+            options["from" if name in ("from", "read") else "to"] = value
+        else:
+            return None
+    return options["from"], options["to"], options["standalone"]
+
+
+def _get_func_name(func):
+    if func is None:
+        return None
+    return "{}.{}".format(getattr(func, "__module__", None), func.__name__)
+
+
+# the api version of the available pandoc (see ``get_api_version``)
+_API_VERSION = {}
+
+BATCH_SENTINEL = "IPUBBATCHSENTINEL"
+
+# sources containing these constructs have document level effects
+# (metadata blocks, reference/footnote definitions, example lists)
+_BATCH_READ_UNSAFE = re.compile(
+    r"^(?:---|\.\.\.)\s*$|^ {0,3}\[[^\]]+\]:|\(@", re.MULTILINE
+)
+# writers which collect these elements at the end of the document
+_BATCH_WRITE_UNSAFE = (pf.Note, pf.Image)
+_BATCH_WRITE_SAFE_FORMATS = ("latex", "tex")
+# sources containing these constructs can not be converted directly in a batch
+# (headers, whose identifiers may be de-duplicated, footnotes and images)
+_BATCH_CONVERT_UNSAFE = re.compile(
+    r"^ {0,3}#|^ {0,3}(?:=+|-+)\s*$|\^\[|\[\^|!\[", re.MULTILINE
+)
+_DEDUPLICATED_ID = re.compile(r"^(.*)-[0-9]+$")
+
+
+def _find_elements(blocks, element_types):
+    """return all elements (and sub-elements) of a certain type"""
+    found = []
+
+    def _action(element, doc):
+        if isinstance(element, element_types):
+            found.append(element)
+
+    for block in blocks:
+        block.walk(_action, doc=block)
+    return found
+
+
+def _split_batch(blocks, num_parts):
+    """split a list of blocks by the batch sentinel paragraphs,
+    returning None if the sentinels are not all found in order"""
+    parts = []
+    current = []
+    for block in blocks:
+        if (
+            isinstance(block, pf.Para)
+            and len(block.content) == 1
+            and isinstance(block.content[0], pf.Str)
+            and block.content[0].text == "{}{}".format(BATCH_SENTINEL, len(parts))
+        ):
+            parts.append(current)
+            current = []
+        else:
+            current.append(block)
+    if len(parts) != num_parts or current:
+        return None
+    return parts
+
+
+def read_batch(sources, in_format="markdown"):
+    # type: (list[str], str) -> list[Doc]
+    """convert a list of source strings to a list of panflute.Doc,
+    using a single pandoc invocation where possible
+
+    The sources are joined into one document, separated by sentinel
+    paragraphs, and the resulting AST is split back into one Doc per source.
+    Sources which have document level effects (e.g. metadata blocks,
+    reference definitions or auto-identified headers that would be
+    de-duplicated), or that can not be separated again,
+    are converted individually.
+
+    """
+    docs = [None] * len(sources)
+    batch = []
+    if in_format == "markdown":
+        batch = [i for i, s in enumerate(sources) if not _BATCH_READ_UNSAFE.search(s)]
+
+    if len(batch) > 1:
+        in_str = "\n\n".join(
+            "{0}\n\n{1}{2}".format(sources[i], BATCH_SENTINEL, n)
+            for n, i in enumerate(batch)
+        )
+        doc = convert_text(
+            in_str,
+            input_format=in_format + "-implicit_header_references",
+            standalone=True,
+        )
+        parts = _split_batch(doc.content, len(batch))
+        if parts is not None:
+            header_ids = set()
+            for i, blocks in zip(batch, parts):
+                headers = [h.identifier for h in _find_elements(blocks, pf.Header)]
+                deduped = any(
+                    match and match.group(1) in header_ids
+                    for match in map(_DEDUPLICATED_ID.match, headers)
+                )
+                header_ids.update(headers)
+                if headers and (deduped or "[" in sources[i]):
+                    # header identifiers and references are document level
+                    continue
+                docs[i] = pf.Doc(*blocks, api_version=doc.api_version)
+
+    for i, source in enumerate(sources):
+        if docs[i] is None:
+            docs[i] = convert_text(source, input_format=in_format, standalone=True)
+
+    return docs
+
+
+def write_batch(docs, out_format):
+    # type: (list[Doc], str) -> list[str]
+    """convert a list of panflute.Doc to a list of strings,
+    using a single pandoc invocation where possible
+
+    The document content is joined into one document,
+    separated by sentinel paragraphs, and the output is split back
+    into one string per document.
+    Documents containing elements that the writer collects at the end of the
+    document (e.g. footnotes and rst image substitutions),
+    are converted individually.
+
+    """
+    outputs = [None] * len(docs)
+    batch = [
+        i
+        for i, doc in enumerate(docs)
+        if out_format in _BATCH_WRITE_SAFE_FORMATS
+        or not _find_elements(doc.content, _BATCH_WRITE_UNSAFE)
+    ]
+
+    if len(batch) > 1:
+        blocks = []
+        for n, i in enumerate(batch):
+            blocks.extend(docs[i].content)
+            blocks.append(pf.Para(pf.Str("{}{}".format(BATCH_SENTINEL, n))))
+        out_doc = pf.Doc(*blocks, api_version=docs[batch[0]].api_version)
+        out_str = convert_text(
+            out_doc, input_format="panflute", output_format=out_format
+        )
+        parts = _split_output(out_str, len(batch))
+        if parts is not None:
+            for i, part in zip(batch, parts):
+                outputs[i] = part
+
+    for i, doc in enumerate(docs):
+        if outputs[i] is None:
+            outputs[i] = convert_text(
+                doc, input_format="panflute", output_format=out_format
+            )
+
+    return outputs
+
+
+def _split_output(out_str, num_parts):
+    """split an output string by the batch sentinel paragraphs,
+    returning None if the sentinels are not all found in order"""
+    parts = re.split(
+        r"^(?:<p>)?{}([0-9]+)(?:</p>)?$".format(BATCH_SENTINEL),
+        out_str,
+        flags=re.MULTILINE,
+    )
+    if parts[1::2] != [str(n) for n in range(num_parts)] or parts[-1].strip():
+        return None
+    return [part.strip("\n") for part in parts[0:-1:2]]
+
+
+def can_convert_batch(source, in_format="markdown"):
+    # type: (str, str) -> bool
+    """test whether a source can be joined with others in ``convert_batch``"""
+    return in_format == "markdown" and not (
+        _BATCH_READ_UNSAFE.search(source) or _BATCH_CONVERT_UNSAFE.search(source)
+    )
+
+
+def convert_batch(sources, out_format, in_format="markdown"):
+    # type: (list[str], str, str) -> list[str]
+    """convert a list of source strings directly to a list of output strings,
+    using a single pandoc invocation where possible
+
+    The sources are joined into one document, separated by sentinel
+    paragraphs, and the output is split back into one string per source.
+    Sources with document level effects (see ``read_batch``),
+    or containing headers, footnotes or images (see ``write_batch``),
+    are converted individually.
+
+    """
+    outputs = [None] * len(sources)
+    batch = [i for i, s in enumerate(sources) if can_convert_batch(s, in_format)]
+
+    if len(batch) > 1:
+        in_str = "\n\n".join(
+            "{0}\n\n{1}{2}".format(sources[i], BATCH_SENTINEL, n)
+            for n, i in enumerate(batch)
+        )
+        out_str = convert_text(in_str, input_format=in_format, output_format=out_format)
+        parts = _split_output(out_str, len(batch))
+        if parts is not None:
+            for i, part in zip(batch, parts):
+                outputs[i] = part
+
+    for i, source in enumerate(sources):
+        if outputs[i] is None:
+            outputs[i] = convert_text(
+                source, input_format=in_format, output_format=out_format
+            )
+
+    return outputs
+
+
 def compare_version(target, comparison):
     """Set docstring here.
 
@@ -5,8 +5,6 @@ import sys
 from mimetypes import guess_type
 
 from ipypublish.frontend.shared import parse_options
-from ipypublish.convert.main import IpyPubMain
-from ipypublish.postprocessors.reveal_serve import RevealServer
 
 logger = logging.getLogger("nbpresent")
 
@@ -22,6 +20,7 @@ def nbpresent(
     dry_run=False,
     print_traceback=False,
     export_paths=(),
+    trace=None,
 ):
     """ load reveal.js slides as a web server,
     converting from ipynb first if path extension is .ipynb
@@ -42,6 +41,9 @@ def nbpresent(
         ignore ipynb files with this prefix
     log_level: str
         the logging level (debug, info, critical, ...)
+    trace: str or None
+        write the timings of each conversion stage to this path,
+        as a Chrome trace-event JSON file
 
     """
     inpath_name, inpath_ext = os.path.splitext(os.path.basename(inpath))
@@ -50,6 +52,8 @@ def nbpresent(
     output_mimetype = "unknown" if output_mimetype is None else output_mimetype
 
     if output_mimetype != "text/html":
+        # imported here, to reduce the CLI startup time
+        from ipypublish.convert.main import IpyPubMain
 
         config = {
             "IpyPubMain": {
@@ -61,6 +65,7 @@ def nbpresent(
                 "log_level_stdout": log_level,
                 "log_to_file": True,
                 "log_level_file": log_level,
+                "trace_file": trace,
                 "default_pporder_kwargs": dict(
                     dry_run=dry_run,
                     clear_existing=clear_files,
@@ -82,7 +87,11 @@ def nbpresent(
             if print_traceback:
                 raise
             return 1
+        finally:
+            publish.close()
     else:
+        from ipypublish.postprocessors.reveal_serve import RevealServer
+
         logging.basicConfig(stream=sys.stdout, level=logging.INFO)
         server = RevealServer()
         if not dry_run:
@@ -1,9 +1,13 @@
 #!/usr/bin/env python
+import copy
+import glob
 import logging
+import os
 import sys
+import time
+import traceback
 
 from ipypublish.frontend.shared import parse_options
-from ipypublish.convert.main import IpyPubMain
 
 logger = logging.getLogger("nbpublish")
 
@@ -23,16 +27,22 @@ def nbpublish(
     dry_run=False,
     print_traceback=False,
     export_paths=(),
+    jobs=1,
+    trace=None,
 ):
     """ convert one or more Jupyter notebooks to a published format
 
     paths can be string of an existing file or folder,
     or a pathlib.Path like object
 
+    if a list of paths (or a glob pattern matching multiple paths) is given,
+    each is converted separately, to its own subfolder of the outpath,
+    and a summary of the conversions is printed
+
     Parameters
     ----------
     ipynb_path
-        notebook file or directory
+        notebook file or directory, glob pattern, or list of these
     outformat: str
         output format to use
     outpath : str or pathlib.Path
@@ -52,6 +62,14 @@ def nbpublish(
         run latexmk in interactive mode
     log_level: str
         the logging level (debug, info, critical, ...)
+    jobs: int
+        the number of processes to use, when converting multiple paths
+        (if <= 0, the number of CPUs is used)
+    trace: str or None
+        write the timings of each conversion stage to this path,
+        as a Chrome trace-event JSON file
+        (if converting multiple paths, to a file of this name,
+        in the output folder of each)
 
     """
     # run
@@ -65,6 +83,7 @@ def nbpublish(
             "log_level_stdout": log_level,
             "log_to_file": True,
             "log_level_file": log_level,
+            "trace_file": trace,
             "default_pporder_kwargs": dict(
                 dry_run=dry_run,
                 clear_existing=clear_files,
@@ -78,7 +97,15 @@ def nbpublish(
             ),
         }
     }
+    paths = expand_paths(ipynb_path)
+    if len(paths) != 1:
+        return publish_multiple(paths, config, jobs, print_traceback)
+
+    # imported here, to reduce the CLI startup time
+    from ipypublish.convert.main import IpyPubMain
+
     publish = IpyPubMain(config=config)
+    ipynb_path = paths[0]
     try:
         publish(ipynb_path)
     except Exception as err:
@@ -86,10 +113,166 @@ def nbpublish(
         if print_traceback:
             raise
         return 1
+    finally:
+        publish.close()
 
     return 0
 
 
+def expand_paths(ipynb_paths):
+    """ expand a path, glob pattern, or list of these, to a list of paths
+
+    paths that do not exist are retained, so that they can be reported,
+    and duplicates are removed
+    """
+    if not isinstance(ipynb_paths, (list, tuple)):
+        ipynb_paths = [ipynb_paths]
+    paths = []
+    for path in ipynb_paths:
+        if glob.has_magic(str(path)):
+            matches = sorted(glob.glob(str(path)))
+            if not matches:
+                logger.warning("no paths match the pattern: {}".format(path))
+            paths.extend(matches)
+        else:
+            paths.append(path)
+    unique_paths = []
+    for path in paths:
+        if str(path) not in [str(p) for p in unique_paths]:
+            unique_paths.append(path)
+    return unique_paths
+
+
+def get_outpaths(paths, outpath):
+    """ return a unique output folder for each path,
+    as a subfolder of outpath, named by the notebook/folder name
+    """
+    if outpath is None:
+        outpath = os.path.join(os.getcwd(), "converted")
+    outpaths = []
+    names = set()
+    for path in paths:
+        base_name = os.path.splitext(os.path.basename(os.path.normpath(str(path))))[0]
+        name, i = base_name, 1
+        while name in names:
+            name = "{}_{}".format(base_name, i)
+            i += 1
+        names.add(name)
+        outpaths.append(os.path.abspath(os.path.join(str(outpath), name)))
+    return outpaths
+
+
+def _publish_worker(ipynb_path, config, print_traceback):
+    """ run the conversion for a single path
+
+    Returns
+    -------
+    (success, wall_time, error_message)
+
+    """
+    from ipypublish.convert.main import IpyPubMain
+
+    start_time = time.time()
+    publish = IpyPubMain(config=config)
+    try:
+        publish(ipynb_path)
+    except Exception as err:
+        if print_traceback:
+            message = traceback.format_exc()
+        else:
+            message = "{}: {}".format(type(err).__name__, err)
+        return False, time.time() - start_time, message
+    finally:
+        publish.close()
+    return True, time.time() - start_time, None
+
+
+def publish_multiple(paths, config, jobs=1, print_traceback=False):
+    """ convert multiple paths, each in a separate subfolder of the outpath,
+    then print a summary of the conversions
+
+    Parameters
+    ----------
+    paths: list
+    config: dict
+        the configuration for IpyPubMain
+    jobs: int
+        the number of processes to use (if <= 0, the number of CPUs is used)
+    print_traceback: bool
+
+    Returns
+    -------
+    exitcode: int
+
+    """
+    if not paths:
+        logger.error("Run Failed: no paths to convert")
+        return 1
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(paths))
+
+    outpaths = get_outpaths(paths, config["IpyPubMain"].get("outpath", None))
+    configs = []
+    for outpath in outpaths:
+        # each conversion logs to its own file, rather than the terminal
+        path_config = copy.deepcopy(config)
+        path_config["IpyPubMain"]["outpath"] = outpath
+        path_config["IpyPubMain"]["log_to_stdout"] = False
+        if path_config["IpyPubMain"].get("trace_file", None):
+            path_config["IpyPubMain"]["trace_file"] = os.path.join(
+                outpath, os.path.basename(path_config["IpyPubMain"]["trace_file"])
+            )
+        configs.append(path_config)
+
+    print("converting {0} path(s) with {1} job(s)".format(len(paths), jobs))
+    start_time = time.time()
+    results = [None] * len(paths)
+    if jobs == 1:
+        for i, path in enumerate(paths):
+            results[i] = _publish_worker(path, configs[i], print_traceback)
+            _print_result(paths[i], *results[i])
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(_publish_worker, path, configs[i], print_traceback): i
+                for i, path in enumerate(paths)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as err:
+                    # e.g. the worker process died
+                    results[i] = (False, 0.0, "{}: {}".format(type(err).__name__, err))
+                _print_result(paths[i], *results[i])
+
+    failed = [path for path, result in zip(paths, results) if not result[0]]
+    print(
+        "summary: {0} succeeded, {1} failed, in {2:.2f}s".format(
+            len(paths) - len(failed), len(failed), time.time() - start_time
+        )
+    )
+    for path, outpath in zip(paths, outpaths):
+        if path in failed:
+            print("failed: {0} (see logs in {1})".format(path, outpath))
+
+    return 1 if failed else 0
+
+
+def _print_result(path, success, wall_time, message):
+    print(
+        "{0}: {1} ({2:.2f}s)".format(
+            "success" if success else "failed", path, wall_time
+        )
+    )
+    if message is not None:
+        print(message)
+
+
 def run(sys_args=None):
 
     if sys_args is None:
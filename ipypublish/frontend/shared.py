@@ -4,7 +4,6 @@ import argparse
 import fnmatch
 
 from ipypublish import __version__
-from ipypublish.convert.config_manager import iter_all_export_infos
 
 
 class CustomFormatter(
@@ -26,12 +25,19 @@ def get_parser(**kwargs):
 
 def get_plugin_str(plugin_folder_paths, regex, verbose):
     """return string listing all available export configurations """
+    from ipypublish.convert.cache import default_cache_folder
+    from ipypublish.convert.config_manager import iter_all_export_infos
+
     outstrs = []
     # outstrs.append('Available Export Configurations')
     # outstrs.append('-------------------------------')
     configs = [
         e
-        for e in iter_all_export_infos(plugin_folder_paths, get_mime=verbose)
+        for e in iter_all_export_infos(
+            plugin_folder_paths,
+            get_mime=verbose,
+            index_folder=default_cache_folder(),
+        )
         if fnmatch.fnmatch(e["key"], "*{}*".format(regex))
     ]
 
@@ -74,6 +80,7 @@ def parse_options(sys_args, program):
             )
         )
         file_help = "path to html or ipynb file"
+        file_nargs = "?"
         default_key = "slides_ipypublish_main"
     else:
         parser = get_parser(
@@ -81,13 +88,14 @@ def parse_options(sys_args, program):
                 "convert one or more Jupyter notebooks " "to a publishable format"
             )
         )
-        file_help = "notebook file or directory"
+        file_help = "notebook file(s), directory(s) or glob pattern(s)"
+        file_nargs = "*"
         default_key = "latex_ipypublish_main"
 
     parser.add_argument("--version", action="version", version=__version__)
 
     parser.add_argument(
-        "filepath", type=str, nargs="?", help=file_help, metavar="filepath"
+        "filepath", type=str, nargs=file_nargs, help=file_help, metavar="filepath"
     )
 
     parser.add_argument(
@@ -181,6 +189,19 @@ def parse_options(sys_args, program):
             help="run latexmk in interactive mode",
         )
 
+        multi_group = parser.add_argument_group("multiple notebooks")
+        multi_group.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            metavar="int",
+            default=1,
+            help=(
+                "the number of processes to use, when converting multiple paths "
+                "(<= 0 uses the number of CPUs)"
+            ),
+        )
+
         view_group = parser.add_argument_group("view output")
         view_group.add_argument(
             "-lb",
@@ -210,11 +231,24 @@ def parse_options(sys_args, program):
         action="store_true",
         help=("perform a 'dry run', " "which will not output any files"),
     )
+    debug_group.add_argument(
+        "-tr",
+        "--trace",
+        type=str,
+        metavar="path",
+        default=None,
+        help=(
+            "write the timings of each conversion stage to a "
+            "Chrome trace-event JSON file (view in chrome://tracing)"
+        ),
+    )
 
     args = parser.parse_args(sys_args)
     options = vars(args)
 
     filepath = options.pop("filepath")
+    if filepath == []:
+        filepath = None
     list_plugins = options.pop("list_exporters")
     list_verbose = options.pop("list_verbose")
 
@@ -4,6 +4,7 @@ from six import string_types
 from traitlets import Bool
 from traitlets.config.configurable import Configurable
 
+from ipypublish.convert.timing import span
 from ipypublish.utils import handle_error, pathlib
 
 try:
@@ -89,7 +90,61 @@ class IPyPostProcessor(Configurable):
         filepath: None or str or pathlib.Path
 
         """
+        skip, filepath, resources = self._check_inputs(mimetype, filepath, resources)
+        if skip:
+            return stream, filepath, resources
 
+        return self.run_postprocess(stream, mimetype, filepath, resources)
+
+    def postprocess_lines(self, lines, mimetype, filepath, resources=None):
+        """ Post-process output, as an iterator of lines.
+
+        If the post-processor is ``streaming``, the lines are processed lazily,
+        otherwise they are joined and passed to ``run_postprocess``.
+
+        Parameters
+        ----------
+        lines: iterable of str
+            the main file contents, as lines (including line endings)
+        mimetype: str
+            the mimetype of the file
+        filepath: None or str or pathlib.Path
+            the path to the output file
+            the path does not have to exist, but must be absolute
+        resources: None or dict
+            a resources dict, output from exporter.from_notebook_node
+
+        Returns
+        -------
+        lines: iterator of str
+        filepath: None or str or pathlib.Path
+        resources: dict
+
+        """
+        skip, filepath, resources = self._check_inputs(mimetype, filepath, resources)
+        if skip:
+            return lines, filepath, resources
+
+        if self.streaming:
+            lines = self.run_postprocess_lines(lines, mimetype, filepath, resources)
+            return lines, filepath, resources
+
+        stream, filepath, resources = self.run_postprocess(
+            "".join(lines), mimetype, filepath, resources
+        )
+        return iter_lines(stream), filepath, resources
+
+    def _check_inputs(self, mimetype, filepath, resources):
+        """ check the inputs are valid for the post-processor
+
+        Returns
+        -------
+        skip: bool
+            whether the post-processor should be skipped
+        filepath: None or pathlib.Path
+        resources: dict
+
+        """
         if (
             self.allowed_mimetypes is not None
             and mimetype not in self.allowed_mimetypes
@@ -103,7 +158,7 @@ class IPyPostProcessor(Configurable):
                 )
             else:
                 self.logger.debug("skipping incorrect mime type: {}".format(mimetype))
-                return stream, filepath, resources
+                return True, filepath, resources
 
         if self.requires_path and filepath is None:
             self.handle_error(
@@ -133,7 +188,7 @@ class IPyPostProcessor(Configurable):
         if resources is None:
             resources = {}
 
-        return self.run_postprocess(stream, mimetype, filepath, resources)
+        return False, filepath, resources
 
     def run_postprocess(self, stream, mimetype, filepath, resources):
         """ should not be called directly
@@ -157,6 +212,34 @@ class IPyPostProcessor(Configurable):
         """
         raise NotImplementedError("run_postprocess")
 
+    @property
+    def streaming(self):
+        """ override in subclasses
+
+        whether the post-processor implements ``run_postprocess_lines``
+        """
+        return False
+
+    def run_postprocess_lines(self, lines, mimetype, filepath, resources):
+        """ should not be called directly
+        override in sub-class (if streaming is True)
+
+        Parameters
+        ----------
+        lines: iterator of str
+            the main file contents, as lines (including line endings)
+        filepath: None or pathlib.Path
+            the path to the output file
+        resources: dict
+            a resources dict, output from exporter.from_notebook_node
+
+        Returns
+        -------
+        lines: iterator of str
+
+        """
+        raise NotImplementedError("run_postprocess_lines")
+
     def handle_error(self, msg, err_type, raise_msg=None, log_msg=None):
         """ handle error by logging it then raising
         """
@@ -170,6 +253,75 @@ class IPyPostProcessor(Configurable):
         return True
 
 
+def iter_lines(stream):
+    """ lazily iterate over the lines of a string, split by "\\n" only,
+    and including the line endings
+
+    >>> list(iter_lines("a\\nb\\r\\n\\nc"))
+    ['a\\n', 'b\\r\\n', '\\n', 'c']
+
+    """
+    start = 0
+    while True:
+        end = stream.find("\n", start)
+        if end < 0:
+            if start < len(stream):
+                yield stream[start:]
+            return
+        yield stream[start : end + 1]
+        start = end + 1
+
+
+def run_postprocessors(postprocessors, stream, mimetype, filepath, resources):
+    """ run a chain of post-processors
+
+    the stream is passed through the chain as lines,
+    so that consecutive ``streaming`` post-processors are fused
+    into a single pass, without creating intermediate copies of the stream,
+    and non-streaming post-processors are passed the joined stream
+
+    if a tracer is active (see ``ipypublish.convert.timing``),
+    the time of each post-processor is recorded; the time taken
+    by streaming post-processors is included in that of the next
+    non-streaming post-processor (or the final ``postprocess:join``)
+
+    Parameters
+    ----------
+    postprocessors: list of IPyPostProcessor
+    stream: str
+    mimetype: str
+    filepath: None or str or pathlib.Path
+    resources: None or dict
+
+    Returns
+    -------
+    stream: str
+    filepath: None or str or pathlib.Path
+    resources: dict
+
+    """
+    if not any(proc.streaming for proc in postprocessors):
+        for proc in postprocessors:
+            with span("postprocess:" + proc.logger_name, "postprocessor"):
+                stream, filepath, resources = proc.postprocess(
+                    stream, mimetype, filepath, resources
+                )
+        return stream, filepath, resources
+
+    lines = iter_lines(stream)
+    del stream
+    for proc in postprocessors:
+        with span(
+            "postprocess:" + proc.logger_name, "postprocessor", streaming=proc.streaming
+        ):
+            lines, filepath, resources = proc.postprocess_lines(
+                lines, mimetype, filepath, resources
+            )
+    with span("postprocess:join", "postprocessor"):
+        stream = "".join(lines)
+    return stream, filepath, resources
+
+
 if __name__ == "__main__":
 
     print(IPyPostProcessor.allowed_mimetypes)
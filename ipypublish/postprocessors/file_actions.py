@@ -30,6 +30,10 @@ class WriteTextFile(IPyPostProcessor):
 
     encoding = Unicode("utf8", help="the encoding of the output file").tag(config=True)
 
+    @property
+    def streaming(self):
+        return True
+
     def run_postprocess(self, stream, mimetype, filepath, resources):
 
         self.logger.info("writing stream to file: {}".format(filepath))
@@ -38,6 +42,14 @@ class WriteTextFile(IPyPostProcessor):
 
         return stream, filepath, resources
 
+    def run_postprocess_lines(self, lines, mimetype, filepath, resources):
+
+        self.logger.info("writing stream to file: {}".format(filepath))
+        with filepath.open("w", encoding=self.encoding) as fh:
+            for line in lines:
+                fh.write(line)
+                yield line
+
 
 class RemoveFolder(IPyPostProcessor):
     """ remove a folder and all its contents
@@ -121,7 +133,11 @@ class WriteResourceFiles(IPyPostProcessor):
                     outpath.parent.mkdir(parents=True)
 
                 with outpath.open("wb") as fh:
-                    fh.write(content)
+                    if hasattr(content, "write_to"):
+                        # stream lazily loaded content (see convert.lazy_outputs)
+                        content.write_to(fh)
+                    else:
+                        fh.write(content)
 
         self.logger.debug("finished")
 
@@ -0,0 +1,104 @@
+"""a registry of the post-processors,
+available *via* the ``ipypublish.postprocessors`` entry point group
+"""
+import logging
+import threading
+
+from ipypublish.utils import get_entry_points, handle_error
+
+ENTRY_POINT_GROUP = "ipypublish.postprocessors"
+PREFERRED_PACKAGE = "ipypublish"
+
+logger = logging.getLogger("postprocessors")
+
+# {name: entry_point}, or {name: [entry_point, ...]} if it is ambiguous
+_REGISTRY = {}
+# {name: class}
+_CLASSES = {}
+_LOCK = threading.Lock()
+
+
+def get_registry():
+    """ return a mapping of post-processor names to entry points
+
+    the registry is built once per process, and names registered by
+    multiple packages are resolved to the one in the preferred package
+    (or to a list of the entry points, if this is not possible)
+    """
+    with _LOCK:
+        if not _REGISTRY:
+            for name, entry_points in get_entry_points(ENTRY_POINT_GROUP).items():
+                if len(entry_points) == 1:
+                    _REGISTRY[name] = entry_points[0][1]
+                    continue
+                preferred = [
+                    ep
+                    for module, ep in entry_points
+                    if module.startswith(PREFERRED_PACKAGE)
+                ]
+                if len(preferred) == 1:
+                    logger.debug(
+                        "Multiple {0} plugins found for {1}, "
+                        "defaulting to the {2} version".format(
+                            ENTRY_POINT_GROUP, name, PREFERRED_PACKAGE
+                        )
+                    )
+                    _REGISTRY[name] = preferred[0]
+                else:
+                    _REGISTRY[name] = [ep for _, ep in entry_points]
+        return _REGISTRY
+
+
+def clear_registry():
+    """clear the registry, so that it is rebuilt on the next call"""
+    with _LOCK:
+        _REGISTRY.clear()
+        _CLASSES.clear()
+
+
+def get_postprocessor_class(name, logger=logger):
+    """return the post-processor class registered to name"""
+    registry = get_registry()
+    with _LOCK:
+        if name in _CLASSES:
+            return _CLASSES[name]
+    if name not in registry:
+        handle_error(
+            "The {0} entry point {1} could not be found".format(
+                ENTRY_POINT_GROUP, name
+            ),
+            ImportError,
+            logger,
+        )
+    entry_point = registry[name]
+    if isinstance(entry_point, list):
+        handle_error(
+            "Multiple {0} plugins found for {1}: {2}".format(
+                ENTRY_POINT_GROUP, name, entry_point
+            ),
+            ImportError,
+            logger,
+        )
+    proc_class = entry_point.load()
+    with _LOCK:
+        _CLASSES[name] = proc_class
+    return proc_class
+
+
+def load_postprocessors(order, config, logger=logger):
+    """ return the chain of instantiated post-processors
+
+    Parameters
+    ----------
+    order: list of str
+        the names of the post-processors, in the order they should be run
+    config: dict or traitlets.config.Config
+        the configuration to instantiate them with
+    logger: logging.Logger
+
+    Returns
+    -------
+    list of ipypublish.postprocessors.base.IPyPostProcessor
+
+    """
+    return [get_postprocessor_class(name, logger)(config) for name in order]
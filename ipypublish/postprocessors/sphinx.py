@@ -157,10 +157,6 @@ class RunSphinx(IPyPostProcessor):
 
         self.logger.info("running: " + " ".join(args))
 
-        # this way overrides the logging
-        # sphinx_build = find_entry_point("sphinx-build", "console_scripts",
-        #                                 self.logger, "sphinx")
-
         def log_process_output(pipe):
             for line in iter(pipe.readline, b""):
                 self.logger.info("{}".format(line.decode("utf-8").strip()))
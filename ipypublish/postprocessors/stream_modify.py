@@ -1,9 +1,10 @@
 """
 postprocessors that modify the output stream
 """
+import os
 import re
 
-from ipypublish.postprocessors.base import IPyPostProcessor
+from ipypublish.postprocessors.base import IPyPostProcessor, iter_lines
 
 
 class RemoveBlankLines(IPyPostProcessor):
@@ -28,10 +29,29 @@ class RemoveBlankLines(IPyPostProcessor):
     def logger_name(self):
         return "remove-blank-lines"
 
+    @property
+    def streaming(self):
+        return True
+
     def run_postprocess(self, stream, mimetype, filepath, resources):
         stream = re.sub(r"\n\s*\n", "\n\n", stream)
         return stream, filepath, resources
 
+    def run_postprocess_lines(self, lines, mimetype, filepath, resources):
+        # equivalent to run_postprocess; every line after the first,
+        # which contains only whitespace, is part of a run of blank lines
+        first = True
+        in_blank = False
+        for line in lines:
+            if not first and line.endswith("\n") and line.isspace():
+                if not in_blank:
+                    in_blank = True
+                    yield "\n"
+                continue
+            first = False
+            in_blank = False
+            yield line
+
 
 class RemoveTrailingSpace(IPyPostProcessor):
     """ remove trailing whitespace on each line """
@@ -54,10 +74,26 @@ class RemoveTrailingSpace(IPyPostProcessor):
     def logger_name(self):
         return "remove-trailing-space"
 
+    @property
+    def streaming(self):
+        return True
+
     def run_postprocess(self, stream, mimetype, filepath, resources):
         stream = "\n".join([l.rstrip() for l in stream.splitlines()])
         return stream, filepath, resources
 
+    def run_postprocess_lines(self, lines, mimetype, filepath, resources):
+        # equivalent to run_postprocess; lines are split on all line boundaries,
+        # stripped and re-joined by "\n", without a final line ending
+        previous = None
+        for line in lines:
+            for part in line.splitlines():
+                if previous is not None:
+                    yield previous + "\n"
+                previous = part.rstrip()
+        if previous is not None:
+            yield previous
+
 
 class FilterOutputFiles(IPyPostProcessor):
     """ filter internal files in resources['outputs'],
@@ -75,15 +111,105 @@ class FilterOutputFiles(IPyPostProcessor):
     def logger_name(self):
         return "filter-output-files"
 
+    @property
+    def streaming(self):
+        return True
+
     def run_postprocess(self, stream, mimetype, filepath, resources):
 
         if "outputs" in resources:
-            for path in list(resources["outputs"].keys()):
-                if path not in stream:
-                    resources["outputs"].pop(path)
+            finder = SubstringFinder(resources["outputs"].keys())
+            finder.search(stream)
+            for path in finder.remaining:
+                resources["outputs"].pop(path)
 
         return stream, filepath, resources
 
+    def run_postprocess_lines(self, lines, mimetype, filepath, resources):
+
+        outputs = resources.get("outputs", None)
+        if not outputs:
+            for line in lines:
+                yield line
+            return
+
+        if any("\n" in path for path in outputs):
+            # paths can only be searched for line by line, if they are a single line
+            stream = "".join(lines)
+            self.run_postprocess(stream, mimetype, filepath, resources)
+            for line in iter_lines(stream):
+                yield line
+            return
+
+        finder = SubstringFinder(outputs.keys())
+        for line in lines:
+            if finder.remaining:
+                finder.search(line)
+            yield line
+
+        for path in finder.remaining:
+            outputs.pop(path)
+
+
+class SubstringFinder(object):
+    """ find which of a (large) set of substrings are present in some text,
+    in a single scan of the text
+
+    the substrings are grouped by their first character,
+    then the text is scanned for the common prefix of each group,
+    and the substrings (of each length in the group)
+    starting at each occurrence are looked up in a set
+
+    >>> finder = SubstringFinder(["a/b.png", "a/b.png.txt", "a/c.png", "d"])
+    >>> sorted(finder.search("see a/b.png.txt"))
+    ['a/b.png', 'a/b.png.txt']
+    >>> sorted(finder.remaining)
+    ['a/c.png', 'd']
+
+    """
+
+    def __init__(self, substrings):
+        # {first character: (common prefix, {length: set(substrings)})}
+        self._groups = {}
+        self.remaining = set()
+        for substring in substrings:
+            self.remaining.add(substring)
+            if not substring:
+                continue
+            self._groups.setdefault(substring[0], (None, {}))[1].setdefault(
+                len(substring), set()
+            ).add(substring)
+        for char, (_, by_length) in list(self._groups.items()):
+            prefix = os.path.commonprefix(
+                [s for subs in by_length.values() for s in subs]
+            )
+            self._groups[char] = (prefix, by_length)
+
+    def search(self, text):
+        """ search the text for any remaining substrings,
+        and return those found (which are removed from ``remaining``)
+        """
+        found = set()
+        if "" in self.remaining:
+            found.add("")
+        for char in list(self._groups.keys()):
+            prefix, by_length = self._groups[char]
+            start = text.find(prefix)
+            while start >= 0:
+                for length in list(by_length.keys()):
+                    candidate = text[start : start + length]
+                    if candidate in by_length[length]:
+                        found.add(candidate)
+                        by_length[length].discard(candidate)
+                        if not by_length[length]:
+                            by_length.pop(length)
+                if not by_length:
+                    self._groups.pop(char)
+                    break
+                start = text.find(prefix, start + 1)
+        self.remaining.difference_update(found)
+        return found
+
 
 class FixSlideReferences(IPyPostProcessor):
     """ make sure references refer to correct slides """
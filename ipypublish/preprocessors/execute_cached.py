@@ -0,0 +1,152 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+
+import traitlets as traits
+from nbconvert.preprocessors import ExecutePreprocessor
+from nbformat.notebooknode import from_dict
+
+from ipypublish.convert.cache import (
+    DEFAULT_MAX_SIZE,
+    DiskCache,
+    default_cache_folder,
+    hash_key,
+)
+
+logger = logging.getLogger("execute")
+
+
+def _hash_file(path, chunk_size=2 ** 20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class CachedExecutePreprocessor(ExecutePreprocessor):
+    """ a preprocessor to execute the notebook,
+    which stores the outputs of each execution in an on-disk cache,
+    and restores them (rather than executing) if the code is unchanged
+
+    the cache key is created from the ordered code cell sources,
+    the kernel name and the content of any declared dependency files.
+    The least recently used executions are evicted,
+    once the total size of the cache exceeds cache_max_size.
+
+    This class is configured by the ``ExecutePreprocessor`` config section,
+    and can replace ``nbconvert.preprocessors.ExecutePreprocessor``
+    in an exporter's ``default_preprocessors``.
+
+    """
+
+    cache_folder = traits.Unicode(
+        None,
+        allow_none=True,
+        help=(
+            "the folder to store the execution cache in, "
+            "if None, will use $XDG_CACHE_HOME/ipypublish/execution"
+        ),
+    ).tag(config=True)
+
+    cache_max_size = traits.Int(
+        DEFAULT_MAX_SIZE,
+        help=(
+            "the maximum size (in bytes) of the execution cache, "
+            "before the least recently used entries are evicted"
+        ),
+    ).tag(config=True)
+
+    dependencies = traits.List(
+        traits.Unicode(),
+        help=(
+            "paths (or glob patterns), relative to the notebook folder, "
+            "of files that the execution depends on (e.g. data files)"
+        ),
+    ).tag(config=True)
+
+    def get_cache(self):
+        """return the on-disk execution cache"""
+        folder = self.cache_folder or os.path.join(default_cache_folder(), "execution")
+        return DiskCache(folder, self.cache_max_size)
+
+    def get_cache_key(self, nb, resources):
+        """ create a key for the execution of a notebook
+
+        Parameters
+        ----------
+        nb: nbformat.NotebookNode
+        resources: dict
+
+        Returns
+        -------
+        key: str
+
+        """
+        kernel_name = self.kernel_name or nb.metadata.get("kernelspec", {}).get(
+            "name", ""
+        )
+        sources = [
+            hashlib.sha256(cell.source.encode("utf8")).hexdigest()
+            for cell in nb.cells
+            if cell.cell_type == "code"
+        ]
+        path = resources.get("metadata", {}).get("path", "") or os.getcwd()
+        dependencies = []
+        for pattern in self.dependencies:
+            paths = sorted(glob.glob(os.path.join(path, pattern)))
+            if not paths:
+                logger.warning("execution dependency not found: {}".format(pattern))
+            for dep_path in paths:
+                if os.path.isfile(dep_path):
+                    dependencies.append(
+                        (os.path.relpath(dep_path, path), _hash_file(dep_path))
+                    )
+        return hash_key(
+            "execute", kernel_name, sources, dependencies, self.allow_errors
+        )
+
+    def preprocess(self, nb, resources=None, km=None):
+        """ execute the notebook, or restore its outputs from the cache
+
+        see ``nbconvert.preprocessors.ExecutePreprocessor.preprocess``
+        """
+        if not resources:
+            resources = {}
+        cache = self.get_cache()
+        key = self.get_cache_key(nb, resources)
+
+        data = cache.get(key)
+        if data is not None:
+            data = json.loads(data)
+            logger.info("restoring cached execution outputs")
+            code_cells = [cell for cell in nb.cells if cell.cell_type == "code"]
+            for cell, cell_data in zip(code_cells, data["cells"]):
+                cell.outputs = [from_dict(o) for o in cell_data["outputs"]]
+                cell.execution_count = cell_data["execution_count"]
+            nb.metadata.update(from_dict(data["metadata"]))
+            return nb, resources
+
+        nb, resources = super(CachedExecutePreprocessor, self).preprocess(
+            nb, resources, km=km
+        )
+
+        data = {
+            "cells": [
+                {"outputs": cell.outputs, "execution_count": cell.execution_count}
+                for cell in nb.cells
+                if cell.cell_type == "code"
+            ],
+            "metadata": {
+                name: nb.metadata[name]
+                for name in ("language_info", "widgets")
+                if name in nb.metadata
+            },
+        }
+        try:
+            cache.set(key, json.dumps(data))
+        except (IOError, OSError) as err:
+            logger.warning("could not store the execution outputs: {}".format(err))
+        return nb, resources
@@ -0,0 +1,38 @@
+from nbconvert.preprocessors import ExtractOutputPreprocessor
+
+from ipypublish.convert.lazy_outputs import LazyPayload, LazyPayloadBytes
+
+
+class LazyExtractOutputPreprocessor(ExtractOutputPreprocessor):
+    """ extract outputs from the notebook, as for ExtractOutputPreprocessor,
+    but lazy output payloads (see ``ipypublish.convert.lazy_outputs``)
+    are not decoded, and are stored in ``resources["outputs"]``
+    as ``LazyPayloadBytes``, to be streamed to file
+
+    This class is configured by the ``ExtractOutputPreprocessor`` config section,
+    and can replace ``nbconvert.preprocessors.ExtractOutputPreprocessor``
+    in an exporter's ``default_preprocessors``.
+
+    """
+
+    def preprocess_cell(self, cell, resources, cell_index):
+        lazy = []
+        for index, out in enumerate(cell.get("outputs", [])):
+            for mime_type, data in out.get("data", {}).items():
+                if isinstance(data, LazyPayload):
+                    lazy.append((index, mime_type, data))
+        # extract an empty payload, to create the output file name
+        for index, mime_type, _ in lazy:
+            cell.outputs[index].data[mime_type] = ""
+
+        cell, resources = super(LazyExtractOutputPreprocessor, self).preprocess_cell(
+            cell, resources, cell_index
+        )
+
+        for index, mime_type, data in lazy:
+            output = cell.outputs[index]
+            output.data[mime_type] = data
+            filename = output.metadata.get("filenames", {}).get(mime_type, None)
+            if filename is not None:
+                resources["outputs"][filename] = LazyPayloadBytes(data)
+        return cell, resources
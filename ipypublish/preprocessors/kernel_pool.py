@@ -0,0 +1,458 @@
+"""a pool of warm (pre-started) kernels, to execute notebooks with
+
+kernels are taken from the pool to execute a single notebook,
+then restarted (in the background) before being returned to it,
+so that no state is shared between notebooks.
+Kernels can be pre-started with ``KernelPool.warm``,
+otherwise they are started on demand (up to the pool size).
+
+The pool belongs to a single process; a forked process (e.g. a Sphinx
+parallel-read worker) creates its own pool, with the same settings,
+on first use.
+"""
+from contextlib import contextmanager
+import logging
+import multiprocessing.util
+import os
+import queue
+import threading
+
+import traitlets as traits
+from nbconvert.preprocessors import ExecutePreprocessor
+
+from ipypublish.preprocessors.execute_cached import CachedExecutePreprocessor
+
+logger = logging.getLogger("kernel_pool")
+
+# settings are inherited by forked processes, but the pool is not
+_STATE = {"settings": None, "pool": None}
+_STATE_LOCK = threading.Lock()
+
+# change the working directory without adding to the user namespace
+CHDIR_CODE = "__import__('os').chdir({!r})"
+
+
+def _get_language(kernel_name):
+    from jupyter_client.kernelspec import KernelSpecManager
+
+    return KernelSpecManager().get_kernel_spec(kernel_name).language
+
+
+class PoolTimeoutError(RuntimeError):
+    """raised when no kernel becomes available in the pool, within the timeout"""
+
+
+class KernelPool(object):
+    """ a thread-safe pool of started kernels
+
+    Parameters
+    ----------
+    size: int
+        the maximum number of kernels (per kernel name)
+    preload: str or None
+        code to execute in each kernel, after it is (re)started
+    startup_timeout: int
+        seconds to wait for a kernel to start
+
+    """
+
+    def __init__(self, size=1, preload=None, startup_timeout=60):
+        if size < 1:
+            raise ValueError("the kernel pool size must be at least 1")
+        self.size = size
+        self.preload = preload
+        self.startup_timeout = startup_timeout
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._ready = {}
+        self._count = {}
+        self._languages = {}
+        self._managers = set()
+        self._threads = set()
+        self._closed = False
+
+    def _queue(self, kernel_name):
+        # must be called with the lock held
+        if kernel_name not in self._ready:
+            self._ready[kernel_name] = queue.Queue()
+            self._count[kernel_name] = 0
+        return self._ready[kernel_name]
+
+    def _initialise(self, km):
+        """wait for the kernel to be ready, and run the preload code"""
+        kc = km.client()
+        kc.start_channels()
+        try:
+            kc.wait_for_ready(timeout=self.startup_timeout)
+            if self.preload:
+                reply = kc.execute_interactive(
+                    self.preload,
+                    store_history=False,
+                    timeout=self.startup_timeout,
+                    output_hook=lambda msg: None,
+                )
+                if reply["content"]["status"] != "ok":
+                    logger.warning(
+                        "the kernel preload code raised {}: {}".format(
+                            reply["content"].get("ename", ""),
+                            reply["content"].get("evalue", ""),
+                        )
+                    )
+        finally:
+            kc.stop_channels()
+
+    def _start_kernel(self, kernel_name):
+        from jupyter_client import KernelManager
+
+        km = KernelManager(kernel_name=kernel_name)
+        extra_arguments = []
+        if km.ipykernel:
+            # concurrent kernels should not share a history database
+            extra_arguments.append("--HistoryManager.hist_file=:memory:")
+        km.start_kernel(extra_arguments=extra_arguments)
+        try:
+            self._initialise(km)
+        except Exception:
+            km.shutdown_kernel(now=True)
+            raise
+        with self._lock:
+            self._managers.add(km)
+        logger.debug("started pooled kernel: {}".format(kernel_name))
+        return km
+
+    def _discard(self, kernel_name, km=None):
+        with self._lock:
+            self._count[kernel_name] -= 1
+            if km is not None:
+                self._managers.discard(km)
+        if km is not None:
+            try:
+                km.shutdown_kernel(now=True)
+            except Exception as err:
+                logger.debug("could not shutdown kernel: {}".format(err))
+
+    def _start_into_pool(self, kernel_name):
+        try:
+            km = self._start_kernel(kernel_name)
+        except Exception as err:
+            logger.warning("could not start pooled kernel: {}".format(err))
+            self._discard(kernel_name)
+            return
+        self._put(kernel_name, km)
+
+    def _spawn(self, target, *args):
+        def run():
+            try:
+                target(*args)
+            finally:
+                with self._lock:
+                    self._threads.discard(thread)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        with self._lock:
+            self._threads.add(thread)
+        thread.start()
+        return thread
+
+    def _put(self, kernel_name, km):
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queue(kernel_name).put(km)
+        if closed:
+            self._discard(kernel_name, km)
+
+    def warm(self, kernel_name, number=None):
+        """ start kernels in the background, until the pool is full
+
+        Parameters
+        ----------
+        kernel_name: str
+        number: int or None
+            the maximum number of kernels to start
+
+        """
+        with self._lock:
+            self._queue(kernel_name)
+            available = self.size - self._count[kernel_name]
+            number = available if number is None else min(number, available)
+            number = max(number, 0)
+            self._count[kernel_name] += number
+        for _ in range(number):
+            self._spawn(self._start_into_pool, kernel_name)
+
+    def acquire(self, kernel_name, cwd=None, timeout=None):
+        """ take a started kernel from the pool, waiting if none are available
+
+        Parameters
+        ----------
+        kernel_name: str
+        cwd: str or None
+            the working directory to set in the kernel
+        timeout: float or None
+            the time to wait for a kernel to become available
+
+        Returns
+        -------
+        km: jupyter_client.KernelManager or None
+            None if the kernel language does not support changing
+            the working directory (only python is currently supported)
+
+        Raises
+        ------
+        PoolTimeoutError
+            if no kernel becomes available within the timeout
+
+        """
+        if kernel_name not in self._languages:
+            self._languages[kernel_name] = _get_language(kernel_name)
+        if cwd is not None and self._languages[kernel_name] != "python":
+            logger.debug(
+                "kernel {} is not pooled, since its working directory "
+                "cannot be set".format(kernel_name)
+            )
+            return None
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("the kernel pool has been shutdown")
+            ready = self._queue(kernel_name)
+            start_new = ready.empty() and self._count[kernel_name] < self.size
+            if start_new:
+                self._count[kernel_name] += 1
+        if start_new:
+            try:
+                km = self._start_kernel(kernel_name)
+            except Exception:
+                self._discard(kernel_name)
+                raise
+        else:
+            try:
+                km = ready.get(timeout=timeout)
+            except queue.Empty:
+                raise PoolTimeoutError(
+                    "no {} kernel became available in the pool (of size {}) "
+                    "within {} seconds".format(kernel_name, self.size, timeout)
+                )
+
+        if not km.is_alive():
+            logger.debug("pooled kernel has died, starting a new one")
+            self._discard(kernel_name, km)
+            with self._lock:
+                self._count[kernel_name] += 1
+            try:
+                km = self._start_kernel(kernel_name)
+            except Exception:
+                self._discard(kernel_name)
+                raise
+
+        if cwd is not None:
+            kc = km.client()
+            kc.start_channels()
+            try:
+                kc.execute_interactive(
+                    CHDIR_CODE.format(os.path.abspath(cwd)),
+                    store_history=False,
+                    timeout=self.startup_timeout,
+                    output_hook=lambda msg: None,
+                )
+            finally:
+                kc.stop_channels()
+        return km
+
+    def _restart_into_pool(self, kernel_name, km):
+        if self._closed:
+            self._discard(kernel_name, km)
+            return
+        try:
+            # the kernel state is discarded, so there is no need to wait
+            # for a graceful shutdown
+            km.restart_kernel(now=True)
+            self._initialise(km)
+        except Exception as err:
+            logger.warning("could not restart pooled kernel: {}".format(err))
+            self._discard(kernel_name, km)
+            self.warm(kernel_name)
+            return
+        self._put(kernel_name, km)
+
+    def release(self, kernel_name, km, wait=False):
+        """ return a kernel to the pool
+
+        the kernel is restarted in a background thread,
+        then put back in the pool once it is ready
+
+        """
+        thread = self._spawn(self._restart_into_pool, kernel_name, km)
+        if wait:
+            thread.join()
+
+    @contextmanager
+    def kernel(self, kernel_name, cwd=None):
+        """a context manager to acquire, then release, a kernel"""
+        km = self.acquire(kernel_name, cwd=cwd)
+        try:
+            yield km
+        finally:
+            if km is not None:
+                self.release(kernel_name, km)
+
+    def shutdown(self):
+        """shutdown all kernels in the pool"""
+        if os.getpid() != self._pid:
+            # the kernels belong to the parent process
+            return
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        # wait for kernels being (re)started, so that none are left running
+        for thread in threads:
+            thread.join(self.startup_timeout)
+        with self._lock:
+            managers = list(self._managers)
+            self._managers.clear()
+        for km in managers:
+            try:
+                km.shutdown_kernel(now=True)
+            except Exception as err:
+                logger.debug("could not shutdown kernel: {}".format(err))
+        logger.debug("shutdown {} pooled kernels".format(len(managers)))
+
+
+def configure_kernel_pool(size, preload=None, startup_timeout=60):
+    """ set the kernel pool settings for this (and forked) processes
+
+    any existing pool, of this process, is shutdown
+
+    Parameters
+    ----------
+    size: int
+        the maximum number of kernels (per kernel name),
+        if 0, the pool is disabled
+    preload: str or None
+        code to execute in each kernel, after it is (re)started
+    startup_timeout: int
+
+    """
+    shutdown_kernel_pool()
+    with _STATE_LOCK:
+        if size > 0:
+            _STATE["settings"] = {
+                "size": size,
+                "preload": preload,
+                "startup_timeout": startup_timeout,
+            }
+        else:
+            _STATE["settings"] = None
+
+
+def get_kernel_pool():
+    """ return the kernel pool for this process,
+    creating it if necessary
+
+    Returns
+    -------
+    pool: KernelPool or None
+        None if the pool has not been configured
+
+    """
+    with _STATE_LOCK:
+        if _STATE["settings"] is None:
+            return None
+        pool = _STATE["pool"]
+        if pool is None or pool._pid != os.getpid():
+            pool = _STATE["pool"] = KernelPool(**_STATE["settings"])
+            # also shutdown when a multiprocessing worker exits
+            multiprocessing.util.Finalize(pool, pool.shutdown, exitpriority=10)
+        return pool
+
+
+def shutdown_kernel_pool():
+    """shutdown the kernel pool of this process (if it exists)"""
+    with _STATE_LOCK:
+        pool = _STATE["pool"]
+        _STATE["pool"] = None
+    if pool is not None:
+        pool.shutdown()
+
+
+class PooledExecutePreprocessor(ExecutePreprocessor):
+    """ a preprocessor to execute the notebook,
+    with a kernel taken from this process's kernel pool
+    (see ``configure_kernel_pool``)
+
+    the kernel is restarted before being returned to the pool,
+    so that no state is shared between notebooks.
+    If no pool is configured, a new kernel is started
+    (as for the ``ExecutePreprocessor``).
+
+    This class is configured by the ``ExecutePreprocessor`` config section,
+    and can replace ``nbconvert.preprocessors.ExecutePreprocessor``
+    in an exporter's ``default_preprocessors``.
+
+    """
+
+    pool_timeout = traits.Float(
+        None,
+        allow_none=True,
+        help=(
+            "seconds to wait for a kernel to become available in the pool, "
+            "before starting a new (unpooled) kernel"
+        ),
+    ).tag(config=True)
+
+    @contextmanager
+    def setup_preprocessor(self, nb, resources, km=None, **kwargs):
+        with super(PooledExecutePreprocessor, self).setup_preprocessor(
+            nb, resources, km=km, **kwargs
+        ) as output:
+            kc = self.kc
+            try:
+                yield output
+            finally:
+                if km is not None:
+                    # nbconvert only stops the channels of kernels it starts
+                    kc.stop_channels()
+
+    def preprocess(self, nb, resources=None, km=None):
+        """ execute the notebook, with a kernel from the pool
+
+        see ``nbconvert.preprocessors.ExecutePreprocessor.preprocess``
+        """
+        pool = get_kernel_pool()
+        if km is not None or pool is None:
+            return super(PooledExecutePreprocessor, self).preprocess(
+                nb, resources, km=km
+            )
+        if not resources:
+            resources = {}
+        kernel_name = self.kernel_name or nb.metadata.get("kernelspec", {}).get(
+            "name", "python"
+        )
+        path = resources.get("metadata", {}).get("path", "") or os.getcwd()
+        try:
+            km = pool.acquire(kernel_name, cwd=path, timeout=self.pool_timeout)
+        except PoolTimeoutError as err:
+            self.log.warning("{}, starting a new kernel".format(err))
+            km = None
+        if km is None:
+            return super(PooledExecutePreprocessor, self).preprocess(nb, resources)
+        try:
+            self.kernel_name = kernel_name
+            return super(PooledExecutePreprocessor, self).preprocess(
+                nb, resources, km=km
+            )
+        finally:
+            pool.release(kernel_name, km)
+
+
+class CachedPooledExecutePreprocessor(
+    CachedExecutePreprocessor, PooledExecutePreprocessor
+):
+    """ a preprocessor to execute the notebook,
+    which restores outputs from the execution cache,
+    or otherwise executes with a kernel from the kernel pool
+
+    see ``CachedExecutePreprocessor`` and ``PooledExecutePreprocessor``
+    """
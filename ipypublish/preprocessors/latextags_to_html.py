@@ -1,14 +1,14 @@
 import logging
 import re
 import string
-import io
 
-import bibtexparser
 import traitlets as traits
 from nbconvert.preprocessors import Preprocessor
 
 from six import string_types
 
+from ipypublish.convert.bibcache import get_bib_entries_dict, safe_str  # noqa: F401
+
 
 class DefaultFormatter(string.Formatter):
     def __init__(self, default=""):
@@ -21,20 +21,19 @@ class DefaultFormatter(string.Formatter):
             string.Formatter.get_value(key, args, kwds)
 
 
-def safe_str(obj):
-    if hasattr(obj, "decode"):
-        try:
-            obj = obj.decode("utf-8")
-        except UnicodeEncodeError:
-            pass
-    try:
-        return str(obj)
-    except UnicodeEncodeError:
-        # python 2.7
-        obj = re.sub(u"\u2013", "-", obj)  # en dash
-        obj = re.sub(u"\u2014", "--", obj)  # em dash
-        return obj.encode("ascii", "ignore").decode("ascii")
-    return ""
+_EQUATION_ENVS = (
+    "equation",
+    "equation*",
+    "align",
+    "align*",
+    "multline",
+    "multline*",
+    "gather",
+    "gather*",
+)
+_EQUATION_BEGIN_TAGS = tuple("\\begin{{{0}}}".format(env) for env in _EQUATION_ENVS)
+_EQUATION_END_TAGS = tuple("\\end{{{0}}}".format(env) for env in _EQUATION_ENVS)
+_SPLIT_TAGS = ("\\begin{split}", "\\end{split}")
 
 
 class LatexTagsToHTML(Preprocessor):
@@ -143,16 +142,8 @@ class LatexTagsToHTML(Preprocessor):
         """
         logging.info("reading bibliopath: {}".format(path))
         bibdatabase = {}
-        bibparser = bibtexparser.bparser.BibTexParser()
         try:
-            if hasattr(path, "open"):
-                with path.open(encoding="utf8") as bibtex_file:
-                    bibtex_data = bibtex_file.read()
-            else:
-                with io.open(path, encoding="utf8") as bibtex_file:
-                    bibtex_data = bibtex_file.read()
-            bibtex_data = safe_str(bibtex_data)
-            bibdatabase = bibparser.parse(bibtex_data).entries_dict
+            bibdatabase = get_bib_entries_dict(path, encoding="utf8")
         except Exception as err:
             logging.error("could not read bibliopath {}: {}".format(path, err))
 
@@ -251,88 +242,128 @@ class LatexTagsToHTML(Preprocessor):
         <BLANKLINE>
 
         """  # noqa: E501
-        new = source
-        in_equation = False
-        labels = []
-        for tag in re.findall(self.regex, source):
-
-            if tag.startswith("\\label"):
-                link = r'<a id="{label}" class="anchor-link" name="#{label}">&#182;</a>'.format(
-                    label=tag[7:-1]
-                )  # noqa: E501
-                if in_equation:
-                    labels.append(link)
-                    new = new.replace(tag, "")
+        state = {"in_equation": False, "labels": [], "appended": []}
+
+        # the replacement for each distinct tag is decided by its first occurrence,
+        # and the tags are then replaced in a single pass
+        replacements = {}
+        matches = []
+        for match in re.finditer(self.regex, source):
+            tag = match.group(0)
+            replacement = self._convert_tag(tag, resources, state)
+            replacements.setdefault(tag, (len(replacements), replacement))
+            matches.append(match)
+
+        limit = max([len(tag) for tag in replacements] or [0])
+        pieces = []
+        position = 0
+        index = 0
+        while index < len(matches):
+            match = matches[index]
+            pieces.append(source[position : match.start()])
+            if "\\" in match.group(0)[1:]:
+                replacement, position, index = self._convert_nested(
+                    source, matches, index, replacements, limit
+                )
+                pieces.append(replacement)
+                continue
+            pieces.append(replacements[match.group(0)][1])
+            position = match.end()
+            index += 1
+        pieces.append(source[position:])
+        return "".join(pieces) + "".join(state["appended"])
+
+    @staticmethod
+    def _convert_nested(source, matches, index, replacements, limit):
+        """ return the replacement for a tag with other tags nested in it
+
+        the span of the tag is extended to include any (other) tags
+        that start within it, and all tags in the span are then replaced
+        in order of their first occurrence, so that a tag is not replaced
+        if a tag nested in it has already been replaced
+
+        Returns
+        -------
+        replacement: str
+        end: int
+            the end of the span in the source
+        index: int
+            the index of the first match after the span
+
+        """
+        start = matches[index].start()
+        end = matches[index].end()
+        found = set()
+        position = start
+        while position < end:
+            while index < len(matches) and matches[index].start() < end:
+                end = max(end, matches[index].end())
+                index += 1
+            position = source.find("\\", position, end)
+            if position == -1:
+                break
+            closing = source.find("}", position, position + limit)
+            while closing != -1:
+                if source[position : closing + 1] in replacements:
+                    found.add(source[position : closing + 1])
+                    end = max(end, closing + 1)
+                closing = source.find("}", closing + 1, position + limit)
+            position += 1
+
+        new = source[start:end]
+        for name in sorted(found, key=lambda name: replacements[name][0]):
+            new = new.replace(name, replacements[name][1])
+        return new, end, index
+
+    def _convert_tag(self, tag, resources, state):
+        """ return the replacement for a single tag
+
+        equation labels are deferred to the end of the source,
+        where they are added once the equation environment is closed
+        """
+        if tag.startswith("\\label"):
+            link = r'<a id="{label}" class="anchor-link" name="#{label}">&#182;</a>'.format(
+                label=tag[7:-1]
+            )  # noqa: E501
+            if state["in_equation"]:
+                state["labels"].append(link)
+                return ""
+            return link
+
+        elif tag.startswith("\\ref"):
+            html = [
+                self.replace_reflabel(name, resources)
+                for name in tag[5:-1].split(",")
+            ]
+            return self.rreplace(", ".join(html), ",", " and")
+
+        elif tag.startswith("\\cref"):
+            html = [
+                self.replace_reflabel(name, resources)
+                for name in tag[6:-1].split(",")
+            ]
+            return self.rreplace(", ".join(html), ",", " and")
+
+        elif tag.startswith("\\cite"):
+            html = []
+            for name in tag[6:-1].split(","):
+                if name in self.bibdatabase:
+                    html.append(self.process_bib_entry(self.bibdatabase[name]))
                 else:
-                    new = new.replace(tag, link)
-
-            elif tag.startswith("\\ref"):
-                names = tag[5:-1].split(",")
-                html = []
-                for name in names:
-                    html.append(self.replace_reflabel(name, resources))
-                new = new.replace(tag, self.rreplace(", ".join(html), ",", " and"))
-
-            elif tag.startswith("\\cref"):
-                names = tag[6:-1].split(",")
-                html = []
-                for name in names:
-                    html.append(self.replace_reflabel(name, resources))
-                new = new.replace(tag, self.rreplace(", ".join(html), ",", " and"))
-
-            elif tag.startswith("\\cite"):
-                names = tag[6:-1].split(",")
-                html = []
-                for name in names:
-                    if name in self.bibdatabase:
-                        html.append(self.process_bib_entry(self.bibdatabase[name]))
-                    else:
-                        html.append("Unresolved citation: {}.".format(name))
-                new = new.replace(tag, "[" + ", ".join(html) + "]")
-
-            elif any(
-                [
-                    tag.startswith("\\begin{{{0}}}".format(env))
-                    for env in [
-                        "equation",
-                        "equation*",
-                        "align",
-                        "align*",
-                        "multline",
-                        "multline*",
-                        "gather",
-                        "gather*",
-                    ]
-                ]
-            ):
-                in_equation = True
-            elif any(
-                [
-                    tag.startswith("\\end{{{0}}}".format(env))
-                    for env in [
-                        "equation",
-                        "equation*",
-                        "align",
-                        "align*",
-                        "multline",
-                        "multline*",
-                        "gather",
-                        "gather*",
-                    ]
-                ]
-            ):
-                new += " ".join(labels)
-                labels = []
-                in_equation = False
-            elif any(
-                [tag.startswith("\\begin{{{0}}}".format(env)) for env in ["split"]]
-            ):
-                pass
-            elif any([tag.startswith("\\end{{{0}}}".format(env)) for env in ["split"]]):
-                pass
-            else:
-                new = new.replace(tag, "")
-        return new
+                    html.append("Unresolved citation: {}.".format(name))
+            return "[" + ", ".join(html) + "]"
+
+        elif tag.startswith(_EQUATION_BEGIN_TAGS):
+            state["in_equation"] = True
+            return tag
+        elif tag.startswith(_EQUATION_END_TAGS):
+            state["appended"].append(" ".join(state["labels"]))
+            state["labels"] = []
+            state["in_equation"] = False
+            return tag
+        elif tag.startswith(_SPLIT_TAGS):
+            return tag
+        return ""
 
     def preprocess(self, nb, resources):
 
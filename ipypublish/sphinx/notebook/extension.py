@@ -23,6 +23,8 @@ from ipypublish.sphinx.notebook.transforms import (
     RewriteLocalLinks,
 )
 from ipypublish.sphinx.notebook.parser import NBParser
+from ipypublish.preprocessors import kernel_pool
+from ipypublish.convert import pandoc_server
 
 try:
     from sphinx.application import Sphinx  # noqa: F401
@@ -76,6 +78,20 @@ def setup(app):
     app.add_config_value("ipysphinx_overwrite_existing", False, rebuild="env")
     # additional folders containing conversion files
     app.add_config_value("ipysphinx_config_folders", (), rebuild="env")
+    # whether to cache the outputs of executed notebooks
+    app.add_config_value("ipysphinx_execution_cache", False, rebuild="env")
+    # the number of warm kernels to keep for executing notebooks (0 to disable)
+    app.add_config_value("ipysphinx_kernel_pool_size", 0, rebuild="")
+    # the kernels to pre-start
+    app.add_config_value("ipysphinx_kernel_pool_names", ("python3",), rebuild="")
+    # code to execute in each pooled kernel, after it is (re)started
+    app.add_config_value("ipysphinx_kernel_preload", None, rebuild="env")
+    app.connect("builder-inited", start_kernel_pool)
+    app.connect("build-finished", shutdown_kernel_pool)
+    # whether to send pandoc conversions to a single pandoc server (pandoc >= 3.0)
+    app.add_config_value("ipysphinx_pandoc_server", False, rebuild="")
+    app.connect("builder-inited", start_pandoc_server)
+    app.connect("build-finished", shutdown_pandoc_server)
 
     # config for cell prompts
     app.add_config_value("ipysphinx_show_prompts", False, rebuild="env")
@@ -182,6 +198,40 @@ def setup(app):
     }
 
 
+def start_kernel_pool(app):
+    """configure the kernel pool and, if notebooks are read serially, warm it"""
+    config = app.config
+    kernel_pool.configure_kernel_pool(
+        config.ipysphinx_kernel_pool_size, preload=config.ipysphinx_kernel_preload
+    )
+    pool = kernel_pool.get_kernel_pool()
+    if pool is None or app.parallel > 1:
+        # each parallel read worker starts kernels in its own pool, on demand
+        return
+    for kernel_name in config.ipysphinx_kernel_pool_names:
+        pool.warm(kernel_name)
+
+
+def shutdown_kernel_pool(app, exception):
+    """shutdown the kernels of the pool, once the build has finished"""
+    kernel_pool.shutdown_kernel_pool()
+
+
+def start_pandoc_server(app):
+    """start a pandoc server, for the conversions of all notebooks in the build
+    (including those read by forked parallel read workers)
+    """
+    if app.config.ipysphinx_pandoc_server:
+        pandoc_server.set_pandoc_server(pandoc_server.start_pandoc_server())
+
+
+def shutdown_pandoc_server(app, exception):
+    """stop the pandoc server, once the build has finished"""
+    server = pandoc_server.set_pandoc_server(None)
+    if server is not None:
+        server.close()
+
+
 def associate_extensions(app, config):
     for suffix in config.ipysphinx_preconverters:
         associate_single_extension(app, suffix, config_value="ipysphinx_preconverters")
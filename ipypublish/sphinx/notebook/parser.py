@@ -76,6 +76,8 @@ class NBParser(rst.Parser):
                 "plugin_folder_paths": self.config.ipysphinx_config_folders,
                 "outpath": filedir,
                 "folder_suffix": self.config.ipysphinx_folder_suffix,
+                "execution_cache": self.config.ipysphinx_execution_cache,
+                "kernel_pool": self.config.ipysphinx_kernel_pool_size > 0,
                 "log_to_stdout": False,
                 "log_to_file": False,
                 "default_pporder_kwargs": dict(clear_existing=False, dump_files=True),
@@ -87,7 +89,10 @@ class NBParser(rst.Parser):
                 "pre_conversion_funcs"
             ] = self.config.ipysphinx_preconverters
         publish = IpyPubMain(config=config)
-        outdata = publish(filepath)
+        try:
+            outdata = publish(filepath)
+        finally:
+            publish.close()
 
         self.logger.info("ipypublish: successful conversion")
 
@@ -12,7 +12,6 @@ from typing import List, Tuple, Union  # noqa: F401
 import re
 import io
 import logging
-import jsonschema
 
 from six import string_types
 
@@ -81,6 +80,8 @@ def create_template(outline_template, outline_name, segment_datas, outpath=None)
         if not None, output to path
 
     """
+    import jsonschema
+
     # get the placeholders @ipubreplace{above|below}{name}
     regex = re.compile("\\@ipubreplace\\{([^\\}]+)\\}\\{([^\\}]+)\\}", re.MULTILINE)
     placeholder_tuple = regex.findall(outline_template)
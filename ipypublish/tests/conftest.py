@@ -171,9 +171,12 @@ class IpyTestApp(object):
             ipub_config = {}
         ipub_config["outpath"] = str(self.converted_path)
         app = IpyPubMain(config={"IpyPubMain": ipub_config})
-        self._output_data = app(
-            self.input_file if self.input_file is not None else self.source_path
-        )
+        try:
+            self._output_data = app(
+                self.input_file if self.input_file is not None else self.source_path
+            )
+        finally:
+            app.close()
 
     @property
     def output_data(self):
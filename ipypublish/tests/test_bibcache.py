@@ -0,0 +1,148 @@
+import json
+import os
+import pickle
+
+import pytest
+
+from ipypublish.bib2glossary import BibGlossDB
+from ipypublish.convert import bibcache
+from ipypublish.convert.cache import DiskCache, activate_cache
+from ipypublish.filters_pandoc.html_bib import read_bibliography
+
+BIB_TEXT = """
+@article{key1,
+  title = {A Title},
+  author = {Surname, A. and Other, B.},
+  year = {2019}
+}
+"""
+
+GLOSS_TEXT = """
+@glsterm{term1,
+  name = {Term},
+  description = {a description}
+}
+"""
+
+
+def _update_file(path, text):
+    """ write to a file, ensuring that its mtime changes """
+    stat = os.stat(path)
+    with open(path, "w") as handle:
+        handle.write(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def _record_parses(monkeypatch):
+    calls = []
+    parse_bibtex = bibcache._parse_bibtex
+
+    def _parse(*args):
+        calls.append(args)
+        return parse_bibtex(*args)
+
+    monkeypatch.setattr(bibcache, "_parse_bibtex", _parse)
+    return calls
+
+
+def _write_bib(temp_folder, name, text):
+    path = os.path.join(temp_folder, name)
+    with open(path, "w") as handle:
+        handle.write(text)
+    return path
+
+
+def test_bib_entries_cache(temp_folder, monkeypatch):
+    bibcache.clear_memory()
+    path = _write_bib(temp_folder, "refs.bib", BIB_TEXT)
+    calls = _record_parses(monkeypatch)
+    cache = DiskCache(os.path.join(temp_folder, "cache"))
+
+    with activate_cache(bibcache.CACHE_NAME, cache):
+        entries = read_bibliography(path)
+        assert entries["key1"]["year"] == "2019"
+        assert len(calls) == 1
+        # the cached entries can not be mutated by the caller
+        entries["key1"]["year"] = "2000"
+        assert read_bibliography(path)["key1"]["year"] == "2019"
+        assert len(calls) == 1
+
+        # a new process uses the persisted cache
+        bibcache.clear_memory()
+        assert read_bibliography(path)["key1"]["year"] == "2019"
+        assert len(calls) == 1
+
+        # changing the file invalidates the cache
+        _update_file(path, BIB_TEXT.replace("2019", "2020"))
+        assert read_bibliography(path)["key1"]["year"] == "2020"
+        assert len(calls) == 2
+
+        # the entries for glossaries are parsed with different options
+        gloss_path = _write_bib(temp_folder, "gloss.bib", GLOSS_TEXT)
+        assert read_bibliography(gloss_path) == {}
+        bibdb = BibGlossDB()
+        bibdb.load_bib(path=gloss_path)
+        assert bibdb["term1"].label == "Term"
+        bibdb["term1"].key = "other"
+        bibdb = BibGlossDB()
+        bibdb.load_bib(path=gloss_path)
+        assert list(bibdb.keys()) == ["term1"]
+        assert len(calls) == 4
+
+    bibcache.clear_memory()
+
+
+def test_bib_entries_not_persisted_by_default(temp_folder, monkeypatch):
+    bibcache.clear_memory()
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_folder, "cache"))
+    path = _write_bib(temp_folder, "refs.bib", BIB_TEXT)
+    calls = _record_parses(monkeypatch)
+
+    assert read_bibliography(path)["key1"]["year"] == "2019"
+    assert not os.path.exists(os.path.join(temp_folder, "cache"))
+    # the entries are still kept in memory
+    assert read_bibliography(path)["key1"]["year"] == "2019"
+    assert len(calls) == 1
+
+    bibcache.clear_memory()
+
+
+def test_bib_entries_stored_as_json(temp_folder, monkeypatch):
+    bibcache.clear_memory()
+    path = _write_bib(temp_folder, "refs.bib", BIB_TEXT)
+    calls = _record_parses(monkeypatch)
+    cache = DiskCache(os.path.join(temp_folder, "cache"))
+
+    with activate_cache(bibcache.CACHE_NAME, cache):
+        expected = read_bibliography(path)
+    (entry_path,) = [p for p in cache.folder.glob("*/*")]
+    assert json.loads(entry_path.read_text())[0]["ID"] == "key1"
+
+    # data in any other format is ignored, and replaced
+    entry_path.write_bytes(pickle.dumps([{"ID": "other"}]))
+    bibcache.clear_memory()
+    with activate_cache(bibcache.CACHE_NAME, cache):
+        assert read_bibliography(path) == expected
+    assert len(calls) == 2
+    assert json.loads(entry_path.read_text())[0]["ID"] == "key1"
+
+    bibcache.clear_memory()
+
+
+@pytest.mark.ipynb("nb_with_bib")
+def test_publish_bib_cache(ipynb_app, temp_folder):
+    bibcache.clear_memory()
+    cache_folder = os.path.join(temp_folder, "cache")
+    folder = os.path.join(cache_folder, bibcache.CACHE_NAME)
+    ipynb_app.run({"conversion": "html_ipypublish_main", "cache_folder": cache_folder})
+    assert not os.path.exists(folder)
+    bibcache.clear_memory()
+    ipynb_app.run(
+        {
+            "conversion": "html_ipypublish_main",
+            "cache_folder": cache_folder,
+            "bib_cache": True,
+        }
+    )
+    assert len(os.listdir(folder)) == 1
+    bibcache.clear_memory()
@@ -0,0 +1,165 @@
+import json
+import os
+import pickle
+import shutil
+import time
+
+import pytest
+
+from ipypublish.convert.cache import DiskCache, activate_cache, cached_pandoc
+from ipypublish.convert.result_cache import restore_result, store_result
+
+
+def test_disk_cache(temp_folder):
+    cache = DiskCache(temp_folder)
+    assert cache.get("abc") is None
+    cache.set("abc", "some text")
+    assert "abc" in cache
+    assert cache.get("abc") == "some text"
+    cache.set_bytes("def", b"\x00\x01")
+    assert cache.get_bytes("def") == b"\x00\x01"
+    cache.clear()
+    assert "abc" not in cache
+
+
+def test_disk_cache_eviction(temp_folder):
+    cache = DiskCache(temp_folder, max_size=25)
+    cache.set("key1", "a" * 10)
+    cache.set("key2", "b" * 10)
+    # make key1 the most recently used
+    past = time.time() - 10
+    os.utime(os.path.join(temp_folder, "ke", "key2"), (past, past))
+    assert cache.get("key1") == "a" * 10
+    cache.set("key3", "c" * 10)
+    assert "key1" in cache
+    assert "key2" not in cache
+    assert "key3" in cache
+
+
+def test_cached_pandoc(temp_folder):
+    calls = []
+
+    def convert():
+        calls.append(1)
+        return "converted"
+
+    # no active cache
+    assert cached_pandoc(("a",), convert) == "converted"
+    assert cached_pandoc(("a",), convert) == "converted"
+    assert len(calls) == 2
+
+    with activate_cache("pandoc", DiskCache(temp_folder)):
+        assert cached_pandoc(("a",), convert) == "converted"
+        assert cached_pandoc(("a",), convert) == "converted"
+    assert len(calls) == 3
+
+
+@pytest.mark.ipynb("basic_nb")
+def test_publish_with_pandoc_cache(ipynb_app, temp_folder):
+    config = {
+        "conversion": "latex_ipypublish_main",
+        "pandoc_cache": True,
+        "cache_folder": temp_folder,
+    }
+    ipynb_app.run(dict(config, pandoc_cache=False))
+    expected = ipynb_app.output_data["stream"]
+    ipynb_app.run(dict(config))
+    assert os.listdir(os.path.join(temp_folder, "pandoc"))
+    assert ipynb_app.output_data["stream"] == expected
+    ipynb_app.run(dict(config))
+    assert ipynb_app.output_data["stream"] == expected
+
+
+def _list_files(folder):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), folder)
+        for root, _, names in os.walk(folder)
+        for name in names
+        if not name.endswith(".nbpub.log")
+    )
+
+
+@pytest.mark.ipynb("nb_complex_outputs")
+def test_publish_with_result_cache(ipynb_app, temp_folder):
+    config = {
+        "conversion": "latex_ipypublish_all",
+        "result_cache": True,
+        "cache_folder": os.path.join(temp_folder, "cache"),
+        "default_pporder_kwargs": {"clear_existing": True, "dump_files": True},
+    }
+    ipynb_app.run(dict(config))
+    assert ipynb_app.output_data["result_cache"] == "miss"
+    expected = ipynb_app.output_data["stream"]
+    expected_outputs = ipynb_app.output_data["resources"]["outputs"]
+    expected_files = _list_files(str(ipynb_app.converted_path))
+    assert "main.tex" in expected_files
+    assert "main_files/example.bib" in expected_files
+
+    # the stream and files are restored
+    shutil.rmtree(str(ipynb_app.converted_path))
+    ipynb_app.run(dict(config))
+    assert ipynb_app.output_data["result_cache"] == "hit"
+    assert ipynb_app.output_data["stream"] == expected
+    assert ipynb_app.output_data["resources"]["outputs"] == expected_outputs
+    assert str(ipynb_app.output_data["main_filepath"]).endswith("main.tex")
+    assert _list_files(str(ipynb_app.converted_path)) == expected_files
+    ipynb_app.assert_converted_exists()
+
+    # the remove-folder post-processor is run again, removing stale files
+    stale_path = ipynb_app.converted_path.joinpath("main_files", "stale.txt")
+    stale_path.write_text(u"stale")
+    ipynb_app.run(dict(config))
+    assert ipynb_app.output_data["result_cache"] == "hit"
+    assert not stale_path.exists()
+    assert _list_files(str(ipynb_app.converted_path)) == expected_files
+
+    # changing a file that the conversion depends on invalidates the result
+    bib_path = str(ipynb_app.source_path.joinpath("example.bib"))
+    stat = os.stat(bib_path)
+    os.utime(bib_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    ipynb_app.run(dict(config))
+    assert ipynb_app.output_data["result_cache"] == "miss"
+    assert ipynb_app.output_data["stream"] == expected
+
+    ipynb_app.run(dict(config, result_cache=False))
+    assert ipynb_app.output_data["result_cache"] is None
+
+
+def test_result_stored_as_json(temp_folder):
+    cache = DiskCache(os.path.join(temp_folder, "cache"))
+    outdir = os.path.join(temp_folder, "out")
+    os.mkdir(outdir)
+    with open(os.path.join(outdir, "main.tex"), "w") as handle:
+        handle.write("content")
+    resources = {"metadata": {"name": "main"}, "unserialisable": object()}
+    resources["outputs"] = {"main_files/a.png": b"\x00\x01"}
+    assert store_result(
+        cache,
+        "key",
+        "stream",
+        os.path.join(outdir, "main.tex"),
+        resources,
+        outdir,
+        ["main.tex"],
+    )
+    record = json.loads(cache.get("key"))
+    assert record["stream"] == "stream"
+    assert "unserialisable" not in record["resources"]
+
+    os.remove(os.path.join(outdir, "main.tex"))
+    stream, main_filepath, restored = restore_result(cache, "key", outdir)
+    assert stream == "stream"
+    assert str(main_filepath) == os.path.join(outdir, "main.tex")
+    assert restored["outputs"] == {"main_files/a.png": b"\x00\x01"}
+    assert restored["metadata"] == {"name": "main"}
+    with open(os.path.join(outdir, "main.tex")) as handle:
+        assert handle.read() == "content"
+
+    # records in any other format are ignored
+    cache.set_bytes("key", pickle.dumps(record))
+    assert restore_result(cache, "key", outdir) is None
+    # as are files outside of the output folder
+    record["files"] = {"../main.tex": record["files"]["main.tex"]}
+    cache.set("key", json.dumps(record))
+    assert restore_result(cache, "key", outdir) is None
+    assert not os.path.exists(os.path.join(temp_folder, "main.tex"))
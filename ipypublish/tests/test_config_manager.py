@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+
+from ipypublish.convert import config_manager, plugin_index
+from ipypublish.convert.config_manager import (
+    clear_caches,
+    get_export_config_path,
+    load_export_config,
+    load_template,
+)
+from ipypublish.convert.main import IpyPubMain
+
+
+def test_export_config_cache(temp_folder, external_export_plugin, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_folder, "cache"))
+    clear_caches()
+    assert get_export_config_path("new_plugin", [temp_folder]) is None
+
+    # adding a file to the folder invalidates the lookup
+    path = os.path.join(temp_folder, "new_plugin.json")
+    shutil.copyfile(str(external_export_plugin), path)
+    assert str(get_export_config_path("new_plugin", [temp_folder])) == path
+
+    data = load_export_config(path)
+    assert path in config_manager._CACHES["export_config"]
+    # the cached data can not be mutated by the caller
+    data["description"] = ["changed"]
+    assert load_export_config(path)["description"] != ["changed"]
+
+    # changing the file invalidates the data
+    data = load_export_config(path)
+    data["description"] = ["changed"]
+    with open(path, "w") as handle:
+        json.dump(data, handle)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_export_config(path)["description"] == ["changed"]
+
+    template_dict = load_export_config(path)["template"]
+    template = load_template("template_name", template_dict)
+    assert load_template("template_name", template_dict).mapping == template.mapping
+
+    clear_caches()
+    assert not config_manager._CACHES["export_config"]
+
+
+def test_plugin_index(temp_folder, external_export_plugin):
+    clear_caches()
+    index_folder = os.path.join(temp_folder, "cache")
+    plugin_folder = os.path.join(temp_folder, "plugins")
+    os.mkdir(plugin_folder)
+    path = os.path.join(plugin_folder, "new_plugin.json")
+    shutil.copyfile(str(external_export_plugin), path)
+
+    infos = {
+        i["key"]: i
+        for i in config_manager.iter_all_export_infos(
+            [plugin_folder], index_folder=index_folder
+        )
+    }
+    assert infos["new_plugin"]["path"] == path
+    assert infos["new_plugin"]["class"] == "nbconvert.exporters.HTMLExporter"
+    assert "latex_ipypublish_main" in infos
+    index_path = plugin_index.get_index_path(index_folder)
+    assert os.path.exists(index_path)
+
+    # the persisted index is used by a new process
+    plugin_index._INDEXES.clear()
+    with open(index_path) as handle:
+        assert os.path.abspath(plugin_folder) in json.load(handle)["folders"]
+    assert (
+        str(get_export_config_path("new_plugin", [plugin_folder], index_folder))
+        == path
+    )
+
+    # changes to plugin files are picked up when listing
+    data = load_export_config(path)
+    data["description"] = ["changed"]
+    with open(path, "w") as handle:
+        json.dump(data, handle)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    infos = {
+        i["key"]: i
+        for i in config_manager.iter_all_export_infos(
+            [plugin_folder], index_folder=index_folder
+        )
+    }
+    assert infos["new_plugin"]["description"] == ["changed"]
+
+    os.remove(path)
+    assert get_export_config_path("new_plugin", [plugin_folder], index_folder) is None
+    clear_caches()
+
+
+def test_plugin_index_not_persisted(temp_folder, external_export_plugin):
+    clear_caches()
+    path = os.path.join(temp_folder, "new_plugin.json")
+    shutil.copyfile(str(external_export_plugin), path)
+    assert str(get_export_config_path("new_plugin", [temp_folder])) == path
+    assert os.listdir(temp_folder) == ["new_plugin.json"]
+
+    # a folder that can not be written to is skipped
+    not_a_folder = os.path.join(temp_folder, "new_plugin.json", "cache")
+    found = get_export_config_path("new_plugin", [temp_folder], not_a_folder)
+    assert str(found) == path
+    assert os.listdir(temp_folder) == ["new_plugin.json"]
+    clear_caches()
+
+
+def test_plugin_index_cache_folder(temp_folder):
+    clear_caches()
+    cache_folder = os.path.join(temp_folder, "cache")
+    publish = IpyPubMain(config={"IpyPubMain": {"cache_folder": cache_folder}})
+    publish._load_config_file({})
+    assert os.path.exists(plugin_index.get_index_path(cache_folder))
+
+    clear_caches()
+    cache_folder = os.path.join(temp_folder, "other")
+    publish = IpyPubMain(
+        config={"IpyPubMain": {"cache_folder": cache_folder, "plugin_index": False}}
+    )
+    publish._load_config_file({})
+    assert not os.path.exists(cache_folder)
+    clear_caches()
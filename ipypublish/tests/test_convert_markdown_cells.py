@@ -44,3 +44,14 @@ def test_sphinx_rst_with_mkdown_images(ipynb_app):
     ipynb_app.assert_converted_exists()
     ipynb_app.assert_converted_equals_expected("sphinx_ipypublish_main")
     assert ipynb_app.converted_path.joinpath("main_files/example.jpg").is_file()
+
+
+@pytest.mark.parametrize(
+    "conversion", ["latex_ipypublish_main", "sphinx_ipypublish_main"]
+)
+@pytest.mark.ipynb("nb_markdown_cells")
+def test_batch_pandoc(ipynb_app, conversion):
+    ipynb_app.run({"conversion": conversion, "batch_pandoc": False})
+    expected = ipynb_app.output_data["stream"]
+    ipynb_app.run({"conversion": conversion, "batch_pandoc": True})
+    assert ipynb_app.output_data["stream"] == expected
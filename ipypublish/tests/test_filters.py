@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from ipypublish.filters.ansi_listings import ansi2listings
+
+LOG_LINE = "\x1b[1;32mepoch\x1b[0m 1/10 \x1b[31mloss\x1b[0m: 0.1234 - acc_val: 0.99\n"
+
+
+def _time_ansi2listings(size):
+    """convert coloured output of ~size bytes, return the time taken"""
+    num_lines = size // len(LOG_LINE)
+    text = LOG_LINE * num_lines
+    start_time = time.time()
+    new = ansi2listings(text)
+    duration = time.time() - start_time
+    assert new.count("{ansi-green-intense}{\\textbf{epoch}}") == num_lines
+    assert "\x1b" not in new
+    return duration
+
+
+def test_ansi2listings_scaling():
+    """coloured output should convert in linear time"""
+    small = min(_time_ansi2listings(10 ** 5) for _ in range(3))
+    large = min(_time_ansi2listings(10 ** 6) for _ in range(3))
+    # a quadratic conversion would take ~100 times longer
+    assert large < 30 * max(small, 0.001)
+
+
+@pytest.mark.benchmark
+def test_ansi2listings_benchmark():
+    """10MB of coloured output should convert in linear time"""
+    small = _time_ansi2listings(10 ** 6)
+    large = _time_ansi2listings(10 * 10 ** 6)
+    assert large < 30 * small
+
+
+@pytest.mark.benchmark
+def test_ansi2listings_no_escapes_benchmark():
+    """text without escapes should be returned within a second"""
+    text = "plain_text & more\n" * 10 ** 6
+    start_time = time.time()
+    assert ansi2listings(text) == text
+    assert time.time() - start_time < 1
+
+
+def test_ansi2listings_no_escapes():
+    text = "plain_text & more\n" * 10 ** 4
+    assert ansi2listings(text) == text
+    assert ansi2listings(text, escapechar="") == text.replace("_", "\\_").replace(
+        "&", "\\&"
+    )
@@ -1,3 +1,4 @@
+import json
 import os
 import pytest
 from ipypublish.utils import pathlib  # noqa: F401
@@ -159,3 +160,78 @@ def test_nbpublish_to_pdf(ipynb_app):
     assert ipynb_app.converted_path.joinpath(
         ipynb_app.input_file.name.replace(".ipynb", ".pdf")
     ).exists()
+
+
+@pytest.mark.ipynb("basic_nb")
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_nbpublish_multiple(ipynb_app, jobs):
+    # type: (str, pathlib.Path) -> None
+    other_file = ipynb_app.source_path.joinpath("other.ipynb")
+    other_file.write_text(ipynb_app.input_file.read_text())
+    assert 0 == nbpublish.run(
+        [
+            str(ipynb_app.source_path.joinpath("*.ipynb")),
+            "--outformat",
+            "latex_ipypublish_main",
+            "--outpath",
+            str(ipynb_app.converted_path),
+            "--jobs",
+            jobs,
+        ]
+    )
+    for name in ["main", "other"]:
+        outpath = ipynb_app.converted_path.joinpath(name)
+        assert outpath.joinpath(name + ".tex").exists()
+        assert outpath.joinpath(name + ".nbpub.log").exists()
+
+    assert 1 == nbpublish.run(
+        [
+            str(ipynb_app.input_file),
+            str(ipynb_app.source_path.joinpath("missing.ipynb")),
+            "--outpath",
+            str(ipynb_app.converted_path),
+            "--dry-run",
+            "--jobs",
+            jobs,
+        ]
+    )
+
+
+@pytest.mark.ipynb("basic_nb")
+def test_nbpublish_trace(ipynb_app):
+    # type: (str, pathlib.Path) -> None
+    trace_path = ipynb_app.converted_path.joinpath("trace.json")
+    assert 0 == nbpublish.run(
+        [
+            str(ipynb_app.input_file),
+            "--outformat",
+            "sphinx_ipypublish_main",
+            "--outpath",
+            str(ipynb_app.converted_path),
+            "--trace",
+            str(trace_path),
+            "-pt",
+        ]
+    )
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    names = set(event["name"] for event in events)
+    assert {
+        "merge_notebooks",
+        "validate_metadata",
+        "load_config",
+        "load_template",
+        "preprocess:LatexDocLinks",
+        "render_template",
+        "ipypandoc",
+        "pandoc",
+        "postprocess:write-text-file",
+    }.issubset(names), names
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
+@pytest.mark.ipynb("basic_nb")
+def test_convert_pandoc_timed_without_cache(ipynb_app):
+    ipynb_app.run({"conversion": "latex_standard_article", "pandoc_cache": False})
+    stages = ipynb_app.output_data["timings"]["stages"]
+    assert stages["convert_pandoc"]["count"] == 2
+    assert "pandoc" in stages
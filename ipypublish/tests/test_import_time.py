@@ -0,0 +1,60 @@
+"""regression benchmarks for the CLI startup time,
+using ``python -X importtime`` to record the modules imported
+"""
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = (
+    "jsonschema",
+    "jsonextended",
+    "nbconvert",
+    "nbformat",
+    "panflute",
+    "pkg_resources",
+    "ruamel.yaml",
+    "tornado",
+    "traitlets",
+)
+
+
+def get_import_times(code):
+    """return {module: cumulative import time (us)} for running the code"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "from ipypublish.frontend import nbpublish, nbpresent",
+        "from ipypublish.frontend.shared import parse_options\n"
+        "try:\n    parse_options(['--version'], 'nbpublish')\n"
+        "except SystemExit:\n    pass",
+        "from ipypublish.frontend.shared import get_plugin_str\n"
+        "get_plugin_str([], '*', False)",
+    ],
+    ids=["import", "version", "list"],
+)
+def test_cli_startup_imports(code):
+    times = get_import_times(code)
+    heavy = [
+        name
+        for name in times
+        if any(name == m or name.startswith(m + ".") for m in HEAVY_MODULES)
+    ]
+    assert not heavy, "heavy modules imported at startup: {}".format(heavy)
@@ -0,0 +1,117 @@
+import nbformat
+import pytest
+
+from ipypublish.convert.incremental import IncrementalTemplate
+
+
+@pytest.fixture
+def rendered_cells(monkeypatch):
+    """record the cells rendered by each incremental render"""
+    rendered = []
+    render = IncrementalTemplate.render
+
+    def spy_render(self, *args, **kwargs):
+        output = render(self, *args, **kwargs)
+        rendered.append(self.rendered_cells)
+        return output
+
+    monkeypatch.setattr(IncrementalTemplate, "render", spy_render)
+    return rendered
+
+
+def _run(ipynb_app, config, rendered_cells):
+    """run the conversion, and return the cells rendered by it"""
+    del rendered_cells[:]
+    ipynb_app.run(config)
+    assert len(rendered_cells) == 1
+    return rendered_cells[0]
+
+
+def _edit_notebook(ipynb_app, func):
+    notebook = nbformat.read(str(ipynb_app.input_file), nbformat.NO_CONVERT)
+    func(notebook)
+    nbformat.write(notebook, str(ipynb_app.input_file))
+
+
+@pytest.mark.ipynb("basic_nb")
+@pytest.mark.parametrize(
+    "conversion", ["latex_ipypublish_main", "sphinx_ipypublish_main"]
+)
+def test_publish_incremental(ipynb_app, conversion, rendered_cells):
+    config = {"conversion": conversion, "incremental": True}
+    manifest = ipynb_app.converted_path.joinpath("main.ipubmanifest.json")
+
+    ipynb_app.run(dict(config, incremental=False))
+    expected = ipynb_app.output_data["stream"]
+    assert not manifest.exists()
+    assert rendered_cells == []
+
+    # no manifest, so all cells are rendered
+    num_cells = len(_run(ipynb_app, config, rendered_cells))
+    assert num_cells > 1
+    assert manifest.exists()
+    assert ipynb_app.output_data["stream"] == expected
+    # all cells are taken from the manifest
+    assert _run(ipynb_app, config, rendered_cells) == []
+    assert ipynb_app.output_data["stream"] == expected
+
+    # change a single cell
+    def add_sentence(notebook):
+        cell = [c for c in notebook.cells if c.cell_type == "markdown"][-1]
+        cell.source += "\n\nAn *additional* sentence."
+
+    _edit_notebook(ipynb_app, add_sentence)
+
+    ipynb_app.run(dict(config, incremental=False))
+    expected = ipynb_app.output_data["stream"]
+    assert "additional" in expected
+    assert len(_run(ipynb_app, config, rendered_cells)) == 1
+    assert ipynb_app.output_data["stream"] == expected
+
+    # change the global state, so all cells are invalidated
+    def add_metadata(notebook):
+        notebook.metadata.setdefault("ipub", {})["listcode"] = True
+
+    _edit_notebook(ipynb_app, add_metadata)
+
+    ipynb_app.run(dict(config, incremental=False))
+    expected = ipynb_app.output_data["stream"]
+    assert len(_run(ipynb_app, config, rendered_cells)) == num_cells
+    assert ipynb_app.output_data["stream"] == expected
+
+
+@pytest.mark.ipynb("nb_complex_outputs")
+def test_publish_incremental_captions(ipynb_app, rendered_cells):
+    """changing a caption cell should re-render the cell it is applied to"""
+    config = {"conversion": "latex_ipypublish_main", "incremental": True}
+
+    num_cells = len(_run(ipynb_app, config, rendered_cells))
+    assert _run(ipynb_app, config, rendered_cells) == []
+
+    def edit_caption(notebook):
+        cell = [
+            c
+            for c in notebook.cells
+            if c.metadata.get("ipub", {}).get("caption") == "code:example_mpl"
+        ][0]
+        cell.source = "A *new* caption for the code."
+
+    _edit_notebook(ipynb_app, edit_caption)
+
+    ipynb_app.run(dict(config, incremental=False))
+    expected = ipynb_app.output_data["stream"]
+    assert "A \\emph{new} caption for the code." in expected
+    assert len(_run(ipynb_app, config, rendered_cells)) == 1
+    assert ipynb_app.output_data["stream"] == expected
+
+    # LatexCaptions applies captions to the cell metadata,
+    # whereas a change to the notebook metadata invalidates all cells
+    def list_code(notebook):
+        notebook.metadata.ipub.listcode = not notebook.metadata.ipub.listcode
+
+    _edit_notebook(ipynb_app, list_code)
+
+    ipynb_app.run(dict(config, incremental=False))
+    expected = ipynb_app.output_data["stream"]
+    assert len(_run(ipynb_app, config, rendered_cells)) == num_cells
+    assert ipynb_app.output_data["stream"] == expected
@@ -0,0 +1,154 @@
+import base64
+import copy
+import json
+import os
+import pickle
+
+import nbformat
+import pytest
+
+from ipypublish.convert.cache import hash_key
+from ipypublish.convert.lazy_outputs import (
+    LazyPayload,
+    LazyPayloadBytes,
+    materialize,
+    validate_notebook,
+)
+from ipypublish.convert.main import IpyPubMain
+from ipypublish.convert.nbmerge import merge_notebooks, read_notebook
+
+
+def _create_notebook(folder, name="notebook.ipynb", size=100000):
+    image = os.urandom(size)
+    cell = nbformat.v4.new_code_cell("plot()")
+    cell.outputs = [
+        nbformat.v4.new_output(
+            "display_data",
+            data={
+                "image/png": base64.encodebytes(image).decode("ascii"),
+                "text/plain": "<Figure>",
+            },
+        )
+    ]
+    small = nbformat.v4.new_code_cell("plot_small()")
+    small.outputs = [
+        nbformat.v4.new_output("display_data", data={"image/png": "iVBORw0KGgo="})
+    ]
+    nb = nbformat.v4.new_notebook(
+        cells=[nbformat.v4.new_markdown_cell("# title"), cell, small]
+    )
+    path = os.path.join(folder, name)
+    nbformat.write(nb, path)
+    return path, image
+
+
+def test_read_lazy_outputs(temp_folder):
+    path, image = _create_notebook(temp_folder)
+    expected = read_notebook(path)
+    nb = read_notebook(path, lazy_outputs=True)
+
+    payload = nb.cells[1].outputs[0].data["image/png"]
+    assert isinstance(payload, LazyPayload)
+    assert payload.resolve() == expected.cells[1].outputs[0].data["image/png"]
+    assert str(payload) == payload.resolve()
+    assert payload.to_bytes() == image
+    assert b"".join(payload.iter_bytes(chunk_size=1001)) == image
+    assert LazyPayloadBytes(payload) == image
+    # small payloads are loaded as normal
+    assert not isinstance(nb.cells[2].outputs[0].data["image/png"], LazyPayload)
+    # payloads are not copied
+    assert copy.deepcopy(nb).cells[1].outputs[0].data["image/png"] is payload
+    validate_notebook(nb)
+    assert nb.cells[1].outputs[0].data["image/png"] is payload
+    # payloads are not strings, so must be resolved explicitly
+    with pytest.raises(TypeError):
+        "".join([payload])
+    with pytest.raises(TypeError):
+        len(payload)
+    with pytest.raises(TypeError):
+        json.dumps(payload)
+    with pytest.raises(nbformat.ValidationError):
+        nbformat.validate(nb)
+    assert materialize(copy.deepcopy(nb)) == expected
+
+    merged = merge_notebooks(path, to_str=True, lazy_outputs=True)
+    assert nbformat.reads(merged, as_version=4).cells == expected.cells
+
+
+def test_lazy_payload_identity(temp_folder):
+    path, _ = _create_notebook(temp_folder)
+    payload = read_notebook(path, lazy_outputs=True).cells[1].outputs[0].data[
+        "image/png"
+    ]
+    key = hash_key(payload)
+
+    # the payload is identified by its content, not the file modification time
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    reread = read_notebook(path, lazy_outputs=True).cells[1].outputs[0].data[
+        "image/png"
+    ]
+    assert reread == payload
+    assert hash_key(reread) == key
+    assert pickle.loads(pickle.dumps(payload)) == payload
+    # and can still be read, if the content is unchanged
+    assert payload.to_bytes() == reread.to_bytes()
+
+    # a changed payload has a new identity, and can not be read
+    _, image = _create_notebook(temp_folder)
+    changed = read_notebook(path, lazy_outputs=True).cells[1].outputs[0].data[
+        "image/png"
+    ]
+    assert changed != payload
+    assert hash_key(changed) != key
+    assert changed.to_bytes() == image
+    with pytest.raises(IOError):
+        payload.resolve()
+
+
+def test_publish_lazy_outputs(temp_folder):
+    path, image = _create_notebook(temp_folder)
+
+    def publish(lazy_outputs):
+        outpath = os.path.join(temp_folder, "lazy" if lazy_outputs else "eager")
+        app = IpyPubMain(
+            config={
+                "IpyPubMain": {
+                    "conversion": "latex_ipypublish_all",
+                    "lazy_outputs": lazy_outputs,
+                    "outpath": outpath,
+                    "default_pporder_kwargs": {"dump_files": True},
+                }
+            }
+        )
+        data = app(path)
+        with open(
+            os.path.join(outpath, "notebook_files", "output_1_0.png"), "rb"
+        ) as handle:
+            assert handle.read() == image
+        return data
+
+    eager = publish(False)
+    lazy = publish(True)
+    assert lazy["stream"] == eager["stream"]
+    assert isinstance(
+        lazy["resources"]["outputs"]["notebook_files/output_1_0.png"],
+        LazyPayloadBytes,
+    )
+
+
+def test_publish_lazy_outputs_notebook(temp_folder):
+    path, _ = _create_notebook(temp_folder)
+    streams = []
+    for lazy_outputs in (False, True):
+        app = IpyPubMain(
+            config={
+                "IpyPubMain": {
+                    "conversion": "nb_ipypublish_all",
+                    "lazy_outputs": lazy_outputs,
+                    "outpath": os.path.join(temp_folder, str(lazy_outputs)),
+                }
+            }
+        )
+        streams.append(app(path)["stream"])
+    assert streams[1] == streams[0]
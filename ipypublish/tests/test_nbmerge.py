@@ -1,5 +1,10 @@
+import os
+
+import nbformat
 import pytest
 from ipypublish.convert import nbmerge
+from ipypublish.convert.execute import execute_notebooks
+from ipypublish.convert.main import IpyPubMain
 
 
 @pytest.mark.ipynb("basic_nb")
@@ -16,7 +21,91 @@ def test_nbmerge_two_notebooks(ipynb_app):
     assert len(nb.cells) == 4
 
 
+@pytest.mark.ipynb("merge_nbs", main_file=None)
+def test_nbmerge_read_notebooks_unchanged(ipynb_app):
+    nbs = []
+
+    def read_func(paths):
+        nbs.extend(nbmerge.read_notebooks(paths))
+        return nbs
+
+    nb, path = nbmerge.merge_notebooks(ipynb_app.source_path, read_func=read_func)
+    assert len(nb.cells) == 4
+    assert [len(n.cells) for n in nbs] == [2, 2]
+    assert nb.metadata.name.endswith("_merged")
+    assert not nbs[0].metadata.get("name", "").endswith("_merged")
+
+
 @pytest.mark.ipynb("merge_nbs", main_file=None)
 def test_merge_latex(ipynb_app):
     ipynb_app.run()
     ipynb_app.assert_converted_exists()
+
+
+@pytest.mark.parametrize("lazy_outputs", [False, True])
+def test_merge_executed_separately(temp_folder, lazy_outputs):
+    source = os.path.join(temp_folder, "source")
+    os.mkdir(source)
+    for i, code in enumerate(["a = 1", "print('a defined:', 'a' in dir())"]):
+        nb = nbformat.v4.new_notebook(
+            cells=[
+                nbformat.v4.new_markdown_cell("# chapter {}".format(i)),
+                nbformat.v4.new_code_cell(code),
+            ],
+            metadata={
+                "kernelspec": {"name": "python3", "display_name": "Python 3"},
+                "test_name": "notebook{}".format(i),
+            },
+        )
+        nbformat.write(nb, os.path.join(source, "ipynb{}.ipynb".format(i)))
+
+    app = IpyPubMain(
+        config={
+            "IpyPubMain": {
+                "conversion": "latex_ipypublish_all.exec",
+                "execute_processes": 2,
+                "lazy_outputs": lazy_outputs,
+                "outpath": os.path.join(temp_folder, "converted"),
+            }
+        }
+    )
+    stream = app(source)["stream"]
+    # each notebook is executed in its own kernel
+    assert "a defined: False" in stream
+    assert stream.index("chapter 0") < stream.index("chapter 1")
+
+
+def test_execute_notebooks_not_reread(temp_folder):
+    # the notebooks are executed as given, without reading the paths
+    nbs = [
+        nbformat.v4.new_notebook(
+            cells=[nbformat.v4.new_code_cell("print({})".format(i))],
+            metadata={"kernelspec": {"name": "python3", "display_name": "Python 3"}},
+        )
+        for i in range(2)
+    ]
+    paths = [os.path.join(temp_folder, "missing{}.ipynb".format(i)) for i in range(2)]
+    executed = execute_notebooks(
+        nbs, paths, "nbconvert.preprocessors.ExecutePreprocessor", processes=2
+    )
+    assert [nb.cells[0].outputs[0].text for nb in executed] == ["0\n", "1\n"]
+
+
+@pytest.mark.ipynb("merge_nbs", main_file=None)
+def test_read_notebook(ipynb_app):
+    for path in nbmerge.find_notebooks(ipynb_app.source_path):
+        with path.open(encoding="utf8") as handle:
+            expected = nbformat.read(handle, as_version=4)
+        assert nbmerge.read_notebook(path) == expected
+
+
+@pytest.mark.ipynb("merge_nbs", main_file=None)
+def test_nbmerge_concurrent_read(ipynb_app):
+    nb, path = nbmerge.merge_notebooks(ipynb_app.source_path, max_workers=4)
+    serial_nb, _ = nbmerge.merge_notebooks(ipynb_app.source_path, max_workers=1)
+    assert nb == serial_nb
+    assert path.name == "ipynb1.ipynb"
+    assert [cell.source for cell in nb.cells][::2] == [
+        "# a title\n\nsome text\n",
+        "hallo",
+    ]
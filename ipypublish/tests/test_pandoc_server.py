@@ -0,0 +1,164 @@
+import time
+
+import pytest
+
+from ipypublish.convert.main import IpyPubMain
+from ipypublish.convert.pandoc_server import (
+    PandocServer,
+    activate_pandoc_server,
+    find_server_command,
+    get_pandoc_server,
+    start_pandoc_server,
+)
+from ipypublish.convert.timing import Tracer, activate_tracer
+from ipypublish.filters.filters import convert_pandoc
+from ipypublish.filters_pandoc import utils
+from ipypublish.filters_pandoc.main import jinja_filter
+
+requires_server = pytest.mark.skipif(
+    find_server_command() is None, reason="pandoc server (pandoc >= 3.0) not available"
+)
+
+SOURCES = [
+    "some *emphasised* text, with a [link](https://pandoc.org)",
+    "+@label and \\cref{other}",
+    "$$a=1$${#eq:label1}",
+    "- a\n- list",
+]
+
+
+def test_parse_format_args():
+    assert utils._parse_format_args(["-f", "json", "-t", "latex"]) == (
+        "json",
+        "latex",
+        False,
+    )
+    assert utils._parse_format_args(["--to=json", "-s"]) == ("markdown", "json", True)
+    assert utils._parse_format_args(["-t", "latex", "--wrap=none"]) is None
+
+
+def test_api_version_found_once():
+    utils.get_api_version()
+    tracer = Tracer()
+    with activate_tracer(tracer):
+        utils.get_api_version()
+        utils.convert_text(utils.pf.Para(utils.pf.Str("a")), "panflute", "latex")
+    # only the conversion itself runs pandoc
+    assert tracer.summary()["stages"]["pandoc"]["count"] == 1
+
+
+def test_server_not_available():
+    server = PandocServer(command=["/path/to/missing/pandoc-server"])
+    assert not server.start()
+    assert not server.running
+    with activate_pandoc_server(None):
+        assert get_pandoc_server() is None
+        # conversions fall back to subprocesses
+        assert jinja_filter("+@label", "latex", {}, {}) == "\\cref{label}"
+
+
+def test_publish_fallback(temp_folder):
+    if find_server_command() is not None:
+        pytest.skip("a pandoc server is available")
+    publish = IpyPubMain(config={"IpyPubMain": {"pandoc_server": True}})
+    assert publish.get_pandoc_server() is None
+    assert publish.get_pandoc_server() is None  # not retried
+
+
+def test_publish_close(monkeypatch):
+    closed = []
+
+    class FakeServer(object):
+        def close(self):
+            closed.append(self)
+
+    monkeypatch.setattr(
+        "ipypublish.convert.main.start_pandoc_server", lambda: FakeServer()
+    )
+    publish = IpyPubMain(config={"IpyPubMain": {"pandoc_server": True}})
+    publish.close()  # no server started
+    server = publish.get_pandoc_server()
+    assert publish.get_pandoc_server() is server
+    publish.close()
+    assert closed == [server]
+    # a new server is started, if the instance is used again
+    assert publish.get_pandoc_server() not in (None, server)
+
+
+@requires_server
+def test_publish_close_server():
+    publish = IpyPubMain(config={"IpyPubMain": {"pandoc_server": True}})
+    server = publish.get_pandoc_server()
+    assert server.running
+    publish.close()
+    assert not server.running
+
+
+@requires_server
+def test_server_conversions():
+    server = start_pandoc_server()
+    assert server is not None
+    try:
+        assert server.version
+        expected = [jinja_filter(source, "latex", {}, {}) for source in SOURCES]
+        expected_rst = convert_pandoc("*a*", "markdown", "rst")
+        with activate_pandoc_server(server):
+            assert [
+                jinja_filter(source, "latex", {}, {}) for source in SOURCES
+            ] == expected
+            assert convert_pandoc("*a*", "markdown", "rst") == expected_rst
+    finally:
+        server.close()
+    assert not server.running
+
+
+@pytest.mark.benchmark
+@requires_server
+def test_server_benchmark():
+    """compare the time taken to convert sources, with subprocesses and a server"""
+    sources = ["{} *text* number {}".format(s, i) for i in range(10) for s in SOURCES]
+    timings = {}
+    outputs = {}
+    server = start_pandoc_server()
+    try:
+        for name, active in [("subprocess", None), ("server", server)]:
+            with activate_pandoc_server(active):
+                start = time.perf_counter()
+                outputs[name] = [jinja_filter(s, "latex", {}, {}) for s in sources]
+                timings[name] = time.perf_counter() - start
+    finally:
+        server.close()
+
+    assert outputs["server"] == outputs["subprocess"]
+    assert timings["server"] < timings["subprocess"]
+
+
+@pytest.mark.parametrize(
+    "options", [{"pandoc_server": True}, {"pandoc_server": True, "pandoc_cache": False}]
+)
+def test_convert_pandoc_filter_installed(options):
+    publish = IpyPubMain(config={"IpyPubMain": options})
+    config = publish._create_export_config(
+        {"class": "nbconvert.exporters.LatexExporter"}, "template", {}
+    )
+    assert (
+        config.LatexExporter.filters["convert_pandoc"]
+        == "ipypublish.filters.filters.convert_pandoc"
+    )
+
+
+@requires_server
+@pytest.mark.ipynb("basic_nb")
+def test_publish_server_without_cache(ipynb_app):
+    ipynb_app.run(
+        {
+            "conversion": "latex_standard_article",
+            "pandoc_server": True,
+            "pandoc_cache": False,
+        }
+    )
+    stages = ipynb_app.output_data["timings"]["stages"]
+    assert stages["convert_pandoc"]["count"] > 0
+    # all conversions are sent to the server
+    assert "pandoc" in stages
+    ipynb_app.assert_converted_exists()
@@ -1,8 +1,14 @@
 import os
+import time
+
 import pytest
+from traitlets.config import Config
 
+from ipypublish.postprocessors import registry
+from ipypublish.postprocessors.base import run_postprocessors
 from ipypublish.postprocessors.pdfexport import PDFExport
 from ipypublish.postprocessors.reveal_serve import RevealServer
+from ipypublish.postprocessors.stream_modify import FilterOutputFiles, RemoveBlankLines
 
 
 @pytest.mark.requires_latexmk
@@ -31,3 +37,91 @@ def test_reveal_server():
     RevealServer()
     # TODO test reveal server runs correctly,
     # possibly use https://github.com/eugeniy/pytest-tornado
+
+
+def test_load_postprocessors():
+    registry.clear_registry()
+    assert "write-text-file" in registry.get_registry()
+    procs = registry.load_postprocessors(
+        ["remove-blank-lines", "remove-blank-lines"], Config()
+    )
+    assert [type(p) for p in procs] == [RemoveBlankLines, RemoveBlankLines]
+    assert procs[0] is not procs[1]
+    with pytest.raises(ImportError):
+        registry.load_postprocessors(["non-existent"], Config())
+
+
+@pytest.mark.parametrize(
+    "stream",
+    [
+        "",
+        "a  \n\n \n\t\nb \r\n\x0c\nc\n",
+        "  \n \n\nabc\n   ",
+        "a\n\n\nfiles/a.png\n\n",
+    ],
+)
+def test_run_postprocessors_streaming(temp_folder, stream):
+    names = [
+        "remove-blank-lines",
+        "remove-trailing-space",
+        "filter-output-files",
+        "write-text-file",
+    ]
+    filepath = os.path.join(temp_folder, "main.txt")
+
+    expected = stream
+    expected_resources = {"outputs": {"files/a.png": b"", "files/b.png": b""}}
+    for proc in registry.load_postprocessors(names, Config()):
+        assert proc.streaming
+        expected, _, expected_resources = proc.postprocess(
+            expected, "text/markdown", filepath, expected_resources
+        )
+    os.remove(filepath)
+
+    output, _, resources = run_postprocessors(
+        registry.load_postprocessors(names, Config()),
+        stream,
+        "text/markdown",
+        filepath,
+        {"outputs": {"files/a.png": b"", "files/b.png": b""}},
+    )
+    assert output == expected
+    assert resources == expected_resources
+    with open(filepath) as handle:
+        assert handle.read() == expected
+
+
+def _filter_output_files(num_outputs, stream_size):
+    """filter outputs against a stream (referencing every other output),
+    return the time taken
+    """
+    outputs = {
+        "main_files/output_{0}_{1}.png".format(i, i % 3): b""
+        for i in range(num_outputs)
+    }
+    referenced = sorted(outputs)[::2]
+    filler = "x" * 5000 + "\n"
+    stream = "".join(
+        "{0}\\includegraphics{{{1}}}\n".format(filler, path) for path in referenced
+    )
+    stream += filler * max(stream_size // len(filler) - len(referenced), 0)
+    assert len(stream) >= stream_size
+
+    start_time = time.time()
+    proc = FilterOutputFiles(Config())
+    _, _, resources = proc.postprocess(stream, "text/latex", None, {"outputs": outputs})
+    duration = time.time() - start_time
+
+    assert sorted(resources["outputs"]) == referenced
+    return duration
+
+
+def test_filter_output_files_many():
+    """1k outputs against a ~10MB stream"""
+    _filter_output_files(1000, 10 * 2 ** 20)
+
+
+@pytest.mark.benchmark
+def test_filter_output_files_benchmark():
+    """10k outputs against a ~50MB stream should be filtered within seconds"""
+    assert _filter_output_files(10000, 50 * 2 ** 20) < 5
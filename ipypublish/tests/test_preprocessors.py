@@ -0,0 +1,204 @@
+import os
+import time
+
+import nbformat
+from nbconvert.preprocessors import ExecutePreprocessor
+import pytest
+
+from ipypublish.preprocessors.execute_cached import CachedExecutePreprocessor
+from ipypublish.preprocessors.kernel_pool import (
+    PooledExecutePreprocessor,
+    PoolTimeoutError,
+    configure_kernel_pool,
+    get_kernel_pool,
+    shutdown_kernel_pool,
+)
+from ipypublish.preprocessors.latextags_to_html import LatexTagsToHTML
+
+
+def _time_convert(num_refs, nested=False):
+    """convert a ~100 byte per reference markdown source, return the time taken"""
+    reference = "\\emph{{\\cref{{fig:{0}}}}}" if nested else "\\cref{{fig:{0}}}"
+    source = "".join(
+        (
+            "some text, with a reference to " + reference + " and a citation "
+            "\\cite{{key{1}}}, followed by some more text.\n"
+        ).format(i, i % 100)
+        for i in range(num_refs)
+    )
+    processor = LatexTagsToHTML()
+    start_time = time.time()
+    new = processor.convert(source, {"refmap": {"fig:0": "Figure A"}})
+    duration = time.time() - start_time
+    assert len(source) >= num_refs * 100
+    assert "\\cref" not in new
+    assert new.count("{id_home_prefix}") == (0 if nested else num_refs)
+    return duration
+
+
+def test_latex_tags_to_html_scaling():
+    """a ~1MB markdown cell with 10k references should convert in linear time"""
+    small = min(_time_convert(1000) for _ in range(3))
+    large = min(_time_convert(10000) for _ in range(3))
+    # a quadratic conversion would take ~100 times longer
+    assert large < 30 * max(small, 0.001)
+
+
+def test_latex_tags_to_html_nested_scaling():
+    """a ~1MB markdown cell with 10k nested references should also be linear"""
+    small = min(_time_convert(1000, nested=True) for _ in range(3))
+    large = min(_time_convert(10000, nested=True) for _ in range(3))
+    assert large < 30 * max(small, 0.001)
+
+
+@pytest.mark.benchmark
+def test_latex_tags_to_html_benchmark():
+    """a ~1MB markdown cell with 10k references should convert within a second"""
+    assert min(_time_convert(10000) for _ in range(3)) < 1
+
+
+def test_latex_tags_to_html_nested():
+    """a tag nested in another is replaced, if it is also found before that tag"""
+    link = '<a href="{id_home_prefix}fig:x">fig. 1</a>'
+    processor = LatexTagsToHTML()
+    new = processor.convert("\\ref{fig:x} and \\emph{\\ref{fig:x}}", {})
+    assert new == "{0} and \\emph{{{0}}}".format(link)
+    processor = LatexTagsToHTML()
+    new = processor.convert("\\emph{\\ref{fig:x}} and \\ref{fig:x}", {})
+    assert new == "}} and {0}".format(link)
+    # a tag starting within a nested tag, and extending beyond it
+    processor = LatexTagsToHTML()
+    new = processor.convert("\\a[\\b{x}]{y} and \\c{\\a[\\b{x}]{y}", {})
+    assert new == " and \\c{"
+
+
+def _fake_execute(calls):
+    """a replacement for ExecutePreprocessor.preprocess, which records calls"""
+
+    def preprocess(self, nb, resources=None, km=None):
+        calls.append(nb)
+        for i, cell in enumerate(c for c in nb.cells if c.cell_type == "code"):
+            cell.execution_count = i + 1
+            cell.outputs = [
+                nbformat.v4.new_output("stream", name="stdout", text=cell.source)
+            ]
+        nb.metadata["language_info"] = {"name": "python"}
+        return nb, resources
+
+    return preprocess
+
+
+def test_cached_execute_preprocessor(temp_folder, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ExecutePreprocessor, "preprocess", _fake_execute(calls))
+    data_path = os.path.join(temp_folder, "data.csv")
+    with open(data_path, "w") as handle:
+        handle.write("a,b")
+
+    def execute(sources):
+        nb = nbformat.v4.new_notebook(
+            cells=[nbformat.v4.new_markdown_cell("# title")]
+            + [nbformat.v4.new_code_cell(source) for source in sources]
+        )
+        processor = CachedExecutePreprocessor(
+            cache_folder=os.path.join(temp_folder, "cache"),
+            dependencies=["*.csv"],
+            enabled=True,
+        )
+        nb, _ = processor(nb, {"metadata": {"path": temp_folder}})
+        return nb
+
+    nb = execute(["a = 1", "print(a)"])
+    assert len(calls) == 1
+    assert nb.cells[2].outputs[0].text == "print(a)"
+
+    # the outputs are restored
+    nb = execute(["a = 1", "print(a)"])
+    assert len(calls) == 1
+    assert nb.cells[2].outputs[0].text == "print(a)"
+    assert nb.cells[2].execution_count == 2
+    assert nb.metadata.language_info.name == "python"
+
+    # changes to the code or dependencies invalidate the cache
+    execute(["a = 2", "print(a)"])
+    assert len(calls) == 2
+    with open(data_path, "w") as handle:
+        handle.write("a,b,c")
+    execute(["a = 1", "print(a)"])
+    assert len(calls) == 3
+
+
+@pytest.mark.ipynb("basic_nb")
+def test_publish_with_execution_cache(ipynb_app, temp_folder, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ExecutePreprocessor, "preprocess", _fake_execute(calls))
+    config = {
+        "conversion": "latex_ipypublish_all.exec",
+        "execution_cache": True,
+        "cache_folder": temp_folder,
+    }
+    ipynb_app.run(dict(config))
+    expected = ipynb_app.output_data["stream"]
+    assert len(calls) == 1
+    assert os.listdir(os.path.join(temp_folder, "execution"))
+    ipynb_app.run(dict(config))
+    assert len(calls) == 1
+    assert ipynb_app.output_data["stream"] == expected
+
+
+def test_pooled_execute_preprocessor(temp_folder):
+    configure_kernel_pool(1, preload="preloaded = True")
+    pool = get_kernel_pool()
+    try:
+        pool.warm("python3")
+
+        def execute(sources):
+            nb = nbformat.v4.new_notebook(
+                cells=[nbformat.v4.new_code_cell(source) for source in sources],
+                metadata={
+                    "kernelspec": {"name": "python3", "display_name": "Python 3"}
+                },
+            )
+            processor = PooledExecutePreprocessor(enabled=True)
+            nb, _ = processor(nb, {"metadata": {"path": temp_folder}})
+            return [
+                "".join(output.text for output in cell.outputs).strip()
+                for cell in nb.cells
+            ]
+
+        assert execute(
+            ["a = 1", "print(preloaded)", "import os; print(os.getcwd())"]
+        ) == ["", "True", os.path.abspath(temp_folder)]
+        # the kernel is restarted before being reused
+        assert execute(["print('a' in dir(), preloaded)"]) == ["False True"]
+        assert pool._count["python3"] == 1
+    finally:
+        shutdown_kernel_pool()
+        configure_kernel_pool(0)
+    assert get_kernel_pool() is None
+
+
+def test_kernel_pool_timeout(temp_folder):
+    configure_kernel_pool(1)
+    pool = get_kernel_pool()
+    try:
+        km = pool.acquire("python3")
+        try:
+            with pytest.raises(PoolTimeoutError):
+                pool.acquire("python3", timeout=0.1)
+            # the preprocessor starts a new kernel instead
+            nb = nbformat.v4.new_notebook(
+                cells=[nbformat.v4.new_code_cell("print(1)")],
+                metadata={
+                    "kernelspec": {"name": "python3", "display_name": "Python 3"}
+                },
+            )
+            processor = PooledExecutePreprocessor(enabled=True, pool_timeout=0.1)
+            nb, _ = processor(nb, {"metadata": {"path": temp_folder}})
+            assert nb.cells[0].outputs[0].text == "1\n"
+        finally:
+            pool.release("python3", km, wait=True)
+        assert pool._count["python3"] == 1
+    finally:
+        shutdown_kernel_pool()
+        configure_kernel_pool(0)
@@ -0,0 +1,105 @@
+import copy
+import time
+
+import jsonschema
+import nbformat
+import pytest
+
+from ipypublish.convert import validate
+
+
+@pytest.fixture(params=["fastjsonschema", "jsonschema"])
+def validators(request, monkeypatch):
+    """run with the compiled validators, and the jsonschema fallback"""
+    if request.param == "jsonschema":
+        monkeypatch.setattr(validate, "fastjsonschema", None)
+    monkeypatch.setattr(validate, "_VALIDATORS", {})
+    yield request.param
+
+
+def _notebook(nb_metadata, cells_metadata):
+    nb = nbformat.v4.new_notebook(metadata=nb_metadata)
+    nb.cells = [nbformat.v4.new_markdown_cell("a", metadata=m) for m in cells_metadata]
+    return nb
+
+
+def test_validator_cached(validators):
+    validator = validate.get_validator(validate.CELL_METADATA_SCHEMA)
+    assert validate.get_validator(validate.CELL_METADATA_SCHEMA) is validator
+
+
+def test_nb_metadata(validators):
+    validate.validate_nb_metadata(_notebook({"ipub": {"titlepage": {}}}, []))
+    with pytest.raises(jsonschema.ValidationError, match="notebook level metadata"):
+        validate.validate_nb_metadata(_notebook({"ipub": {"titlepage": 1}}, []))
+
+
+def test_cell_metadata_all_errors(validators):
+    nb = _notebook(
+        {},
+        [
+            {"ipub": {"figure": {"caption": "a"}}},
+            {"ipub": {"slide": True}},
+            {},
+            {"ipub": {"unknown": 1}},
+        ],
+    )
+    errors = list(validate.iter_cell_metadata_errors(nb))
+    assert [index for index, _ in errors] == [1, 3]
+    assert "slide" in errors[0][1]
+    with pytest.raises(jsonschema.ValidationError) as excinfo:
+        validate.validate_cell_metadata(nb)
+    assert "2 cell(s)" in str(excinfo.value)
+    assert "- cell 1:" in str(excinfo.value)
+    assert "- cell 3:" in str(excinfo.value)
+
+
+@pytest.mark.benchmark
+def test_cell_metadata_benchmark(validators):
+    """validating a cell should take microseconds, rather than milliseconds"""
+    nb = _notebook({}, [{"ipub": {"code": {"asfloat": True}}}] * 2000)
+    validate.get_validator(validate.CELL_METADATA_SCHEMA)
+    start = time.perf_counter()
+    assert not list(validate.iter_cell_metadata_errors(nb))
+    per_cell = (time.perf_counter() - start) / len(nb.cells)
+    # a loose bound, to allow for noise on shared machines
+    assert per_cell < 2e-4
+
+
+def test_metadata_not_modified(validators):
+    nb = _notebook({"ipub": {"titlepage": {}}}, [{"ipub": {"figure": {}}}, {}])
+    expected = copy.deepcopy(nb)
+    validate.validate_nb_metadata(nb)
+    validate.validate_cell_metadata(nb)
+    assert nb == expected
+
+
+@pytest.mark.ipynb("nb_with_bib")
+def test_publish_validators_equal(ipynb_app, monkeypatch):
+    streams = []
+    for backend in ("fastjsonschema", "jsonschema"):
+        if backend == "jsonschema":
+            monkeypatch.setattr(validate, "fastjsonschema", None)
+        monkeypatch.setattr(validate, "_VALIDATORS", {})
+        ipynb_app.run(
+            {"conversion": "latex_ipypublish_main", "validate_cell_metadata": True}
+        )
+        streams.append(ipynb_app.output_data["stream"])
+    assert streams[0] == streams[1]
+    assert "\\listoffigures" not in streams[0]
+
+
+@pytest.mark.ipynb("basic_nb")
+def test_publish_valid_cells(ipynb_app):
+    ipynb_app.run(
+        {"conversion": "latex_ipypublish_main", "validate_cell_metadata": True}
+    )
+    ipynb_app.assert_converted_exists()
+
+
+@pytest.mark.ipynb("nb_complex_outputs")
+def test_publish_invalid_cells(ipynb_app):
+    with pytest.raises(jsonschema.ValidationError, match="- cell 1:"):
+        ipynb_app.run(
+            {"conversion": "latex_ipypublish_main", "validate_cell_metadata": True}
+        )
@@ -3,10 +3,9 @@ import json
 import inspect
 import importlib
 import re
-import pkg_resources
+import threading
 
 from six import string_types
-import ruamel.yaml as yaml
 
 # python 2/3 compatibility
 try:
@@ -64,6 +63,8 @@ def read_file_from_directory(
                 if ext_type == "json":
                     data = json.load(fobj)
                 elif ext_type == "yaml":
+                    import ruamel.yaml as yaml
+
                     data = yaml.safe_load(fobj)
                 else:
                     raise ValueError("extension type not recognised")
@@ -134,45 +135,55 @@ def get_valid_filename(s):
     return re.sub(r"(?u)[^-\w.]", "", s)
 
 
-def find_entry_point(name, group, logger, preferred=None):
-    """find an entry point by name and group
+_ENTRY_POINTS = {}
+_ENTRY_POINTS_LOCK = threading.Lock()
 
-    Parameters
-    ----------
-    name: str
-        name of entry point
-    group: str
-        group of entry point
-    preferred: str
-        if multiple matches are found, prefer one from this module
 
-    """
-    entry_points = list(pkg_resources.iter_entry_points(group, name))
-    if len(entry_points) == 0:
-        handle_error(
-            "The {0} entry point " "{1} could not be found".format(group, name),
-            pkg_resources.ResolutionError,
-            logger,
-        )
-    elif len(entry_points) != 1:
-        # default to the preferred package
-        oentry_points = []
-        if preferred:
-            oentry_points = [
-                ep for ep in entry_points if ep.module_name.startswith(preferred)
-            ]
-        if len(oentry_points) != 1:
-            handle_error(
-                "Multiple {0} plugins found for "
-                "{1}: {2}".format(group, name, entry_points),
-                pkg_resources.ResolutionError,
-                logger,
-            )
-        logger.info(
-            "Multiple {0} plugins found for {1}, "
-            "defaulting to the {2} version".format(group, name, preferred)
-        )
-        entry_point = oentry_points[0]
+def _iter_entry_points(group):
+    """yield (name, module_name, entry_point) for all entry points in a group"""
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            metadata = None
+
+    if metadata is None:
+        import pkg_resources
+
+        for entry_point in pkg_resources.iter_entry_points(group):
+            yield entry_point.name, entry_point.module_name, entry_point
+        return
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        entry_points = entry_points.select(group=group)
     else:
-        entry_point = entry_points[0]
-    return entry_point.load()
+        entry_points = entry_points.get(group, [])
+    for entry_point in entry_points:
+        yield entry_point.name, entry_point.value.split(":")[0].strip(), entry_point
+
+
+def get_entry_points(group):
+    """ return a mapping of name -> [(module_name, entry_point), ...],
+    for all entry points in a group
+
+    the installed distributions are only scanned once per group, per process
+    """
+    with _ENTRY_POINTS_LOCK:
+        if group not in _ENTRY_POINTS:
+            entry_points = {}
+            for name, module_name, entry_point in _iter_entry_points(group):
+                entry_points.setdefault(name, [])
+                # the same distribution may be found on multiple paths
+                if module_name not in [m for m, _ in entry_points[name]]:
+                    entry_points[name].append((module_name, entry_point))
+            _ENTRY_POINTS[group] = entry_points
+        return _ENTRY_POINTS[group]
+
+
+def clear_entry_points():
+    """clear the cache of entry points"""
+    with _ENTRY_POINTS_LOCK:
+        _ENTRY_POINTS.clear()
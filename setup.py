@@ -26,6 +26,7 @@ setup(
     install_requires=requirements,
     extras_require={
         "sphinx": {"sphinx>=1.8", "sphinxcontrib-bibtex"},
+        "speedups": {"orjson", "fastjsonschema"},
         "tests": {
             "pytest>=3.6",
             "pytest-regressions",